@@ -0,0 +1,99 @@
+# accounts/bloom.py
+import hashlib
+import math
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+
+from common.cache import model_version
+
+FALSE_POSITIVE_RATE = 0.01
+MIN_CAPACITY = 1000
+REBUILD_SECONDS = 300       # rebuilt at least this often, dropping deleted usernames
+STALE_REBUILD_SECONDS = 30  # after registrations in other processes, at most this often
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings: no false negatives, ~rate false positives."""
+
+    def __init__(self, capacity, rate=FALSE_POSITIVE_RATE):
+        self.size = max(8, int(-capacity * math.log(rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class UsernameFilter:
+    """
+    Process-wide filter of taken usernames. Built from the database on first
+    use (and every REBUILD_SECONDS), and fed new usernames by a post_save
+    receiver. Registrations also bump the shared User version, so a process
+    can tell its filter may be missing names added elsewhere: until it is
+    rebuilt, a miss is confirmed against the table. "Not in the filter"
+    therefore always means the username is free.
+    """
+
+    def __init__(self):
+        self._filter = None
+        self._built_at = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _build(self):
+        usernames = get_user_model().objects.values_list('username', flat=True)
+        bloom = BloomFilter(max(MIN_CAPACITY, usernames.count() * 2))
+        for username in usernames.iterator(chunk_size=5000):
+            bloom.add(username)
+        return bloom
+
+    def _due(self, version):
+        age = time.monotonic() - self._built_at
+        return (
+            self._filter is None or age > REBUILD_SECONDS
+            or (version != self._version and age > STALE_REBUILD_SECONDS)
+        )
+
+    def _current(self):
+        """(filter, whether it holds every registration the shared version knows of)."""
+        version = model_version(get_user_model())
+        if self._due(version):
+            with self._lock:
+                if self._due(version):
+                    # version read before the build: registrations during it count as missing
+                    self._filter = self._build()
+                    self._built_at = time.monotonic()
+                    self._version = version
+        return self._filter, version == self._version
+
+    def might_exist(self, username):
+        bloom, current = self._current()
+        if username in bloom:
+            return True
+        if current:
+            return False
+        return get_user_model().objects.filter(username=username).exists()
+
+    def add(self, username):
+        if self._filter is not None:
+            with self._lock:
+                self._filter.add(username)
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+
+
+usernames = UsernameFilter()
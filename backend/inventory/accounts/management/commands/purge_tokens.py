@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from accounts.tokens import PURGE_BATCH_SIZE, purge_expired
+from common import jobs
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding/blacklisted JWTs in batches, or schedule that as a recurring job."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE)
+        parser.add_argument('--every', type=int, metavar='HOURS', help="Queue a recurring purge job instead")
+
+    def handle(self, *args, **options):
+        if options['every']:
+            job, created = jobs.enqueue_unique(
+                'accounts.purge_expired_tokens', priority=-1,
+                batch_size=options['batch_size'], every_hours=options['every'],
+            )
+            if not created:
+                self.stdout.write(self.style.WARNING(
+                    f"Job {job.id} is already {job.status}; cancel it (POST /api/jobs/{job.id}/cancel/) "
+                    "to change the schedule"
+                ))
+                return
+            self.stdout.write(self.style.SUCCESS(f"Queued job {job.id}, repeating every {options['every']}h"))
+            return
+        deleted = purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired tokens"))
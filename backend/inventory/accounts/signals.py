@@ -0,0 +1,24 @@
+# accounts/signals.py
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from common.cache import bump_model_version
+from .bloom import usernames
+from .tokens import revoked_tokens
+
+
+@receiver(post_save, sender=get_user_model())
+def remember_username(sender, instance, **kwargs):
+    username = instance.username
+    bump_model_version(sender)  # tells other processes their filters are behind
+    transaction.on_commit(lambda: usernames.add(username))
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def remember_revoked_token(sender, instance, **kwargs):
+    # covers rotation, logout and tokens blacklisted from the admin
+    jti, expires_at = instance.token.jti, instance.token.expires_at
+    transaction.on_commit(lambda: revoked_tokens.add(jti, expires_at))
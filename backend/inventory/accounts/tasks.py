@@ -0,0 +1,21 @@
+# accounts/tasks.py
+from datetime import timedelta
+
+from django.utils import timezone
+
+from common import jobs
+from .tokens import PURGE_BATCH_SIZE, purge_expired
+
+
+@jobs.task('accounts.purge_expired_tokens')
+def purge_expired_tokens(job, batch_size=PURGE_BATCH_SIZE, every_hours=None):
+    deleted = purge_expired(batch_size=batch_size)
+    if every_hours:
+        # recurring: queue the next run before finishing this one,
+        # unless `purge_tokens --every` queued one meanwhile
+        jobs.enqueue_unique(
+            'accounts.purge_expired_tokens', exclude=job.job, priority=-1,
+            run_after=timezone.now() + timedelta(hours=every_hours),
+            batch_size=batch_size, every_hours=every_hours,
+        )
+    return {'deleted': deleted}
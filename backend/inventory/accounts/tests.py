@@ -1,3 +1,112 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from common import jobs
+from common.models import Job
+from .bloom import UsernameFilter
+from .models import User
+from .tokens import WARM_KEY, _key, revoked_tokens
+
+TEST_CACHES = {
+    **settings.CACHES,
+    'tokens': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tokens-tests'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class TokenRevocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', password='x', role=User.OWNER)
+
+    def setUp(self):
+        revoked_tokens.shared.clear()
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post('/api/accounts/login/', {'username': 'owner', 'password': 'x'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data['refresh']
+
+    def refresh(self, token):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/accounts/refresh/', {'refresh': token}, format='json')
+
+    def jti(self, token):
+        return RefreshToken(token, verify=False)['jti']
+
+    def test_rotated_token_is_rejected(self):
+        token = self.login()
+        self.assertEqual(self.refresh(token).status_code, 200)
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_evicted_entry_falls_back_to_tables(self):
+        token = self.login()
+        self.assertEqual(self.refresh(token).status_code, 200)
+        jti = self.jti(token)
+        revoked_tokens._local.pop(jti, None)
+        revoked_tokens.shared.delete(_key(jti))  # culled while the cache stays warm
+        self.assertTrue(revoked_tokens.shared.get(WARM_KEY))
+
+        self.assertTrue(revoked_tokens.is_revoked(jti))
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_revocation_replaces_negative_entry(self):
+        token = self.login()
+        jti = self.jti(token)
+        self.assertFalse(revoked_tokens.is_revoked(jti))
+        self.assertEqual(revoked_tokens.shared.get(_key(jti)), 0)
+
+        self.assertEqual(self.refresh(token).status_code, 200)
+        self.assertTrue(revoked_tokens.is_revoked(jti))
+
+
+class UsernameFilterTests(TestCase):
+    def test_registration_elsewhere_is_not_reported_free(self):
+        other_worker = UsernameFilter()
+        self.assertFalse(other_worker.might_exist('newcomer'))  # built now, before the registration
+
+        User.objects.create_user('newcomer', password='x')
+        self.assertTrue(other_worker.might_exist('newcomer'))
+        self.assertFalse(other_worker.might_exist('someone-else'))
+        self.assertTrue(UsernameFilter().might_exist('newcomer'))
+
+    def test_check_username(self):
+        User.objects.create_user('taken', password='x')
+        response = self.client.get('/api/accounts/check-username/', {'username': 'taken'})
+        self.assertEqual(response.data, {'available': False})
+        response = self.client.get('/api/accounts/check-username/', {'username': 'free'})
+        self.assertEqual(response.data, {'available': True})
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PurgeScheduleTests(TestCase):
+    def schedule(self, hours=24):
+        out = io.StringIO()
+        call_command('purge_tokens', every=hours, stdout=out)
+        return out.getvalue()
+
+    def test_every_skips_when_a_purge_is_pending(self):
+        self.assertIn('Queued job', self.schedule())
+        self.assertIn('already queued', self.schedule(hours=1))
+        Job.objects.update(status=Job.RUNNING)
+        self.assertIn('already running', self.schedule())
+        [job] = Job.objects.all()
+        self.assertEqual(job.kwargs['every_hours'], 24)
+
+    def test_run_queues_the_next_one_once(self):
+        self.schedule()
+        jobs.execute(jobs.claim_next('worker'))
+        [following] = Job.objects.filter(status=Job.QUEUED)
+        self.assertGreater(following.run_after, timezone.now() + timedelta(hours=23))
+
+        jobs.enqueue('accounts.purge_expired_tokens', every_hours=24)
+        jobs.execute(jobs.claim_next('worker'))
+        self.assertEqual(list(Job.objects.filter(status=Job.QUEUED)), [following])
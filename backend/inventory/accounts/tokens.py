@@ -0,0 +1,132 @@
+# accounts/tokens.py
+import threading
+import time
+
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import serializers
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+CACHE_ALIAS = 'tokens'   # shared by the workers of a host (see CACHES)
+WARM_KEY = 'jwt-revoked:warm'
+WARM_SECONDS = 3600      # reload from the tables at least this often, in case entries were evicted
+NEGATIVE_SECONDS = 60    # how long a JTI found not revoked is answered without the tables
+LOCAL_MAX = 10000
+LOCAL_PURGE_SECONDS = 60
+PURGE_BATCH_SIZE = 5000
+
+
+def _key(jti):
+    return f"jwt-revoked:{jti}"
+
+
+class RevokedTokens:
+    """
+    Revoked refresh token JTIs with their expiry. Checks are answered from a
+    process-local dict, then from the shared cache, which is loaded from the
+    blacklist tables whenever it is cold. The cache may evict single entries,
+    so a JTI it does not know is looked up in the tables and the answer kept
+    for NEGATIVE_SECONDS; a revocation overwrites it.
+    """
+
+    def __init__(self):
+        self._local = {}
+        self._lock = threading.Lock()
+        self._purged_at = time.monotonic()
+
+    @property
+    def shared(self):
+        return caches[CACHE_ALIAS]
+
+    def add(self, jti, expires_at):
+        expires = expires_at.timestamp()
+        timeout = max(1, int(expires - time.time()))
+        self.shared.set(_key(jti), expires, timeout=timeout)
+        self._remember(jti, expires)
+
+    def is_revoked(self, jti):
+        now = time.time()
+        expires = self._local.get(jti)
+        if expires is not None and expires > now:
+            return True
+        if not self.shared.get(WARM_KEY):
+            self.warm()
+        expires = self.shared.get(_key(jti))
+        if expires is None:
+            expires = self._lookup(jti)
+        if expires and expires > now:
+            self._remember(jti, expires)
+            return True
+        return False
+
+    def _lookup(self, jti):
+        expires_at = BlacklistedToken.objects.filter(token__jti=jti).values_list(
+            'token__expires_at', flat=True
+        ).first()
+        if expires_at is not None:
+            expires = expires_at.timestamp()
+            self.shared.set(_key(jti), expires, timeout=max(1, int(expires - time.time())))
+            return expires
+        # add(), not set(): a revocation stored since the query must not be overwritten
+        self.shared.add(_key(jti), 0, timeout=NEGATIVE_SECONDS)
+        return 0
+
+    def warm(self):
+        now = aware_utcnow()
+        revoked = BlacklistedToken.objects.filter(token__expires_at__gt=now).values_list(
+            'token__jti', 'token__expires_at'
+        )
+        timeout = int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+        batch = {}
+        for jti, expires_at in revoked.iterator(chunk_size=PURGE_BATCH_SIZE):
+            batch[_key(jti)] = expires_at.timestamp()
+            if len(batch) >= PURGE_BATCH_SIZE:
+                self.shared.set_many(batch, timeout=timeout)
+                batch = {}
+        self.shared.set_many(batch, timeout=timeout)
+        self.shared.set(WARM_KEY, True, timeout=WARM_SECONDS)
+
+    def _remember(self, jti, expires):
+        with self._lock:
+            self._local[jti] = expires
+            if len(self._local) > LOCAL_MAX or time.monotonic() - self._purged_at > LOCAL_PURGE_SECONDS:
+                now = time.time()
+                self._local = {key: value for key, value in self._local.items() if value > now}
+                if len(self._local) > LOCAL_MAX:
+                    self._local.clear()  # only a cache; the shared layer still answers
+                self._purged_at = time.monotonic()
+
+
+revoked_tokens = RevokedTokens()
+
+
+class CachedRefreshToken(RefreshToken):
+    """RefreshToken whose blacklist check is served by revoked_tokens instead of a query."""
+
+    def check_blacklist(self):
+        if revoked_tokens.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+
+class TokenObtainPairSerializer(serializers.TokenObtainPairSerializer):
+    token_class = CachedRefreshToken
+
+
+class TokenRefreshSerializer(serializers.TokenRefreshSerializer):
+    token_class = CachedRefreshToken
+
+
+def purge_expired(batch_size=PURGE_BATCH_SIZE):
+    """Delete expired outstanding tokens (and their blacklist rows) in batches."""
+    expired = OutstandingToken.objects.filter(expires_at__lte=aware_utcnow())
+    deleted = 0
+    while True:
+        pks = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        OutstandingToken.objects.filter(pk__in=pks).delete()
+        deleted += len(pks)
@@ -9,7 +9,9 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.throttling import AnonRateThrottle
+from .bloom import usernames
 
 User = get_user_model()
 
@@ -31,9 +33,18 @@ class RegisterViewSet(viewsets.ModelViewSet):
     serializer_class = RegisterSerializer
     permission_classes = []  # allow public registration if needed
 
+class UsernameCheckThrottle(AnonRateThrottle):
+    # per client IP, counted in the local cache; rate in DEFAULT_THROTTLE_RATES
+    scope = 'check_username'
+
+
 @api_view(['GET'])
+@throttle_classes([UsernameCheckThrottle])
 def check_username(request):
     username = request.GET.get('username', '')
+    # the Bloom filter has no false negatives: a miss is a definite "available"
+    if not usernames.might_exist(username):
+        return Response({'available': True})
     exists = User.objects.filter(username=username).exists()
     return Response({'available': not exists})
 
@@ -1,3 +1,19 @@
 from django.contrib import admin
 
 # Register your models here.
+from .models import Job, StoredFile
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'status', 'priority', 'attempts', 'progress', 'created_at', 'finished_at')
+    list_filter = ('status', 'task')
+    readonly_fields = ('locked_by', 'started_at', 'finished_at', 'result', 'error')
+
+
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'refs', 'created_at', 'updated_at')
+    list_filter = ('refs',)
+    search_fields = ('name',)
+    readonly_fields = ('name', 'size', 'refs', 'created_at', 'updated_at')
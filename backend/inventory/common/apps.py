@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CommonConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "common"
+
+    def ready(self):
+        from django.utils.module_loading import autodiscover_modules
+        from . import signals  # noqa: F401
+
+        autodiscover_modules('tasks')  # registers @jobs.task functions
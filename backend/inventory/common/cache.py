@@ -0,0 +1,50 @@
+# common/cache.py
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+
+CACHE_ALIAS = 'versions'  # shared by the workers of a host (see CACHES)
+
+
+def _versions():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(label):
+    return f"model-version:{label}"
+
+
+def _fresh_version():
+    # a counter that was evicted restarts above every value it had before,
+    # so keys built on an old version can never become valid again
+    return time.time_ns()
+
+
+def model_version(model):
+    """
+    Current version counter of a model. Cache keys that embed it are
+    invalidated by bump_model_version() without having to find and delete them.
+    """
+    return _versions().get_or_set(_version_key(model._meta.label_lower), _fresh_version, timeout=None)
+
+
+def model_versions(*models):
+    return ".".join(str(model_version(model)) for model in models)
+
+
+def _bump(key):
+    # a new value rather than incr(): the shared backend's incr is a get and a
+    # set, and two processes bumping at once could both write the same number
+    _versions().set(key, _fresh_version(), timeout=None)
+
+
+def bump_model_version(model):
+    """
+    Invalidate now, and again once the surrounding transaction commits: a
+    reader that cached rows from before the commit under the first bump is
+    invalidated by the second.
+    """
+    key = _version_key(model._meta.label_lower)
+    _bump(key)
+    transaction.on_commit(lambda: _bump(key))
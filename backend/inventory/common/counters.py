@@ -0,0 +1,29 @@
+# common/counters.py
+from django.db.models import F
+from django.utils import timezone
+
+from .models import RowCount
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def increment(model, delta=1):
+    """Adjust a model's maintained row count; bulk writes that skip signals call this themselves."""
+    if delta:
+        RowCount.objects.filter(resource=_label(model)).update(count=F('count') + delta)
+
+
+def counted(model):
+    """The maintained row count of a model, or None if it is not counted."""
+    return RowCount.objects.filter(resource=_label(model)).values_list('count', flat=True).first()
+
+
+def recount(model):
+    """Reset a model's counter from an exact COUNT(*), correcting any drift."""
+    count = model._default_manager.count()
+    RowCount.objects.update_or_create(
+        resource=_label(model), defaults={'count': count, 'recounted_at': timezone.now()}
+    )
+    return count
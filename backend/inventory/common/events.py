@@ -0,0 +1,64 @@
+# common/events.py
+import asyncio
+import json
+import threading
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+QUEUE_SIZE = 100
+
+
+class Broadcaster:
+    """
+    In-process fan-out of server-sent events. publish() encodes an event once
+    and hands the same bytes to every subscriber's queue, from any thread.
+    Only reaches subscribers of this process, so run a single ASGI worker
+    (or one per sticky group of clients) for the event stream.
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def subscribe(self):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.queue_size))
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, event, data):
+        with self._lock:
+            self._next_id += 1
+            message = encode(self._next_id, event, data)
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, message)
+            except RuntimeError:  # loop already closed
+                self.unsubscribe((loop, queue))
+
+
+def _offer(queue, message):
+    # a client that cannot keep up loses its oldest events rather than
+    # growing memory; it can resync through the delta feed
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+def encode(event_id, event, data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n".encode()
+
+
+broadcaster = Broadcaster()
@@ -0,0 +1,133 @@
+# common/jobs.py
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+RETRY_BACKOFF_SECONDS = 30  # doubled on every failed attempt
+
+_registry = {}
+
+
+def task(name):
+    """
+    Register a function as a background task:
+
+        @jobs.task('reports.rebuild_customer_metrics')
+        def rebuild(job, batch_size=1000): ...
+
+    The function receives the running JobContext first, then the job kwargs.
+    Tasks live in <app>/tasks.py, which is imported when the app registry loads.
+    """
+    def register(func):
+        _registry[name] = func
+        return func
+    return register
+
+
+def enqueue(task_name, priority=0, max_attempts=3, run_after=None, created_by=None, **kwargs):
+    if task_name not in _registry:
+        raise KeyError(f"Unknown task '{task_name}'")
+    return Job.objects.create(
+        task=task_name,
+        kwargs=kwargs,
+        priority=priority,
+        max_attempts=max_attempts,
+        run_after=run_after or timezone.now(),
+        created_by=created_by,
+    )
+
+
+def enqueue_unique(task_name, exclude=None, **options):
+    """
+    For recurring tasks: enqueue() unless a queued or running job of the task
+    (other than `exclude`, the job doing the rescheduling) already exists.
+    Returns (job, created); job is the existing one when nothing was queued.
+    """
+    with transaction.atomic():
+        pending = Job.objects.select_for_update().filter(task=task_name, status__in=[Job.QUEUED, Job.RUNNING])
+        if exclude is not None:
+            pending = pending.exclude(pk=exclude.pk)
+        existing = pending.order_by('pk').first()
+        if existing is not None:
+            return existing, False
+        return enqueue(task_name, **options), True
+
+
+class JobContext:
+    def __init__(self, job):
+        self.job = job
+
+    def set_progress(self, percent, message=''):
+        percent = max(0, min(100, int(percent)))
+        Job.objects.filter(pk=self.job.pk).update(progress=percent, progress_message=message[:200])
+        self.job.progress, self.job.progress_message = percent, message
+
+
+def claim_next(worker_id):
+    """
+    Take the highest priority due job. The status-guarded UPDATE makes the
+    claim atomic across workers on any backend: if another worker got there
+    first nothing is updated and the next candidate is tried.
+    """
+    now = timezone.now()
+    candidates = (
+        Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+        .order_by('-priority', 'run_after', 'id')
+        .values_list('id', flat=True)
+    )
+    for job_id in candidates[:10]:
+        claimed = Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker_id, started_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            return job_id
+    return None
+
+
+def execute(job_id):
+    """Run a claimed job; safe to call from a worker thread or process."""
+    close_old_connections()
+    job = Job.objects.get(pk=job_id)
+    try:
+        func = _registry[job.task]
+        result = func(JobContext(job), **job.kwargs)
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed", job.pk, job.task)
+        _failed(job, exc)
+    else:
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.SUCCEEDED, result=result, progress=100, error='', finished_at=timezone.now()
+        )
+    finally:
+        close_old_connections()
+    return job_id
+
+
+def _failed(job, exc):
+    error = ''.join(traceback.format_exception(type(exc), exc, exc.__traceback__))[-5000:]
+    if job.attempts < job.max_attempts:
+        delay = RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.QUEUED, error=error, locked_by='',
+            run_after=timezone.now() + timedelta(seconds=delay),
+        )
+    else:
+        Job.objects.filter(pk=job.pk).update(status=Job.FAILED, error=error, finished_at=timezone.now())
+
+
+def requeue_stale(older_than):
+    """Put back jobs left 'running' by a worker that died (or fail them if out of attempts)."""
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, started_at__lt=now - older_than)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, error='Worker stopped while running the job', finished_at=now
+    )
+    return stale.update(status=Job.QUEUED, locked_by='')
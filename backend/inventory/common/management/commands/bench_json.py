@@ -0,0 +1,106 @@
+import datetime
+import gzip
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from common.middleware import BROTLI_QUALITY, brotli
+from common.renderers import FastJSONRenderer, orjson
+from transactions.models import SalesOrder, Transaction
+from transactions.serializers import SalesOrderSerializer, TransactionSerializer
+
+
+def synthetic_sales_orders(count, lines):
+    # shaped like SalesOrderSerializer output
+    day = datetime.date(2025, 1, 1)
+    return [
+        {
+            'id': i,
+            'customer': i % 500,
+            'order_date': day + datetime.timedelta(days=i % 365),
+            'status': 'confirmed',
+            'items': [
+                {
+                    'id': i * lines + n,
+                    'total': Decimal('1180.00'),
+                    'quantity': n + 1,
+                    'unit_price': '1000.00',
+                    'tax_percent': '18.00',
+                    'product': n,
+                }
+                for n in range(lines)
+            ],
+            'total_amount': 1180.0 * lines,
+            'paid': False,
+            'paid_amount': '0.00',
+            'outstanding_amount': f'{1180 * lines}.00',
+        }
+        for i in range(count)
+    ]
+
+
+def synthetic_transactions(count):
+    # shaped like TransactionSerializer output
+    day = datetime.date(2025, 1, 1)
+    return [
+        {
+            'id': i,
+            'related_name': f'SO-{i} (Customer {i % 500})',
+            'transaction_type': 'sales_order',
+            'object_id': i,
+            'date': day + datetime.timedelta(days=i % 365),
+            'amount': '1180.00',
+            'updated_at': '2025-06-01T10:00:00.123456Z',
+            'content_type': 12,
+        }
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Benchmark JSON encode time and response size (raw/gzip/brotli) for order and transaction lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--lines', type=int, default=5, help="Items per synthetic sales order")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--from-db', action='store_true', help="Serialize real rows instead of synthetic ones")
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        if options['from_db']:
+            datasets = {
+                'sales-orders': SalesOrderSerializer(
+                    SalesOrder.objects.prefetch_related('items')[:rows], many=True
+                ).data,
+                'transactions': TransactionSerializer(
+                    Transaction.objects.prefetch_related('related_object')[:rows], many=True
+                ).data,
+            }
+        else:
+            datasets = {
+                'sales-orders': synthetic_sales_orders(rows, options['lines']),
+                'transactions': synthetic_transactions(rows),
+            }
+
+        renderers = [('drf-json', JSONRenderer())]
+        if orjson is not None:
+            renderers.append(('orjson', FastJSONRenderer()))
+        else:
+            self.stdout.write("orjson is not installed; FastJSONRenderer falls back to drf-json")
+
+        self.stdout.write(f"{'dataset':<14}{'renderer':<10}{'rows':>7}{'encode ms':>11}{'bytes':>11}{'gzip':>10}{'brotli':>10}")
+        for name, data in datasets.items():
+            for label, renderer in renderers:
+                best = float('inf')
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    body = renderer.render(data)
+                    best = min(best, time.perf_counter() - start)
+                gzipped = len(gzip.compress(body, compresslevel=6))
+                br = len(brotli.compress(body, quality=BROTLI_QUALITY)) if brotli else '-'
+                self.stdout.write(
+                    f"{name:<14}{label:<10}{len(data):>7}{best * 1000:>11.1f}{len(body):>11}{gzipped:>10}{br:>10}"
+                )
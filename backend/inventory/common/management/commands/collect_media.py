@@ -0,0 +1,34 @@
+import datetime
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from common import storage
+from common.signals import REFERENCED_FILES
+
+
+class Command(BaseCommand):
+    help = "Delete content-addressed media files that no row refers to any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recount', action='store_true', help="Rebuild reference counts from the tables first")
+        parser.add_argument('--grace-minutes', type=int, default=int(storage.GRACE_PERIOD.total_seconds() // 60))
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            references = Counter()
+            for model, fields in REFERENCED_FILES.items():
+                for field in fields:
+                    references.update(
+                        model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                        .values_list(field, flat=True).iterator()
+                    )
+            storage.recount(references)
+            self.stdout.write(f"Recounted references to {len(references)} files")
+
+        files, size = storage.collect(
+            grace=datetime.timedelta(minutes=options['grace_minutes']), dry_run=options['dry_run']
+        )
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {files} unreferenced files ({size} bytes)"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from common.counters import recount
+from common.signals import COUNTED_MODELS
+
+
+class Command(BaseCommand):
+    help = "Reset the maintained row counts from exact COUNT(*)s (run after raw SQL or bulk maintenance)."
+
+    def handle(self, *args, **options):
+        for model in COUNTED_MODELS:
+            count = recount(model)
+            self.stdout.write(f"{model._meta.label_lower}: {count}")
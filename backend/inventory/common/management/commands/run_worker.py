@@ -0,0 +1,67 @@
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand
+
+from common import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (common.Job) in a thread or process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep when idle")
+        parser.add_argument('--stale-after', type=int, default=3600,
+                            help="Requeue jobs running longer than this many seconds at startup")
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty")
+
+    def handle(self, *args, **options):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        concurrency = options['concurrency']
+
+        requeued = jobs.requeue_stale(timedelta(seconds=options['stale_after']))
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale jobs")
+
+        if options['mode'] == 'process':
+            # spawn, not fork: the pool starts children lazily on submit(), by
+            # when claim_next() has reopened the parent's database connection.
+            # Spawned children start from a fresh interpreter, hence django.setup
+            # (referenced directly: this module imports models, so it cannot be
+            # unpickled in a child before setup).
+            pool = ProcessPoolExecutor(
+                max_workers=concurrency, initializer=django.setup,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        else:
+            pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job')
+
+        self.stdout.write(f"Worker {worker_id} started ({options['mode']} x {concurrency})")
+        running = set()
+        try:
+            with pool:
+                while True:
+                    while len(running) < concurrency:
+                        job_id = jobs.claim_next(worker_id)
+                        if job_id is None:
+                            break
+                        running.add(pool.submit(jobs.execute, job_id))
+
+                    if not running:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+
+                    done, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.stdout.write(f"Job {future.result()} finished")
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping; waiting for running jobs")
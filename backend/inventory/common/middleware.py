@@ -0,0 +1,44 @@
+# common/middleware.py
+import re
+
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional: without it responses are gzip-compressed only
+    brotli = None
+
+accepts_br = re.compile(r'\bbr\b')
+
+MIN_SIZE = 1024
+BROTLI_QUALITY = 5  # good ratio at a cost close to gzip level 6
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compresses responses of MIN_SIZE bytes or more with brotli when the client
+    accepts it and the module is installed, otherwise with gzip. Event streams
+    are left alone so events are not held back by the compressor.
+    """
+
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        if (
+            brotli is None
+            or response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < MIN_SIZE
+            or not accepts_br.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = 'br'
+        return response
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:57
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Tombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("resource", models.CharField(max_length=50)),
+                ("object_id", models.PositiveBigIntegerField()),
+                ("deleted_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["resource", "deleted_at", "id"],
+                        name="tombstone_feed_idx",
+                    )
+                ],
+            },
+        ),
+    ]
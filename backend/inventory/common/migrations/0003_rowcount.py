@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+COUNTED = [
+    ("transactions", "PurchaseOrder"),
+    ("transactions", "SalesOrder"),
+    ("transactions", "Transaction"),
+]
+
+
+def seed_counts(apps, schema_editor):
+    RowCount = apps.get_model("common", "RowCount")
+    for app_label, model_name in COUNTED:
+        model = apps.get_model(app_label, model_name)
+        RowCount.objects.update_or_create(
+            resource=model._meta.label_lower,
+            defaults={"count": model.objects.count()},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("common", "0002_job"),
+        ("transactions", "0011_period_close"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RowCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("resource", models.CharField(max_length=50, unique=True)),
+                ("count", models.BigIntegerField(default=0)),
+                (
+                    "recounted_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+        ),
+        migrations.RunPython(seed_counts, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,101 @@
 from django.db import models
 
 # Create your models here.
+from django.conf import settings
+from django.utils import timezone
+
+
+class Tombstone(models.Model):
+    """Record of a deleted row, so delta sync clients learn about deletes."""
+    resource = models.CharField(max_length=50)  # model label, e.g. "master.contact"
+    object_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['resource', 'deleted_at', 'id'], name='tombstone_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.resource}:{self.object_id} deleted {self.deleted_at}"
+
+
+class RowCount(models.Model):
+    """
+    Row count of a table, maintained on insert and delete (see common/counters.py)
+    so unfiltered list endpoints can report a count without scanning the table.
+    """
+    resource = models.CharField(max_length=50, unique=True)  # model label, e.g. "transactions.transaction"
+    count = models.BigIntegerField(default=0)
+    recounted_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.resource}: {self.count}"
+
+
+class Job(models.Model):
+    """A unit of background work run by `manage.py run_worker` (see common/jobs.py)."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+        (CANCELLED, 'Cancelled'),
+    ]
+
+    task = models.CharField(max_length=100)  # name registered with @jobs.task
+    kwargs = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0)  # higher runs first
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    progress = models.PositiveSmallIntegerField(default=0)  # percent
+    progress_message = models.CharField(max_length=200, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='+'
+    )
+    locked_by = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-priority', 'run_after', 'id'],
+                condition=models.Q(status='queued'),
+                name='job_queue_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} {self.task} ({self.status})"
+
+
+class StoredFile(models.Model):
+    """
+    A file kept once by ContentAddressedStorage (common/storage.py), with the
+    number of rows that refer to it. Files left without references are
+    deleted by `collect_media`.
+    """
+    name = models.CharField(max_length=255, unique=True)  # storage name, e.g. "contacts/ab/ab12....jpg"
+    size = models.PositiveBigIntegerField(default=0)
+    refs = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['refs', 'updated_at'], name='storedfile_unreferenced_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refs} refs)"
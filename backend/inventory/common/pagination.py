@@ -0,0 +1,104 @@
+# common/pagination.py
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, transaction
+from django.utils.functional import cached_property
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+
+from . import counters
+
+# Below this many rows an exact COUNT(*) is cheap and more honest than an estimate
+ESTIMATE_THRESHOLD = 10000
+# Filtered lists are counted up to this many rows; later pages are not linked
+COUNT_CAP = 100000
+
+
+def estimated_row_count(model, using='default'):
+    """The database's own row estimate for a model's table, or None if it has none."""
+    connection = connections[using]
+    table = model._meta.db_table
+    queries = {
+        'postgresql': ("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table]),
+        'mysql': (
+            "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+            [table],
+        ),
+        # filled in by ANALYZE; the first number of a stat row is the table's row count
+        'sqlite': ("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table]),
+    }
+    if connection.vendor not in queries:
+        return None
+    sql, params = queries[connection.vendor]
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except DatabaseError:  # e.g. sqlite_stat1 does not exist until the first ANALYZE
+        return None
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists over very large tables. An unfiltered list
+    reports the maintained or estimated row count instead of running COUNT(*),
+    and a filtered one is counted only up to COUNT_CAP rows.
+    """
+
+    @cached_property
+    def count(self):
+        return fast_count(self.object_list)[0]
+
+
+def fast_count(queryset, exact=False):
+    """
+    (count, is_exact) for a queryset. Unfiltered querysets over large tables
+    use the maintained RowCount (or the database's estimate for models that
+    are not counted); filtered ones are counted exactly up to COUNT_CAP.
+    """
+    if exact:
+        return queryset.count(), True
+    if not queryset.query.where:
+        approximate = counters.counted(queryset.model)
+        if approximate is None:
+            approximate = estimated_row_count(queryset.model, queryset.db)
+        if approximate is not None and approximate >= ESTIMATE_THRESHOLD:
+            return approximate, False
+    count = queryset.order_by()[:COUNT_CAP + 1].count()
+    if count > COUNT_CAP:
+        return COUNT_CAP, False
+    return count, True
+
+
+class FastCountPagination(LimitOffsetPagination):
+    """
+    ?limit=&offset= pagination whose count comes from fast_count() and is
+    returned with a `count_exact` flag; ?exact_count=1 forces COUNT(*).
+    Without ?limit lists stay unpaginated, as before.
+    """
+    max_limit = 1000
+
+    def get_count(self, queryset):
+        exact = self.request.query_params.get('exact_count') in ('1', 'true')
+        self.count_exact = True
+        if not hasattr(queryset, 'query'):
+            return len(queryset)
+        count, self.count_exact = fast_count(queryset, exact=exact)
+        return count
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'count_exact': self.count_exact,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response = super().get_paginated_response_schema(schema)
+        response['properties']['count_exact'] = {'type': 'boolean'}
+        return response
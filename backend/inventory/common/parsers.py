@@ -0,0 +1,23 @@
+# common/parsers.py
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import orjson
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser backed by orjson when it is installed."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            body = stream.read() if stream is not None else b''
+            if encoding.lower().replace('-', '') != 'utf8':
+                body = body.decode(encoding).encode()
+            return orjson.loads(body)
+        except (orjson.JSONDecodeError, UnicodeError) as exc:
+            raise ParseError(f'JSON parse error - {exc}')
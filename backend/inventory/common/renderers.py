@@ -0,0 +1,34 @@
+# common/renderers.py
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to DRF's json-based renderer
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+# Anything orjson has no native encoding for (Decimal, lazy strings,
+# timedelta, querysets...) goes through DRF's encoder, so output is unchanged.
+_fallback = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed. date/datetime/UUID are
+    encoded natively, Decimal as a number (as DRF does). Pretty-printed
+    output (?indent / browsable API) still goes through the stdlib encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=_fallback, option=ORJSON_OPTIONS)
+        # same JS-safety escaping as JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
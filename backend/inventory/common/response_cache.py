@@ -0,0 +1,48 @@
+# common/response_cache.py
+import hashlib
+
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from .cache import model_versions
+
+CACHE_TIMEOUT = 300
+
+
+class CachedResponseMixin:
+    """
+    ViewSet mixin: list/retrieve response data is cached per URL (with query
+    string) and user role, under the current versions of `cache_models`. Any
+    save/delete of those models bumps a version (common/signals.py), so stale
+    entries are never read again and simply expire. Only the data is cached;
+    it is rendered per request, so content negotiation is unaffected. The
+    versions live in the host-wide 'versions' cache, so a write in any worker
+    invalidates the entries of all of them, wherever the data is cached.
+    """
+    cache_models = ()
+    cache_timeout = CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(super().retrieve, request, *args, **kwargs)
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        # versions are read before the queries run: a write that lands while
+        # this response is built bumps them, and the entry is never reused
+        role = getattr(request.user, 'role', None) or 'anonymous'
+        path = hashlib.sha1(request.get_full_path().encode()).hexdigest()
+        key = f"response:{role}:{model_versions(*self.cache_models)}:{path}"
+
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'hit'
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, self.cache_timeout)
+        response['X-Cache'] = 'miss'
+        return response
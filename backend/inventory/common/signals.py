@@ -0,0 +1,167 @@
+# common/signals.py
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.utils import timezone
+from master.models import ChartOfAccounts, Contact, Product, Tax
+from transactions.models import PurchaseOrder, PurchaseOrderItem, SalesOrder, SalesOrderItem, Transaction
+from transactions.transitions import orders_bulk_updated
+from . import counters, storage
+from .cache import bump_model_version
+from .events import broadcaster
+from .models import Tombstone
+
+# Models whose writes invalidate cached results built on model_version()
+VERSIONED_MODELS = [
+    Contact, Product, Tax, ChartOfAccounts,
+    PurchaseOrder, PurchaseOrderItem,
+    SalesOrder, SalesOrderItem,
+]
+
+# Models served by the delta sync feed (common/sync.py); deletes leave a Tombstone
+SYNCED_MODELS = [Contact, Product, PurchaseOrder, SalesOrder, Transaction]
+
+# Models whose row count is maintained in RowCount for the list endpoints' counts
+COUNTED_MODELS = [PurchaseOrder, SalesOrder, Transaction]
+
+# File fields kept by ContentAddressedStorage: their files are shared, so
+# references are counted in StoredFile and garbage collected by collect_media
+REFERENCED_FILES = {
+    Contact: ['profile_image'],
+}
+
+# Order items are synced as part of their order, so item writes touch the order
+ITEM_PARENTS = {
+    PurchaseOrderItem: ('purchase_order_id', PurchaseOrder),
+    SalesOrderItem: ('sales_order_id', SalesOrder),
+}
+
+
+_muted = threading.local()
+
+
+@contextmanager
+def muted(*models):
+    """
+    Skip the per-row receivers below for models while a bulk operation (e.g.
+    archiving a year of transactions) bumps versions and counters itself.
+    """
+    previous = getattr(_muted, 'models', frozenset())
+    _muted.models = previous | set(models)
+    try:
+        yield
+    finally:
+        _muted.models = previous
+
+
+def _is_muted(model):
+    return model in getattr(_muted, 'models', ())
+
+
+def bump_version(sender, **kwargs):
+    if not _is_muted(sender):
+        bump_model_version(sender)
+
+
+def record_tombstone(sender, instance, **kwargs):
+    if not _is_muted(sender):
+        Tombstone.objects.create(resource=sender._meta.label_lower, object_id=instance.pk)
+
+
+def count_insert(sender, created, **kwargs):
+    if created and not _is_muted(sender):
+        counters.increment(sender)
+
+
+def count_delete(sender, **kwargs):
+    if not _is_muted(sender):
+        counters.increment(sender, -1)
+
+
+def touch_parent_order(sender, instance, **kwargs):
+    if _is_muted(sender):
+        return
+    field, parent = ITEM_PARENTS[sender]
+    parent.objects.filter(pk=getattr(instance, field)).update(updated_at=timezone.now())
+
+
+def remember_files(sender, instance, update_fields=None, **kwargs):
+    fields = [field for field in REFERENCED_FILES[sender] if update_fields is None or field in update_fields]
+    instance._previous_files = dict.fromkeys(fields, '')
+    if instance.pk and fields:
+        instance._previous_files.update(sender.objects.filter(pk=instance.pk).values(*fields).first() or {})
+
+
+def count_file_references(sender, instance, **kwargs):
+    for field, previous in getattr(instance, '_previous_files', {}).items():
+        current = getattr(instance, field).name or ''
+        if current != (previous or ''):
+            storage.add_reference(current, 1)
+            storage.add_reference(previous, -1)
+
+
+def release_files(sender, instance, **kwargs):
+    for field in REFERENCED_FILES[sender]:
+        storage.add_reference(getattr(instance, field).name, -1)
+
+
+# Compact deltas pushed to the event stream: event name -> fields sent
+EVENT_FIELDS = {
+    PurchaseOrder: ('purchase_order', [
+        'vendor_id', 'order_date', 'expected_date', 'status', 'total_amount', 'outstanding_amount', 'paid'
+    ]),
+    SalesOrder: ('sales_order', [
+        'customer_id', 'order_date', 'status', 'total_amount', 'outstanding_amount', 'paid'
+    ]),
+    Transaction: ('transaction', ['transaction_type', 'date', 'amount']),
+}
+
+
+def publish_change(sender, instance, created=False, **kwargs):
+    if not broadcaster.subscriber_count or _is_muted(sender):
+        return
+    event, fields = EVENT_FIELDS[sender]
+    if kwargs.get('signal') is post_delete:
+        data = {'id': instance.pk, 'action': 'deleted'}
+    else:
+        data = {'id': instance.pk, 'action': 'created' if created else 'updated'}
+        data.update({field: getattr(instance, field) for field in fields})
+    # only announce what actually got committed
+    transaction.on_commit(lambda: broadcaster.publish(event, data))
+
+
+def bulk_status_changed(sender, ids, status, **kwargs):
+    # one version bump and one event for the whole batch
+    bump_model_version(sender)
+    if broadcaster.subscriber_count:
+        event, _ = EVENT_FIELDS[sender]
+        broadcaster.publish(event, {'ids': ids, 'action': 'bulk_updated', 'status': status})
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(bump_version, sender=model, dispatch_uid=f"version-save-{model._meta.label_lower}")
+    post_delete.connect(bump_version, sender=model, dispatch_uid=f"version-delete-{model._meta.label_lower}")
+
+for model in SYNCED_MODELS:
+    post_delete.connect(record_tombstone, sender=model, dispatch_uid=f"tombstone-{model._meta.label_lower}")
+
+for model in COUNTED_MODELS:
+    post_save.connect(count_insert, sender=model, dispatch_uid=f"count-save-{model._meta.label_lower}")
+    post_delete.connect(count_delete, sender=model, dispatch_uid=f"count-delete-{model._meta.label_lower}")
+
+for model in ITEM_PARENTS:
+    post_save.connect(touch_parent_order, sender=model, dispatch_uid=f"touch-save-{model._meta.label_lower}")
+    post_delete.connect(touch_parent_order, sender=model, dispatch_uid=f"touch-delete-{model._meta.label_lower}")
+
+for model in EVENT_FIELDS:
+    post_save.connect(publish_change, sender=model, dispatch_uid=f"event-save-{model._meta.label_lower}")
+    post_delete.connect(publish_change, sender=model, dispatch_uid=f"event-delete-{model._meta.label_lower}")
+
+orders_bulk_updated.connect(bulk_status_changed, dispatch_uid="bulk-status-changed")
+
+for model in REFERENCED_FILES:
+    pre_save.connect(remember_files, sender=model, dispatch_uid=f"files-previous-{model._meta.label_lower}")
+    post_save.connect(count_file_references, sender=model, dispatch_uid=f"files-save-{model._meta.label_lower}")
+    post_delete.connect(release_files, sender=model, dispatch_uid=f"files-delete-{model._meta.label_lower}")
@@ -0,0 +1,74 @@
+# common/singleflight.py
+import functools
+import threading
+
+from rest_framework.response import Response
+
+# A follower gives up waiting and computes on its own after this long
+WAIT_SECONDS = 60
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the
+    function, callers arriving while it runs wait and get the same result (or
+    exception). Nothing is kept once the call finishes. Per process, so it
+    helps threaded workers; each process still computes once per burst.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if not call.done.wait(WAIT_SECONDS):
+                return func()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+flights = SingleFlight()
+
+
+def single_flight(view):
+    """
+    For function views under @api_view: identical concurrent requests (same
+    path and query string) share one computation. Only the response data and
+    status are shared, each request gets its own Response.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        def compute():
+            response = view(request, *args, **kwargs)
+            return response.data, response.status_code
+
+        key = f"{view.__module__}.{view.__qualname__}:{request.get_full_path()}"
+        data, status = flights.do(key, compute)
+        return Response(data, status=status)
+    return wrapper
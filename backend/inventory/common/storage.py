@@ -0,0 +1,100 @@
+# common/storage.py
+import datetime
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+# unreferenced files younger than this may belong to an upload whose row is
+# not saved yet, and are left alone
+GRACE_PERIOD = datetime.timedelta(hours=1)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores each distinct file once, named by the SHA-256 of its content under
+    the field's upload directory (contacts/ab/ab12....jpg). Saving content
+    that is already stored writes nothing and returns the existing name.
+    Files are shared, so they are reference counted in StoredFile (see
+    common/signals.py) and removed only by `collect_media`.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('allow_overwrite', True)  # a concurrent save of the same content writes the same bytes
+        super().__init__(**kwargs)
+
+    def save(self, name, content, max_length=None):
+        from .models import StoredFile
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+
+        directory, filename = posixpath.split(name.replace('\\', '/'))
+        extension = os.path.splitext(filename)[1].lower()
+        name = posixpath.join(directory, digest[:2], digest + extension)
+        if not self.exists(name):
+            name = self._save(name, content)
+
+        # touched on every save so `collect_media` leaves a fresh upload
+        # alone until the row that will refer to it is saved
+        stored, created = StoredFile.objects.get_or_create(name=name, defaults={'size': content.size})
+        if not created:
+            StoredFile.objects.filter(pk=stored.pk).update(updated_at=timezone.now())
+        return name
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def add_reference(name, delta):
+    from .models import StoredFile
+
+    if name:
+        StoredFile.objects.filter(name=name).update(refs=Greatest(F('refs') + delta, 0), updated_at=timezone.now())
+
+
+def recount(references):
+    """
+    Reset every StoredFile's refs from {name: count} of the rows that refer to
+    files, registering referenced files that have no StoredFile row yet (e.g.
+    uploaded before this storage was used).
+    """
+    from .models import StoredFile
+
+    StoredFile.objects.exclude(name__in=references).update(refs=0)
+    for name, count in references.items():
+        size = content_addressed_storage.size(name) if content_addressed_storage.exists(name) else 0
+        StoredFile.objects.update_or_create(name=name, defaults={'refs': count}, create_defaults={'refs': count, 'size': size})
+
+
+def collect(grace=GRACE_PERIOD, dry_run=False):
+    """Delete files no row refers to (older than grace). Returns (files, bytes) removed."""
+    from .models import StoredFile
+
+    garbage = StoredFile.objects.filter(refs=0, updated_at__lt=timezone.now() - grace)
+    files = size = 0
+    for stored in garbage.iterator():
+        files += 1
+        size += stored.size
+        if not dry_run:
+            content_addressed_storage.delete(stored.name)
+            try:
+                os.rmdir(os.path.dirname(content_addressed_storage.path(stored.name)))
+            except OSError:  # other files still share the prefix directory
+                pass
+            # a save of the same content may have revived it meanwhile
+            StoredFile.objects.filter(pk=stored.pk, refs=0, updated_at=stored.updated_at).delete()
+    return files, size
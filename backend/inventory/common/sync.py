@@ -0,0 +1,101 @@
+# common/sync.py
+import base64
+import json
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from master.models import Contact, Product
+from master.serializers import ContactSerializer, ProductSerializer
+from transactions.models import PurchaseOrder, SalesOrder, Transaction
+from transactions.serializers import PurchaseOrderSerializer, SalesOrderSerializer, TransactionSerializer
+from .models import Tombstone
+
+PAGE_SIZE = 500
+
+# updated_at / deleted_at are stamped when the row is saved, not when its
+# transaction commits, so a slow writer can commit a row "behind" a cursor
+# that has already moved on. Rows younger than this are still sent, but the
+# cursor is not advanced past them, so they are sent again until they settle.
+OVERLAP = timedelta(seconds=60)
+
+# resource name in the URL -> (queryset, serializer)
+SYNC_RESOURCES = {
+    'contacts': (Contact.objects.select_related('metrics'), ContactSerializer),
+    'products': (Product.objects.all(), ProductSerializer),
+    'purchase-orders': (PurchaseOrder.objects.prefetch_related('items'), PurchaseOrderSerializer),
+    'sales-orders': (SalesOrder.objects.prefetch_related('items'), SalesOrderSerializer),
+    'transactions': (Transaction.objects.all(), TransactionSerializer),
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(position):
+    raw = json.dumps(position, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    A cursor holds the last (timestamp, id) seen in the change stream ("u")
+    and in the tombstone stream ("d"). An empty cursor means "from the start".
+    """
+    if not cursor:
+        return {'u': None, 'd': None}
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        position = json.loads(raw)
+        for key in ('u', 'd'):
+            if position[key] is not None:
+                timestamp, pk = position[key]
+                if parse_datetime(timestamp) is None or not isinstance(pk, int):
+                    raise ValueError
+        return position
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+
+
+def _after(queryset, field, position):
+    if position is None:
+        return queryset
+    timestamp, pk = position
+    timestamp = parse_datetime(timestamp)
+    return queryset.filter(Q(**{f'{field}__gt': timestamp}) | Q(**{field: timestamp, 'pk__gt': pk}))
+
+
+def _page(queryset, field, position, page_size, horizon):
+    """
+    Up to page_size rows after position. The position only moves over rows
+    older than horizon; has_more stays false once unsettled rows are reached.
+    """
+    rows = list(_after(queryset, field, position).order_by(field, 'pk')[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    settled = [row for row in rows if getattr(row, field) <= horizon]
+    if settled:
+        position = [getattr(settled[-1], field).isoformat(), settled[-1].pk]
+    return rows, position, has_more and len(settled) == len(rows)
+
+
+def changes(resource, cursor, page_size=PAGE_SIZE):
+    """Rows updated and deleted after the cursor, in (timestamp, id) order."""
+    queryset, serializer_class = SYNC_RESOURCES[resource]
+    position = decode_cursor(cursor)
+    label = queryset.model._meta.label_lower
+    horizon = timezone.now() - OVERLAP
+
+    updated, position['u'], more_updated = _page(queryset, 'updated_at', position['u'], page_size, horizon)
+    tombstones = Tombstone.objects.filter(resource=label).only('object_id', 'deleted_at')
+    deleted, position['d'], more_deleted = _page(tombstones, 'deleted_at', position['d'], page_size, horizon)
+
+    return {
+        'results': serializer_class(updated, many=True).data,
+        'deleted': [tombstone.object_id for tombstone in deleted],
+        'cursor': encode_cursor(position),
+        'has_more': more_updated or more_deleted,
+    }
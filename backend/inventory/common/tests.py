@@ -1,3 +1,533 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import uuid
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+
+from master.models import Contact
+from transactions.models import PurchaseOrder, Transaction
+from . import counters, events, jobs, middleware, pagination, renderers, singleflight, storage, sync
+from .cache import CACHE_ALIAS, bump_model_version, model_version
+from .models import Job, RowCount, StoredFile, Tombstone
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+from .throttles import RoleRateThrottle
+
+
+class ModelVersionTests(TestCase):
+    def test_versions_are_shared(self):
+        version = model_version(Contact)
+        self.assertEqual(caches[CACHE_ALIAS].get(f"model-version:{Contact._meta.label_lower}"), version)
+
+    def test_bump_changes_version(self):
+        version = model_version(Contact)
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_model_version(Contact)
+        self.assertNotEqual(model_version(Contact), version)
+
+    def test_write_bumps_version(self):
+        version = model_version(Contact)
+        Contact.objects.create(name='Vendor', type=Contact.VENDOR)
+        self.assertNotEqual(model_version(Contact), version)
+
+
+@jobs.task('tests.add')
+def add(job, a, b):
+    return a + b
+
+
+@jobs.task('tests.fail')
+def fail(job):
+    raise ValueError('boom')
+
+
+class JobQueueTests(TestCase):
+    def test_claim_takes_highest_priority_due_job(self):
+        jobs.enqueue('tests.add', a=1, b=1)
+        urgent = jobs.enqueue('tests.add', priority=5, a=1, b=2)
+        jobs.enqueue('tests.add', priority=9, run_after=timezone.now() + timedelta(hours=1), a=0, b=0)
+
+        self.assertEqual(jobs.claim_next('worker-a'), urgent.pk)
+        urgent.refresh_from_db()
+        self.assertEqual((urgent.status, urgent.locked_by, urgent.attempts), (Job.RUNNING, 'worker-a', 1))
+
+    def test_claimed_job_is_not_claimed_again(self):
+        job = jobs.enqueue('tests.add', a=1, b=1)
+        # another worker's UPDATE landed between our SELECT and UPDATE
+        Job.objects.filter(pk=job.pk).update(status=Job.RUNNING, locked_by='worker-b')
+        self.assertIsNone(jobs.claim_next('worker-a'))
+
+        job = jobs.enqueue('tests.add', a=1, b=1)
+        self.assertEqual(jobs.claim_next('worker-a'), job.pk)
+        self.assertIsNone(jobs.claim_next('worker-b'))
+
+    def test_success_stores_result(self):
+        job = jobs.enqueue('tests.add', a=2, b=3)
+        jobs.execute(jobs.claim_next('worker'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.progress), (Job.SUCCEEDED, 5, 100))
+
+    def run_failing(self):
+        started = timezone.now()
+        with self.assertLogs('common.jobs', 'ERROR'):
+            jobs.execute(jobs.claim_next('worker'))
+        return started
+
+    def test_failure_is_retried_with_backoff(self):
+        job = jobs.enqueue('tests.fail', max_attempts=3)
+        started = self.run_failing()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.QUEUED, 1, ''))
+        self.assertIn('boom', job.error)
+        self.assertGreaterEqual(job.run_after, started + timedelta(seconds=jobs.RETRY_BACKOFF_SECONDS))
+        self.assertIsNone(jobs.claim_next('worker'))  # not due yet
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        started = self.run_failing()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 2))
+        self.assertGreaterEqual(job.run_after, started + timedelta(seconds=2 * jobs.RETRY_BACKOFF_SECONDS))
+
+    def test_failure_after_max_attempts_is_final(self):
+        job = jobs.enqueue('tests.fail', max_attempts=1)
+        self.run_failing()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 1))
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(jobs.claim_next('worker'))
+
+    def test_stale_running_jobs_are_requeued(self):
+        job = jobs.enqueue('tests.add', a=1, b=1)
+        jobs.claim_next('worker')
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(jobs.requeue_stale(timedelta(hours=1)), 1)
+        self.assertEqual(jobs.claim_next('worker'), job.pk)
+
+
+class FastCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='x', role=User.OWNER)
+        vendor = Contact.objects.create(name='Vendor', type=Contact.VENDOR)
+        for status in (PurchaseOrder.DRAFT, PurchaseOrder.DRAFT, PurchaseOrder.CONFIRMED):
+            PurchaseOrder.objects.create(vendor=vendor, status=status)
+
+    def maintained_count(self, count):
+        RowCount.objects.update_or_create(resource='transactions.purchaseorder', defaults={'count': count})
+
+    def test_small_table_is_counted_exactly(self):
+        counters.recount(PurchaseOrder)
+        self.assertEqual(pagination.fast_count(PurchaseOrder.objects.all()), (3, True))
+
+    def test_large_table_uses_maintained_count(self):
+        self.maintained_count(50000)
+        self.assertEqual(pagination.fast_count(PurchaseOrder.objects.all()), (50000, False))
+        self.assertEqual(pagination.fast_count(PurchaseOrder.objects.all(), exact=True), (3, True))
+
+    def test_filtered_queryset_is_counted_exactly(self):
+        self.maintained_count(50000)
+        drafts = PurchaseOrder.objects.filter(status=PurchaseOrder.DRAFT)
+        self.assertEqual(pagination.fast_count(drafts), (2, True))
+        with mock.patch.object(pagination, 'COUNT_CAP', 1):
+            self.assertEqual(pagination.fast_count(drafts), (1, False))
+
+    def test_list_reports_whether_count_is_exact(self):
+        self.maintained_count(50000)
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.get('/api/transactions/purchase-orders/', {'limit': 2})
+        self.assertEqual((response.data['count'], response.data['count_exact']), (50000, False))
+        self.assertEqual(len(response.data['results']), 2)
+
+        response = client.get('/api/transactions/purchase-orders/', {'limit': 2, 'exact_count': 1})
+        self.assertEqual((response.data['count'], response.data['count_exact']), (3, True))
+        response = client.get('/api/transactions/purchase-orders/', {'limit': 2, 'status': 'draft'})
+        self.assertEqual((response.data['count'], response.data['count_exact']), (2, True))
+
+
+class MediaStorageTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.first = Contact.objects.create(name='First', type=Contact.CUSTOMER)
+        self.second = Contact.objects.create(name='Second', type=Contact.CUSTOMER)
+
+    def refs(self, name):
+        return StoredFile.objects.get(name=name).refs
+
+    def test_same_content_is_stored_once(self):
+        self.first.profile_image.save('one.JPG', ContentFile(b'same bytes'))
+        self.second.profile_image.save('two.jpg', ContentFile(b'same bytes'))
+
+        name = self.first.profile_image.name
+        self.assertEqual(self.second.profile_image.name, name)
+        self.assertRegex(name, r'^contacts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(len(os.listdir(os.path.dirname(storage.content_addressed_storage.path(name)))), 1)
+        self.assertEqual(self.refs(name), 2)
+
+    def test_references_follow_replace_and_delete(self):
+        self.first.profile_image.save('a.jpg', ContentFile(b'old'))
+        self.second.profile_image.save('a.jpg', ContentFile(b'old'))
+        old = self.first.profile_image.name
+
+        self.first.profile_image.save('b.jpg', ContentFile(b'new'))
+        new = self.first.profile_image.name
+        self.assertEqual((self.refs(old), self.refs(new)), (1, 1))
+
+        self.second.delete()
+        self.assertEqual(self.refs(old), 0)
+        self.first.profile_image = None
+        self.first.save()
+        self.assertEqual(self.refs(new), 0)
+
+    def test_collect_removes_only_unreferenced_files(self):
+        self.first.profile_image.save('a.jpg', ContentFile(b'kept'))
+        self.second.profile_image.save('b.jpg', ContentFile(b'dropped'))
+        kept, dropped = self.first.profile_image.name, self.second.profile_image.name
+        self.second.delete()
+
+        self.assertEqual(storage.collect(), (0, 0))  # still within the grace period
+        call_command('collect_media', grace_minutes=0, stdout=open(os.devnull, 'w'))
+        self.assertTrue(storage.content_addressed_storage.exists(kept))
+        self.assertFalse(storage.content_addressed_storage.exists(dropped))
+        self.assertFalse(StoredFile.objects.filter(name=dropped).exists())
+        self.assertEqual(self.refs(kept), 1)
+
+    def test_recount_repairs_reference_counts(self):
+        self.first.profile_image.save('a.jpg', ContentFile(b'kept'))
+        name = self.first.profile_image.name
+        StoredFile.objects.filter(name=name).update(refs=0)
+        call_command('collect_media', recount=True, grace_minutes=0, stdout=open(os.devnull, 'w'))
+        self.assertEqual(self.refs(name), 1)
+        self.assertTrue(storage.content_addressed_storage.exists(name))
+
+    def test_serve_media_headers(self):
+        self.first.profile_image.save('a.jpg', ContentFile(b'image'))
+        name = self.first.profile_image.name
+        url = f'/media/{name}'
+
+        with self.settings(MEDIA_SENDFILE='x-accel-redirect'):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{name}')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+        with self.settings(MEDIA_SENDFILE='x-sendfile'):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media_root, name))
+
+        with self.settings(MEDIA_SENDFILE=None):
+            response = self.client.get(url)
+        self.assertEqual(b''.join(response.streaming_content), b'image')
+
+    def test_private_media_needs_staff(self):
+        os.makedirs(os.path.join(self.media_root, 'imports'))
+        with open(os.path.join(self.media_root, 'imports', 'data.csv'), 'w') as fh:
+            fh.write('name')
+        self.assertEqual(self.client.get('/media/imports/data.csv').status_code, 404)
+        self.assertEqual(self.client.get('/media/contacts/../imports/data.csv').status_code, 404)
+
+        staff = User.objects.create_user('staff', password='x', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get('/media/imports/data.csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        self.settled = timezone.now() - sync.OVERLAP - timedelta(minutes=5)
+
+    def contact(self, name, updated_at):
+        contact = Contact.objects.create(name=name, type=Contact.CUSTOMER)
+        Contact.objects.filter(pk=contact.pk).update(updated_at=updated_at)
+        return contact
+
+    def names(self, page):
+        return [row['name'] for row in page['results']]
+
+    def test_pages_through_changes(self):
+        for i in range(3):
+            self.contact(f'C{i}', self.settled + timedelta(seconds=i))
+
+        first = sync.changes('contacts', None, page_size=2)
+        self.assertEqual((self.names(first), first['has_more']), (['C0', 'C1'], True))
+        second = sync.changes('contacts', first['cursor'], page_size=2)
+        self.assertEqual((self.names(second), second['has_more']), (['C2'], False))
+        self.assertEqual(self.names(sync.changes('contacts', second['cursor'], page_size=2)), [])
+
+    def test_delivers_tombstones(self):
+        pk = self.contact('Gone', self.settled).pk
+        cursor = sync.changes('contacts', None)['cursor']
+        Contact.objects.get(pk=pk).delete()
+
+        page = sync.changes('contacts', cursor)
+        self.assertEqual(page['deleted'], [pk])
+        # sent again until it settles, then the cursor moves past it
+        Tombstone.objects.update(deleted_at=self.settled + timedelta(minutes=1))
+        page = sync.changes('contacts', page['cursor'])
+        self.assertEqual(page['deleted'], [pk])
+        self.assertEqual(sync.changes('contacts', page['cursor'])['deleted'], [])
+
+    def test_late_commit_is_not_skipped(self):
+        now = timezone.now()
+        self.contact('Settled', self.settled)
+        self.contact('Recent', now - timedelta(seconds=5))
+        page = sync.changes('contacts', None)
+        self.assertEqual(self.names(page), ['Settled', 'Recent'])
+
+        # saved before "Recent" but committed after the client polled
+        self.contact('Late', now - timedelta(seconds=10))
+        page = sync.changes('contacts', page['cursor'])
+        self.assertEqual(self.names(page), ['Late', 'Recent'])
+
+    def test_unsettled_page_does_not_loop(self):
+        recent = timezone.now() - timedelta(seconds=5)
+        for i in range(3):
+            self.contact(f'C{i}', recent)
+        page = sync.changes('contacts', None, page_size=2)
+        self.assertFalse(page['has_more'])
+
+    def test_endpoint_rejects_bad_cursor(self):
+        owner = User.objects.create_user('owner', password='x', role=User.OWNER)
+        client = APIClient()
+        client.force_authenticate(owner)
+        self.assertEqual(client.get('/api/sync/contacts/', {'since': 'nope'}).status_code, 400)
+        self.assertEqual(client.get('/api/sync/nothing/').status_code, 404)
+        self.assertEqual(client.get('/api/sync/contacts/').status_code, 200)
+
+
+class SingleFlightTests(TestCase):
+    FOLLOWERS = 4
+
+    def setUp(self):
+        self.flights = singleflight.SingleFlight()
+        self.release = threading.Event()
+        self.waiting = threading.Semaphore(0)
+        self.calls = 0
+
+        waiting = self.waiting
+
+        class CountedEvent(threading.Event):
+            def wait(self, timeout=None):
+                waiting.release()
+                return super().wait(timeout)
+
+        class Call(singleflight._Call):
+            def __init__(self):
+                super().__init__()
+                self.done = CountedEvent()
+
+        patcher = mock.patch.object(singleflight, '_Call', Call)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def burst(self, func):
+        """The leader blocks in func until every follower is waiting on it."""
+        outcomes = []
+
+        def run():
+            try:
+                outcomes.append(('ok', self.flights.do('key', func)))
+            except Exception as exc:
+                outcomes.append(('error', exc))
+
+        leader = threading.Thread(target=run)
+        leader.start()
+        while 'key' not in self.flights._calls:
+            pass
+        followers = [threading.Thread(target=run) for _ in range(self.FOLLOWERS)]
+        for thread in followers:
+            thread.start()
+        for _ in followers:
+            self.assertTrue(self.waiting.acquire(timeout=5))
+        self.release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+        return outcomes
+
+    def compute(self):
+        self.calls += 1
+        self.release.wait(5)
+        return {'total': self.calls}
+
+    def test_concurrent_callers_share_one_call(self):
+        outcomes = self.burst(self.compute)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(outcomes, [('ok', {'total': 1})] * (self.FOLLOWERS + 1))
+        self.assertEqual(self.flights._calls, {})
+
+        # nothing is cached once the call is done
+        self.assertEqual(self.flights.do('key', self.compute), {'total': 2})
+
+    def test_error_reaches_every_waiter(self):
+        error = ValueError('report failed')
+
+        def fail():
+            self.compute()
+            raise error
+
+        outcomes = self.burst(fail)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(outcomes, [('error', error)] * (self.FOLLOWERS + 1))
+        self.assertEqual(self.flights._calls, {})
+
+
+@mock.patch.object(RoleRateThrottle, 'THROTTLE_RATES', {'reports': '2/min', 'reports:owner': '3/min'})
+class RoleRateThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def allowed(self, user, url='/api/reports/aging/', tries=5):
+        client = APIClient()
+        client.force_authenticate(user)
+        return sum(client.get(url).status_code == 200 for _ in range(tries))
+
+    def test_rate_depends_on_role(self):
+        owner = User.objects.create_user('owner', password='x', role=User.OWNER)
+        accountant = User.objects.create_user('accountant', password='x', role=User.ACCOUNTANT)
+        other = User.objects.create_user('other', password='x', role=User.ACCOUNTANT)
+
+        self.assertEqual(self.allowed(owner), 3)
+        self.assertEqual(self.allowed(accountant), 2)
+        self.assertEqual(self.allowed(other), 2)  # counted per user
+
+    def test_scope_without_rate_is_not_limited(self):
+        owner = User.objects.create_user('owner', password='x', role=User.OWNER)
+        self.assertEqual(self.allowed(owner, '/api/transactions/dashboard-data/', tries=10), 10)
+
+
+class EventStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='x', role=User.OWNER)
+
+    def record(self, amount, commit=True):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Transaction.objects.create(transaction_type='vendor_bill', amount=amount)
+                    if not commit:
+                        raise RuntimeError
+            except RuntimeError:
+                pass
+
+    async def test_only_committed_changes_are_pushed(self):
+        response = await self.async_client.get('/api/events/', {'token': str(AccessToken.for_user(self.owner))})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 5000\n\n")
+        self.assertEqual(events.broadcaster.subscriber_count, 1)
+
+        await sync_to_async(self.record)(Decimal('1.00'), commit=False)
+        await sync_to_async(self.record)(Decimal('2.00'))
+
+        message = (await asyncio.wait_for(anext(stream), 5)).decode()
+        self.assertIn("event: transaction\n", message)
+        data = json.loads(message.split("data: ", 1)[1])
+        self.assertEqual((data['action'], data['amount']), ('created', '2.00'))
+
+        # a client disconnect cancels the pending read, which unsubscribes
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(events.broadcaster.subscriber_count, 0)
+
+    async def test_needs_a_valid_token(self):
+        response = await self.async_client.get('/api/events/', {'token': 'nope'})
+        self.assertEqual(response.status_code, 401)
+
+
+class JSONParityTests(TestCase):
+    payload = {
+        'amount': Decimal('1250.50'),
+        'zero': Decimal('0.00'),
+        'created': datetime(2024, 3, 10, 9, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        'whole_second': datetime(2024, 3, 10, 9, 30, tzinfo=dt_timezone(timedelta(hours=5, minutes=30))),
+        'naive': datetime(2024, 3, 10, 9, 30),
+        'day': date(2024, 3, 10),
+        'at': time(9, 30, 15, 500),
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'label': gettext_lazy('Name'),
+        'note': 'line\u2028break\u2029é',
+        'items': [{'price': Decimal('9.99'), 'qty': 3}, None, True],
+        7: 'non-string key',
+    }
+
+    def test_renderers_match(self):
+        self.assertIsNotNone(renderers.orjson)
+        self.assertEqual(FastJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+
+    def test_indented_output_matches(self):
+        context = {'indent': 2}
+        self.assertEqual(
+            FastJSONRenderer().render(self.payload, 'application/json', context),
+            JSONRenderer().render(self.payload, 'application/json', context),
+        )
+
+    def test_parsers_match(self):
+        body = JSONRenderer().render(self.payload)
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+        latin = '{"name": "Caf\u00e9"}'.encode('latin-1')
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(latin), parser_context={'encoding': 'latin-1'}),
+                         {'name': 'Café'})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"name": '))
+
+
+class CompressionMiddlewareTests(TestCase):
+    body = b'{"rows": [' + b'{"name": "Contact", "amount": 12.5},' * 100 + b'{}]}'
+
+    def respond(self, accept_encoding, body=None, content_type='application/json'):
+        response = HttpResponse(self.body if body is None else body, content_type=content_type)
+        compress = middleware.CompressionMiddleware(lambda request: response)
+        return compress(RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    def test_brotli_when_accepted(self):
+        self.assertIsNotNone(middleware.brotli)
+        response = self.respond('gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(middleware.brotli.decompress(response.content), self.body)
+
+    def test_gzip_without_brotli(self):
+        response = self.respond('gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+        with mock.patch.object(middleware, 'brotli', None):
+            self.assertEqual(self.respond('br, gzip')['Content-Encoding'], 'gzip')
+
+    def test_left_alone(self):
+        self.assertFalse(self.respond('').has_header('Content-Encoding'))
+        self.assertFalse(self.respond('gzip, br', body=b'{"small": true}').has_header('Content-Encoding'))
+        response = self.respond('gzip, br', content_type='text/event-stream')
+        self.assertFalse(response.has_header('Content-Encoding'))
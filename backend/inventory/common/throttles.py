@@ -0,0 +1,41 @@
+# common/throttles.py
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class RoleRateThrottle(SimpleRateThrottle):
+    """
+    Per-user (per-IP when anonymous) throttle whose rate can depend on the
+    user's role: DEFAULT_THROTTLE_RATES['<scope>:<role>'] overrides
+    DEFAULT_THROTTLE_RATES['<scope>']. A scope without a rate is not limited.
+    """
+
+    def __init__(self):
+        # the rate is picked per request, once the user is known
+        pass
+
+    def allow_request(self, request, view):
+        role = getattr(request.user, 'role', None)
+        self.rate = self.THROTTLE_RATES.get(f"{self.scope}:{role}") or self.THROTTLE_RATES.get(self.scope)
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class DashboardThrottle(RoleRateThrottle):
+    scope = 'dashboard'
+
+
+class ReportThrottle(RoleRateThrottle):
+    scope = 'reports'
+
+
+class ExportThrottle(RoleRateThrottle):
+    scope = 'exports'
@@ -0,0 +1,12 @@
+from django.urls import path, include
+from rest_framework.routers import SimpleRouter
+from . import views
+
+router = SimpleRouter()  # no API root view at /api/
+router.register(r'jobs', views.JobViewSet, basename='job')
+
+urlpatterns = [
+    path('', include(router.urls)),
+    path('sync/<str:resource>/', views.changes_feed, name='changes-feed'),
+    path('events/', views.event_stream, name='event-stream'),
+]
@@ -1,3 +1,161 @@
 from django.shortcuts import render
 
 # Create your views here.
+import asyncio
+import mimetypes
+import os
+import posixpath
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.encoding import iri_to_uri
+from rest_framework import viewsets
+from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+from accounts.permissions import OwnerOrAccountantPermission
+from . import sync
+from .models import Job
+from .serializers import JobSerializer
+from .events import broadcaster
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, OwnerOrAccountantPermission])
+def changes_feed(request, resource):
+    """
+    Delta sync: GET /api/sync/<resource>/?since=<cursor>
+    Returns rows changed and ids deleted after the cursor, plus the cursor to
+    send next time. Without ?since= the whole table is returned page by page;
+    keep calling with the returned cursor while has_more is true. Rows changed
+    in the last sync.OVERLAP are sent again on the next call; apply by id.
+    """
+    if resource not in sync.SYNC_RESOURCES:
+        return Response({'detail': f"Unknown resource '{resource}'."}, status=404)
+    try:
+        return Response(sync.changes(resource, request.GET.get('since')))
+    except sync.InvalidCursor:
+        return Response({'since': ['Invalid cursor.']}, status=400)
+
+
+KEEPALIVE_SECONDS = 15
+
+
+def _stream_user(request):
+    """
+    EventSource cannot send an Authorization header, so the access token may
+    also be passed as ?token=.
+    """
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header else request.GET.get('token')
+    if not raw_token:
+        return None
+    try:
+        user = authenticator.get_user(authenticator.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return user if user.role in (user.OWNER, user.ACCOUNTANT) else None
+
+
+async def event_stream(request):
+    """
+    Server-sent events: GET /api/events/?token=<access token>
+    Pushes purchase_order, sales_order and transaction deltas as they are
+    committed, so dashboards update without polling dashboard-data/.
+    Needs an ASGI server (uvicorn/daphne inventory.asgi:application).
+    """
+    user = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided or are invalid.'}, status=401)
+
+    async def stream():
+        subscriber = broadcaster.subscribe()
+        _, queue = subscriber
+        try:
+            yield b"retry: 5000\n\n"
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Background job status for polling; accountants only see their own jobs."""
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated, OwnerOrAccountantPermission]
+
+    def get_queryset(self):
+        queryset = Job.objects.order_by('-id')
+        if not self.request.user.is_owner():
+            queryset = queryset.filter(created_by=self.request.user)
+        if self.request.query_params.get('status'):
+            queryset = queryset.filter(status=self.request.query_params['status'])
+        return queryset
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        job = self.get_object()
+        if not Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(status=Job.CANCELLED):
+            return Response({'detail': f'Only queued jobs can be cancelled (job is {job.status}).'}, status=400)
+        job.refresh_from_db()
+        return Response(JobSerializer(job).data)
+
+
+# ----------------------------
+# Media
+# ----------------------------
+# content-addressed names (common/storage.py) never change content
+IMMUTABLE_MEDIA = re.compile(r'/[0-9a-f]{2}/[0-9a-f]{64}(\.[\w]+)?$')
+
+
+def serve_media(request, path):
+    """
+    Media files, sent by the front server when MEDIA_SENDFILE is set
+    (X-Accel-Redirect / X-Sendfile) so no worker is tied up streaming them.
+    Only PUBLIC_MEDIA_PREFIXES are served to anyone; the rest needs staff.
+    """
+    # Normalise first so 'contacts/../imports/x' can't borrow a public prefix.
+    path = posixpath.normpath(path).lstrip('/')
+    if not path.startswith(settings.PUBLIC_MEDIA_PREFIXES) and not request.user.is_staff:
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = iri_to_uri(settings.MEDIA_ACCEL_PREFIX + path)
+    elif settings.MEDIA_SENDFILE == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+    else:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    if encoding:
+        response['Content-Encoding'] = encoding
+
+    if not path.startswith(settings.PUBLIC_MEDIA_PREFIXES):
+        response['Cache-Control'] = 'private, no-cache'
+    elif IMMUTABLE_MEDIA.search(path):
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response['Cache-Control'] = 'public, max-age=3600'
+    return response
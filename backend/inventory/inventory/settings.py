@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     'rest_framework',
     'rest_framework.authtoken',
+    'rest_framework_simplejwt.token_blacklist',
     'accounts',
     'master',
     'transactions',
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "common.middleware.CompressionMiddleware",  # gzip/brotli for large responses
     "django.middleware.common.CommonMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -97,6 +99,27 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
+    # orjson-backed when installed, plain DRF JSON otherwise
+    'DEFAULT_RENDERER_CLASSES': [
+        'common.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'common.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # only paginates when ?limit is given; counts are approximate on large tables
+    'DEFAULT_PAGINATION_CLASS': 'common.pagination.FastCountPagination',
+    'DEFAULT_THROTTLE_RATES': {
+        'check_username': '120/min',  # one call per keystroke on the registration form
+        # heavy reads, per user; '<scope>:<role>' overrides the scope's rate
+        'dashboard': '30/min',
+        'reports': '20/min',
+        'reports:owner': '60/min',
+        'exports': '5/min',
+        'exports:owner': '20/min',
+    },
 }
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -140,6 +163,14 @@ AUTH_USER_MODEL = 'accounts.User'
 # settings.py
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# How /media/ responses are handed to the front server (common/views.py):
+# 'x-accel-redirect' (nginx: an `internal` location at MEDIA_ACCEL_PREFIX
+# aliased to MEDIA_ROOT), 'x-sendfile' (Apache mod_xsendfile, lighttpd), or
+# None to stream the file from Django
+MEDIA_SENDFILE = None if DEBUG else 'x-accel-redirect'
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# served to anyone; other media directories (imports, archives) to staff only
+PUBLIC_MEDIA_PREFIXES = ('contacts/',)
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
@@ -150,4 +181,29 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),     # default
     "ROTATE_REFRESH_TOKENS": True,                   # issue new refresh on use
     "BLACKLIST_AFTER_ROTATION": True,
+    # blacklist checks answered from the revoked-token cache (accounts/tokens.py)
+    "TOKEN_OBTAIN_SERIALIZER": "accounts.tokens.TokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "accounts.tokens.TokenRefreshSerializer",
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # shared by every worker process on the host; point it at redis/memcached
+    # when workers run on several hosts
+    "tokens": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "tokens",
+        "OPTIONS": {"MAX_ENTRIES": 200000},
+    },
+    # model version counters (common/cache.py): every worker must see the same
+    # versions, or each caches and builds bundles under its own
+    "versions": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "versions",
+    },
 }
+
+# gzip'd master-data bundles served by /api/master/bootstrap/ (master/bootstrap.py)
+BOOTSTRAP_ROOT = BASE_DIR / "cache" / "bootstrap"
@@ -19,7 +19,7 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework.authtoken import views
 from django.conf import settings
-from django.conf.urls.static import static
+from common.views import serve_media
 
 
 urlpatterns = [
@@ -28,8 +28,11 @@ urlpatterns = [
     path('api/auth/', views.obtain_auth_token), 
      path('api/transactions/', include('transactions.urls')),
      path('api/master/', include('master.urls')),
+     path('api/reports/', include('reports.urls')),
+     path('api/', include('common.urls')),
+     path(settings.MEDIA_URL.lstrip('/') + '<path:path>', serve_media, name='media'),
 
  # login to get token
  # link to accounts app
 
-]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
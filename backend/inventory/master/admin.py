@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Contact, Product, Tax, ChartOfAccounts
+from .models import Contact, Product, Tax, ChartOfAccounts, ImportJob
 
 @admin.register(Contact)
 class ContactAdmin(admin.ModelAdmin):
@@ -27,3 +27,10 @@ class ChartOfAccountsAdmin(admin.ModelAdmin):
     list_display = ('name', 'account_type')
     search_fields = ('name',)
     list_filter = ('account_type',)
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'resource', 'status', 'rows_processed', 'rows_imported', 'rows_failed', 'created_at')
+    list_filter = ('resource', 'status')
+    readonly_fields = ('rows_processed', 'rows_imported', 'rows_failed', 'errors', 'message')
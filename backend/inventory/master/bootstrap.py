@@ -0,0 +1,86 @@
+# master/bootstrap.py
+import gzip
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+
+from accounts.models import User
+from common.cache import model_versions
+from common.renderers import FastJSONRenderer
+from .models import ChartOfAccounts, Contact, Product, Tax
+from .serializers import BundleContactSerializer, ChartOfAccountsSerializer, ProductSerializer, TaxSerializer
+
+# bundle key -> (queryset, serializer)
+DATASETS = {
+    'contacts': (Contact.objects.order_by('pk'), BundleContactSerializer),
+    'products': (Product.objects.order_by('pk'), ProductSerializer),
+    'taxes': (Tax.objects.order_by('pk'), TaxSerializer),
+    'chart_of_accounts': (ChartOfAccounts.objects.order_by('pk'), ChartOfAccountsSerializer),
+}
+# what each role's bundle carries; both roles read all master data today
+ROLE_DATASETS = {
+    User.OWNER: tuple(DATASETS),
+    User.ACCOUNTANT: tuple(DATASETS),
+}
+BUNDLE_MODELS = (Contact, Product, Tax, ChartOfAccounts)
+MEMO_SECONDS = 3600
+STALE_SECONDS = 600  # superseded files are kept this long for workers still reading them
+
+
+def _build(role):
+    data = {
+        name: serializer(queryset.all(), many=True).data
+        for name, (queryset, serializer) in DATASETS.items()
+        if name in ROLE_DATASETS[role]
+    }
+    # mtime=0: the same data always compresses to the same bytes, so the hash
+    # only changes when the content does
+    return gzip.compress(FastJSONRenderer().render(data), compresslevel=9, mtime=0)
+
+
+def _write(directory, name, body):
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as fh:
+        fh.write(body)
+    os.replace(temporary, directory / name)  # atomic: readers never see a partial file
+    # another worker may have just read the previous versions, or be writing
+    # its own temporary file; only prune what nobody can still be using
+    cutoff = time.time() - STALE_SECONDS
+    for stale in directory.iterdir():
+        try:
+            if stale.name != name and stale.stat().st_mtime < cutoff:
+                stale.unlink()
+        except FileNotFoundError:  # pruned by another worker
+            pass
+
+
+def bundle(role):
+    """
+    (content hash, gzip'd JSON) of the master data a role can see. Built once
+    per change of the master models' shared versions into a file under
+    BOOTSTRAP_ROOT that all workers reuse, and memoized per process under
+    those versions.
+    """
+    versions = model_versions(*BUNDLE_MODELS)
+    key = f"bootstrap:{role}:{versions}"
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    directory = Path(settings.BOOTSTRAP_ROOT) / role
+    name = f"{versions}.json.gz"
+    try:
+        body = (directory / name).read_bytes()
+    except FileNotFoundError:
+        body = _build(role)
+        _write(directory, name, body)
+
+    result = (hashlib.sha256(body).hexdigest(), body)
+    cache.set(key, result, timeout=MEMO_SECONDS)
+    return result
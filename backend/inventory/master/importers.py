@@ -0,0 +1,118 @@
+# master/importers.py
+import csv
+import io
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+
+from common.cache import bump_model_version
+from .models import Contact, Product, ImportJob
+from .serializers import ContactSerializer, ProductSerializer
+
+CHUNK_SIZE = 1000
+
+IMPORTERS = {
+    ImportJob.CONTACT: (Contact, ContactSerializer),
+    ImportJob.PRODUCT: (Product, ProductSerializer),
+}
+
+
+def iter_chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def clean_row(row):
+    # Empty cells are dropped so nullable fields fall back to their defaults
+    return {
+        key.strip(): value.strip()
+        for key, value in row.items()
+        if key and value is not None and value.strip() != ''
+    }
+
+
+def insert_chunk(model, rows, batch_size):
+    """
+    bulk_create a chunk of (row number, instance); if the database rejects it,
+    insert row by row so only the offending rows fail, reported by number, and
+    the import still moves past them. Returns (rows imported, row errors).
+    """
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create([obj for _, obj in rows], batch_size=batch_size)
+        return len(rows), []
+    except IntegrityError:
+        pass
+
+    imported, errors = 0, []
+    for row_number, obj in rows:
+        obj.pk, obj._state.adding = None, True  # may have been set by the rolled back insert
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([obj])
+            imported += 1
+        except IntegrityError as exc:
+            errors.append({'row': row_number, 'errors': {'non_field_errors': [str(exc)]}})
+    return imported, errors
+
+
+def run_import(job, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Stream job.file through csv.DictReader and import it chunk by chunk.
+    Rows already counted in job.rows_processed are skipped, so calling this
+    again on a failed job resumes where it stopped. Rows rejected by the
+    serializer or the database are counted as failed, with their row numbers in
+    job.errors. progress(percent, message) is called after every chunk when given.
+    """
+    model, serializer_class = IMPORTERS[job.resource]
+
+    job.status = ImportJob.RUNNING
+    job.message = ''
+    job.save(update_fields=['status', 'message', 'updated_at'])
+
+    try:
+        size = job.file.size or 1
+        with job.file.open('rb') as fh:
+            reader = csv.DictReader(io.TextIOWrapper(fh, encoding='utf-8-sig', newline=''))
+            # header is line 1, so data rows start at 2
+            rows = islice(enumerate(reader, start=2), job.rows_processed, None)
+
+            for chunk in iter_chunks(rows, chunk_size):
+                objects, errors = [], []
+                for row_number, row in chunk:
+                    serializer = serializer_class(data=clean_row(row))
+                    if serializer.is_valid():
+                        objects.append((row_number, model(**serializer.validated_data)))
+                    else:
+                        errors.append({'row': row_number, 'errors': serializer.errors})
+
+                with transaction.atomic():
+                    imported, rejected = insert_chunk(model, objects, chunk_size)
+                    errors = sorted(errors + rejected, key=lambda error: error['row'])
+                    bump_model_version(model)  # bulk_create sends no post_save
+                    job.rows_processed += len(chunk)
+                    job.rows_imported += imported
+                    job.rows_failed += len(errors)
+                    room = ImportJob.MAX_ERRORS - len(job.errors)
+                    if room > 0:
+                        job.errors.extend(errors[:room])
+                    job.save(update_fields=[
+                        'rows_processed', 'rows_imported', 'rows_failed', 'errors', 'updated_at'
+                    ])
+                if progress is not None:
+                    progress(100 * fh.tell() / size, f"{job.rows_processed} rows processed")
+    except Exception as exc:
+        # counters of the chunk that failed were rolled back with it
+        job.refresh_from_db(fields=['rows_processed', 'rows_imported', 'rows_failed', 'errors'])
+        job.status = ImportJob.FAILED
+        job.message = str(exc)
+        job.save(update_fields=['status', 'message', 'updated_at'])
+        return job
+
+    job.status = ImportJob.COMPLETED
+    job.save(update_fields=['status', 'updated_at'])
+    return job
@@ -0,0 +1,44 @@
+from pathlib import Path
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from master.importers import CHUNK_SIZE, run_import
+from master.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = "Import contacts or products from a CSV file in chunks (resumable with --resume)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', nargs='?', choices=[ImportJob.CONTACT, ImportJob.PRODUCT])
+        parser.add_argument('path', nargs='?')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--resume', type=int, metavar='JOB_ID', help="Resume a failed import job")
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            try:
+                job = ImportJob.objects.get(pk=options['resume'])
+            except ImportJob.DoesNotExist:
+                raise CommandError(f"Import job {options['resume']} does not exist")
+            if job.status == ImportJob.COMPLETED:
+                raise CommandError(f"Import job {job.id} already completed")
+        else:
+            if not options['resource'] or not options['path']:
+                raise CommandError("resource and path are required unless --resume is given")
+            path = Path(options['path'])
+            if not path.is_file():
+                raise CommandError(f"{path} is not a file")
+            with path.open('rb') as fh:
+                job = ImportJob.objects.create(resource=options['resource'], file=File(fh, name=path.name))
+
+        run_import(job, chunk_size=options['chunk_size'])
+
+        summary = (
+            f"Import {job.id}: {job.rows_processed} rows processed, "
+            f"{job.rows_imported} imported, {job.rows_failed} rejected"
+        )
+        if job.status == ImportJob.FAILED:
+            raise CommandError(f"{summary}. Failed: {job.message}. Resume with --resume {job.id}")
+        self.stdout.write(self.style.SUCCESS(summary))
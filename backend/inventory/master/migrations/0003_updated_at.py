@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("master", "0002_importjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contact",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
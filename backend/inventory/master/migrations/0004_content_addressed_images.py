@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:39
+
+import common.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("master", "0003_updated_at"),
+        ("common", "0004_storedfile"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="contact",
+            name="profile_image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=common.storage.ContentAddressedStorage(),
+                upload_to="contacts/",
+            ),
+        ),
+    ]
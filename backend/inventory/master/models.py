@@ -4,6 +4,8 @@ from django.db import models
 # master/models.py
 from django.db import models
 
+from common.storage import content_addressed_storage
+
 class Contact(models.Model):
     CUSTOMER = 'customer'
     VENDOR = 'vendor'
@@ -21,7 +23,10 @@ class Contact(models.Model):
     city = models.CharField(max_length=50, blank=True, null=True)
     state = models.CharField(max_length=50, blank=True, null=True)
     pincode = models.CharField(max_length=10, blank=True, null=True)
-    profile_image = models.ImageField(upload_to='contacts/', blank=True, null=True)
+    profile_image = models.ImageField(
+        upload_to='contacts/', storage=content_addressed_storage, blank=True, null=True
+    )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.name} ({self.type})"
@@ -44,6 +49,7 @@ class Product(models.Model):
     purchase_tax_percent = models.DecimalField(max_digits=5, decimal_places=2)
     hsn_code = models.CharField(max_length=20, blank=True, null=True)
     category = models.CharField(max_length=50, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
@@ -95,3 +101,42 @@ class ChartOfAccounts(models.Model):
 
     def __str__(self):
         return f"{self.name} ({self.account_type})"
+
+
+
+class ImportJob(models.Model):
+    CONTACT = 'contact'
+    PRODUCT = 'product'
+    RESOURCE_CHOICES = [
+        (CONTACT, 'Contacts'),
+        (PRODUCT, 'Products'),
+    ]
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    COMPLETED = 'completed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+        (COMPLETED, 'Completed'),
+    ]
+
+    resource = models.CharField(max_length=10, choices=RESOURCE_CHOICES)
+    file = models.FileField(upload_to='imports/')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    # rows_processed is committed together with each chunk, so a failed
+    # import resumes right after the last chunk that made it to the database
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_imported = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)  # first MAX_ERRORS row errors
+    message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    MAX_ERRORS = 100
+
+    def __str__(self):
+        return f"Import {self.id} ({self.resource}, {self.status})"
@@ -1,7 +1,23 @@
 from rest_framework import serializers
-from .models import Contact, Product, Tax, ChartOfAccounts
+from .models import Contact, Product, Tax, ChartOfAccounts, ImportJob
+from reports.models import CustomerMetrics
+
+class CustomerMetricsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CustomerMetrics
+        exclude = ['customer']
+
 
 class ContactSerializer(serializers.ModelSerializer):
+    metrics = CustomerMetricsSerializer(read_only=True)  # None for contacts without sales
+
+    class Meta:
+        model = Contact
+        fields = '__all__'
+
+class BundleContactSerializer(serializers.ModelSerializer):
+    """Contact without its sales metrics, which change with every order (see master/bootstrap.py)."""
+
     class Meta:
         model = Contact
         fields = '__all__'
@@ -20,3 +36,12 @@ class ChartOfAccountsSerializer(serializers.ModelSerializer):
     class Meta:
         model = ChartOfAccounts
         fields = '__all__'
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = '__all__'
+        read_only_fields = [
+            'resource', 'status', 'rows_processed', 'rows_imported', 'rows_failed',
+            'errors', 'message', 'created_at', 'updated_at'
+        ]
@@ -0,0 +1,21 @@
+# master/tasks.py
+from common import jobs
+from .importers import CHUNK_SIZE, run_import
+from .models import ImportJob
+
+
+@jobs.task('master.import_csv')
+def import_csv(job, import_job_id, chunk_size=CHUNK_SIZE):
+    import_job = ImportJob.objects.get(pk=import_job_id)
+    if import_job.status == ImportJob.COMPLETED:
+        return {'rows_imported': import_job.rows_imported}
+    run_import(import_job, chunk_size=chunk_size, progress=job.set_progress)
+    if import_job.status == ImportJob.FAILED:
+        # a retry resumes after the last committed chunk
+        raise RuntimeError(import_job.message)
+    return {
+        'import_job': import_job.id,
+        'rows_processed': import_job.rows_processed,
+        'rows_imported': import_job.rows_imported,
+        'rows_failed': import_job.rows_failed,
+    }
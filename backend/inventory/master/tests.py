@@ -1,3 +1,140 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from common.models import Job
+from . import bootstrap, importers, views
+from .models import Contact, ImportJob
+
+
+class BootstrapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='x', role=User.OWNER)
+        Contact.objects.create(name='Vendor', type=Contact.VENDOR)
+
+    def setUp(self):
+        cache.clear()  # bundles memoized by earlier tests, whose rows were rolled back
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = Path(root.name)
+        settings = override_settings(BOOTSTRAP_ROOT=root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get('/api/master/bootstrap/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual([contact['name'] for contact in data['contacts']], ['Vendor'])
+        etag = response['ETag']
+
+        response = self.client.get('/api/master/bootstrap/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/api/master/bootstrap/', {'version': etag.strip('"')})
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_builds_new_bundle(self):
+        etag = self.client.get('/api/master/bootstrap/')['ETag']
+        Contact.objects.create(name='Customer', type=Contact.CUSTOMER)
+
+        response = self.client.get('/api/master/bootstrap/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(json.loads(response.content)['contacts']), 2)
+
+    def test_write_keeps_recent_files(self):
+        directory = self.root / User.OWNER
+        directory.mkdir()
+        recent, old = directory / 'recent.json.gz', directory / 'old.json.gz'
+        recent.write_bytes(b'')
+        old.write_bytes(b'')
+        expired = time.time() - bootstrap.STALE_SECONDS - 1
+        os.utime(old, (expired, expired))
+
+        bootstrap._write(directory, 'current.json.gz', b'body')
+        self.assertEqual(sorted(path.name for path in directory.iterdir()), ['current.json.gz', 'recent.json.gz'])
+
+
+class CsvImportTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def import_job(self, *names):
+        lines = ['name,type', *(f'{name},vendor' for name in names)]
+        upload = ContentFile('\n'.join(lines).encode(), name='contacts.csv')
+        return ImportJob.objects.create(resource=ImportJob.CONTACT, file=upload)
+
+    def test_invalid_rows_are_reported(self):
+        job = importers.run_import(self.import_job('Acme', '', 'Globex'))
+        self.assertEqual(job.status, ImportJob.COMPLETED)
+        self.assertEqual((job.rows_processed, job.rows_imported, job.rows_failed), (3, 2, 1))
+        self.assertEqual(job.errors[0]['row'], 3)
+
+    def test_rows_rejected_by_database_are_skipped(self):
+        bulk_create = type(Contact.objects).bulk_create
+
+        def reject_bad(manager, objs, *args, **kwargs):
+            if any(obj.name == 'Bad' for obj in objs):
+                raise IntegrityError('rejected')
+            return bulk_create(manager, objs, *args, **kwargs)
+
+        with mock.patch.object(type(Contact.objects), 'bulk_create', autospec=True, side_effect=reject_bad):
+            job = importers.run_import(self.import_job('Acme', 'Bad', 'Globex', 'Initech'), chunk_size=2)
+
+        self.assertEqual(job.status, ImportJob.COMPLETED)
+        self.assertEqual((job.rows_processed, job.rows_imported, job.rows_failed), (4, 3, 1))
+        self.assertEqual(job.errors, [{'row': 3, 'errors': {'non_field_errors': ['rejected']}}])
+        self.assertEqual(sorted(Contact.objects.values_list('name', flat=True)), ['Acme', 'Globex', 'Initech'])
+
+
+class CsvImportEndpointTests(TestCase):
+    url = '/api/master/contacts/import/'
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('owner', password='x', role=User.OWNER))
+
+    def upload(self, query='', rows=2):
+        body = '\n'.join(['name,type', *(f'Vendor {n},vendor' for n in range(rows))]).encode()
+        return self.client.post(self.url + query, {'file': ContentFile(body, name='contacts.csv')}, format='multipart')
+
+    def test_small_file_is_imported_in_the_request(self):
+        response = self.upload()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['rows_imported'], 2)
+        self.assertFalse(Job.objects.exists())
+
+    def test_large_file_is_queued(self):
+        with mock.patch.object(views, 'BACKGROUND_IMPORT_BYTES', 100):
+            response = self.upload(rows=20)
+            self.assertEqual(response.status_code, 202)
+            job = Job.objects.get(pk=response.data['job'])
+            self.assertEqual((job.task, job.kwargs), ('master.import_csv', {'import_job_id': response.data['id']}))
+            self.assertFalse(Contact.objects.exists())
+
+            self.assertEqual(self.upload('?background=0', rows=20).status_code, 201)
+        self.assertEqual(self.upload('?background=1').status_code, 202)
@@ -1,13 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ContactViewSet, ProductViewSet, TaxViewSet, ChartOfAccountsViewSet
+from .views import ContactViewSet, ProductViewSet, TaxViewSet, ChartOfAccountsViewSet, ImportJobViewSet, bootstrap
 
 router = DefaultRouter()
 router.register(r'contacts', ContactViewSet)
 router.register(r'products', ProductViewSet)
 router.register(r'taxes', TaxViewSet)
 router.register(r'chart-of-accounts', ChartOfAccountsViewSet)
+router.register(r'imports', ImportJobViewSet)
 
 urlpatterns = [
+    path('bootstrap/', bootstrap, name='bootstrap'),
     path('', include(router.urls)),
 ]
@@ -2,21 +2,119 @@ from django.shortcuts import render
 
 
 # Create your views here.
-from rest_framework import viewsets
+from decimal import Decimal
+
+import gzip
+
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework import viewsets, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
-from .models import Contact, Product, Tax, ChartOfAccounts
-from .serializers import ContactSerializer, ProductSerializer, TaxSerializer, ChartOfAccountsSerializer
+from rest_framework.response import Response
+from .models import Contact, Product, Tax, ChartOfAccounts, ImportJob
+from .serializers import (
+    ContactSerializer, ProductSerializer, TaxSerializer, ChartOfAccountsSerializer,
+    ImportJobSerializer
+)
+from .bootstrap import bundle
+from .importers import run_import
 from accounts.permissions import OwnerOrAccountantPermission
+from common import jobs
+
+
+# Uploads this large (roughly 10k contact rows) are imported by `run_worker`
+# instead of holding the request open while the rows are validated.
+BACKGROUND_IMPORT_BYTES = 1024 * 1024
+
+
+class CsvImportMixin:
+    """
+    Adds POST <resource>/import/ taking a multipart `file` CSV upload.
+    Files of BACKGROUND_IMPORT_BYTES or more (or any file with ?background=1)
+    are queued for `run_worker` and the response (202) carries the id of the
+    job to poll at /api/jobs/<id>/. Smaller files are imported in the request
+    (201) unless ?background=0 forces that for a larger one too.
+    """
+    import_resource = None
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_csv(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': ['A CSV file is required.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        background = request.query_params.get('background')
+        if background is None:
+            background = upload.size >= BACKGROUND_IMPORT_BYTES
+        else:
+            background = background.lower() not in ('0', 'false', 'no', '')
+
+        import_job = ImportJob.objects.create(resource=self.import_resource, file=upload)
+        if background:
+            job = jobs.enqueue('master.import_csv', created_by=request.user, import_job_id=import_job.id)
+            data = dict(ImportJobSerializer(import_job).data, job=job.id)
+            return Response(data, status=status.HTTP_202_ACCEPTED)
+
+        run_import(import_job)
+        return Response(ImportJobSerializer(import_job).data, status=status.HTTP_201_CREATED)
 
-class ContactViewSet(viewsets.ModelViewSet):
-    queryset = Contact.objects.all()
+
+class ContactViewSet(CsvImportMixin, viewsets.ModelViewSet):
+    """
+    Customer list filters: ?type=, ?segment=, ?min_ltv=, ?max_ltv=, ?min_orders=
+    and ?ordering= one of ORDERING_FIELDS (prefix with '-' for descending).
+    The metric filters and orderings hit the indexed CustomerMetrics columns.
+    """
+    queryset = Contact.objects.select_related('metrics')
     serializer_class = ContactSerializer
     permission_classes = [IsAuthenticated, OwnerOrAccountantPermission]
+    import_resource = ImportJob.CONTACT
+
+    ORDERING_FIELDS = {
+        'name': 'name',
+        'lifetime_value': 'metrics__lifetime_value',
+        'order_count': 'metrics__order_count',
+        'last_order_date': 'metrics__last_order_date',
+    }
+    METRIC_FILTERS = {
+        'min_ltv': ('metrics__lifetime_value__gte', Decimal),
+        'max_ltv': ('metrics__lifetime_value__lte', Decimal),
+        'min_orders': ('metrics__order_count__gte', int),
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+
+        if params.get('type'):
+            queryset = queryset.filter(type=params['type'])
+        if params.get('segment'):
+            queryset = queryset.filter(metrics__segment=params['segment'])
+        for param, (lookup, cast) in self.METRIC_FILTERS.items():
+            if params.get(param):
+                try:
+                    queryset = queryset.filter(**{lookup: cast(params[param])})
+                except (ValueError, ArithmeticError):
+                    raise ValidationError({param: ['Must be a number.']})
+
+        ordering = params.get('ordering')
+        if ordering:
+            field = self.ORDERING_FIELDS.get(ordering.lstrip('-'))
+            if field is None:
+                raise ValidationError({'ordering': [f"Must be one of {', '.join(self.ORDERING_FIELDS)}."]})
+            expression = F(field).desc(nulls_last=True) if ordering.startswith('-') else F(field).asc(nulls_last=True)
+            queryset = queryset.order_by(expression, 'pk')
+        return queryset
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(CsvImportMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated, OwnerOrAccountantPermission]
+    import_resource = ImportJob.PRODUCT
 
 class TaxViewSet(viewsets.ModelViewSet):
     queryset = Tax.objects.all()
@@ -27,3 +125,40 @@ class ChartOfAccountsViewSet(viewsets.ModelViewSet):
     queryset = ChartOfAccounts.objects.all()
     serializer_class = ChartOfAccountsSerializer
     permission_classes = [IsAuthenticated, OwnerOrAccountantPermission]
+
+class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = ImportJob.objects.order_by('-id')
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAuthenticated, OwnerOrAccountantPermission]
+
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        job = self.get_object()
+        if job.status == ImportJob.COMPLETED:
+            return Response({'detail': 'Import already completed.'}, status=status.HTTP_400_BAD_REQUEST)
+        run_import(job)
+        return Response(ImportJobSerializer(job).data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, OwnerOrAccountantPermission])
+def bootstrap(request):
+    """
+    All master data the user's role can see, as one gzip'd JSON file rebuilt
+    only when a master model changes. The ETag is the content hash: send it
+    back as If-None-Match (or ?version=<hash>) to get an empty 304 while it
+    is current.
+    """
+    digest, body = bundle(request.user.role)
+    etag = f'"{digest}"'
+    if request.GET.get('version') == digest or etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=304)
+    elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = HttpResponse(body, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(gzip.decompress(body), content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ('Accept-Encoding', 'Authorization'))
+    return response
@@ -1,3 +1,42 @@
 from django.contrib import admin
 
 # Register your models here.
+from .models import CustomerMetrics, Leaderboard, LeaderboardEntry, OrderCube
+
+
+@admin.register(CustomerMetrics)
+class CustomerMetricsAdmin(admin.ModelAdmin):
+    list_display = (
+        'customer', 'segment', 'order_count', 'lifetime_value', 'last_order_date',
+        'recency_score', 'frequency_score', 'monetary_score'
+    )
+    list_filter = ('segment',)
+    list_select_related = ('customer',)
+    search_fields = ('customer__name',)
+    ordering = ('-lifetime_value',)
+
+
+@admin.register(OrderCube)
+class OrderCubeAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'period', 'party', 'product', 'category', 'state', 'quantity', 'net', 'tax', 'gross')
+    list_filter = ('kind', 'period', 'category', 'state')
+    list_select_related = ('party', 'product')
+    search_fields = ('party__name', 'product__name')
+    ordering = ('-period',)
+
+
+class LeaderboardEntryInline(admin.TabularInline):
+    model = LeaderboardEntry
+    fields = ('product', 'customer', 'revenue', 'quantity')
+    readonly_fields = fields
+    ordering = ('-revenue',)
+    extra = 0
+    can_delete = False
+
+
+@admin.register(Leaderboard)
+class LeaderboardAdmin(admin.ModelAdmin):
+    list_display = ('board', 'span', 'period', 'complete', 'updated_at')
+    list_filter = ('board', 'span', 'complete')
+    ordering = ('-period',)
+    inlines = [LeaderboardEntryInline]
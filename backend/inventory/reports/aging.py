@@ -0,0 +1,68 @@
+# reports/aging.py
+from datetime import timedelta
+
+from django.db.models import Q, Sum, Count, F
+from django.db.models.functions import Coalesce
+
+from transactions.models import PurchaseOrder, SalesOrder
+
+# (bucket, days overdue from, days overdue to); "current" is not yet due
+AGING_BUCKETS = [
+    ('current', None, 0),
+    ('1_30', 1, 30),
+    ('31_60', 31, 60),
+    ('61_90', 61, 90),
+    ('90_plus', 91, None),
+]
+
+
+def bucket_filters(as_of):
+    filters = {}
+    for name, low, high in AGING_BUCKETS:
+        q = Q()
+        if low is not None:
+            q &= Q(due_date__lte=as_of - timedelta(days=low))
+        if high is not None:
+            q &= Q(due_date__gte=as_of - timedelta(days=high))
+        filters[name] = q
+    return filters
+
+
+def aging_rows(queryset, party_field, due_date, as_of):
+    """
+    One grouped query over the open (outstanding_amount > 0) orders, which the
+    partial party/due-date indexes cover, with one conditional SUM per bucket.
+    """
+    buckets = {
+        name: Sum('outstanding_amount', filter=q, default=0)
+        for name, q in bucket_filters(as_of).items()
+    }
+    return (
+        queryset.filter(outstanding_amount__gt=0)
+        .alias(due_date=due_date)
+        .values(party_id=F(party_field), party_name=F(f'{party_field}__name'))
+        .annotate(**buckets, total=Sum('outstanding_amount'), orders=Count('id'))
+        .order_by('party_name', 'party_id')
+    )
+
+
+def summarize(rows):
+    totals = {name: 0 for name, _, _ in AGING_BUCKETS}
+    totals['total'] = 0
+    for row in rows:
+        for key in totals:
+            totals[key] += row[key]
+    return totals
+
+
+def payables(as_of):
+    # vendors are due on expected_date, falling back to the order date
+    rows = list(aging_rows(
+        PurchaseOrder.objects.all(), 'vendor', Coalesce('expected_date', 'order_date'), as_of
+    ))
+    return {'parties': rows, 'totals': summarize(rows)}
+
+
+def receivables(as_of):
+    rows = list(aging_rows(SalesOrder.objects.all(), 'customer', F('order_date'), as_of))
+    return {'parties': rows, 'totals': summarize(rows)}
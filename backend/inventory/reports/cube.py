@@ -0,0 +1,151 @@
+# reports/cube.py
+import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncQuarter, TruncYear
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from transactions.models import PurchaseOrder, PurchaseOrderItem, SalesOrder, SalesOrderItem
+from . import leaderboards
+from .models import Leaderboard, OrderCube
+
+# kind -> (order model, item model, item -> order field, order -> party field)
+KINDS = {
+    OrderCube.PURCHASES: (PurchaseOrder, PurchaseOrderItem, 'purchase_order', 'vendor'),
+    OrderCube.SALES: (SalesOrder, SalesOrderItem, 'sales_order', 'customer'),
+}
+ORDER_KINDS = {order_model: kind for kind, (order_model, *_) in KINDS.items()}
+
+PERIODS = {'month': TruncMonth, 'quarter': TruncQuarter, 'year': TruncYear}
+DIMENSIONS = ('kind', *PERIODS, 'party', 'product', 'category', 'city', 'state')
+# dimensions reported with a name next to their id
+NAMED = {'party': 'party__name', 'product': 'product__name'}
+MEASURES = {measure: Sum(measure) for measure in ('lines', 'quantity', 'net', 'tax', 'gross')}
+CENT = Decimal('0.01')
+BATCH_SIZE = 1000
+
+
+def month_of(date):
+    if isinstance(date, str):  # e.g. objects.create(order_date='2026-10-01')
+        date = parse_date(date) or parse_datetime(date)
+    if isinstance(date, datetime.datetime):  # e.g. order_date=timezone.now() before a reload
+        date = timezone.localdate(date) if timezone.is_aware(date) else date.date()
+    return date.replace(day=1)
+
+
+def _next_month(period):
+    return (period + datetime.timedelta(days=32)).replace(day=1)
+
+
+def excluded_statuses(order_model):
+    # drafts are not orders yet and cancelled ones never were (as in reports/metrics.py)
+    return [order_model.DRAFT, order_model.CANCELLED]
+
+
+def _lines(kind, **filters):
+    order_model, item_model, order_field, party_field = KINDS[kind]
+    party = f'{order_field}__{party_field}'
+    return item_model.objects.filter(**filters).exclude(
+        **{f'{order_field}__status__in': excluded_statuses(order_model)}
+    ).values_list(
+        f'{order_field}__order_date', party, 'product', 'product__category',
+        f'{party}__city', f'{party}__state', 'quantity', 'unit_price', 'tax_percent',
+    )
+
+
+def _aggregate(kind, lines):
+    """Sum order lines into cube cells, with the same line math as item.total."""
+    sums, cells = {}, []
+    for order_date, party, product, category, city, state, quantity, unit_price, tax_percent in lines:
+        key = (month_of(order_date), party, product)
+        if key not in sums:
+            sums[key] = [0, 0, Decimal('0'), Decimal('0'), (category or '', city or '', state or '')]
+        net = quantity * unit_price
+        cell = sums[key]
+        cell[0] += 1
+        cell[1] += quantity
+        cell[2] += net
+        cell[3] += net * tax_percent / 100
+    for (period, party, product), (count, quantity, net, tax, (category, city, state)) in sums.items():
+        cells.append(OrderCube(
+            kind=kind, period=period, party_id=party, product_id=product,
+            category=category, city=city, state=state, lines=count, quantity=quantity,
+            net=net.quantize(CENT), tax=tax.quantize(CENT), gross=(net + tax).quantize(CENT),
+        ))
+    return cells
+
+
+def refresh(kind, period, party_id):
+    """Recompute the cells of one party's month from its order lines, and the sales leaderboards they feed."""
+    _, _, order_field, party_field = KINDS[kind]
+    cells = _aggregate(kind, _lines(kind, **{
+        f'{order_field}__{party_field}': party_id,
+        f'{order_field}__order_date__gte': period,
+        f'{order_field}__order_date__lt': _next_month(period),
+    }))
+    with transaction.atomic():
+        current = OrderCube.objects.filter(kind=kind, party_id=party_id, period=period)
+        products = set(current.values_list('product_id', flat=True))
+        current.delete()
+        OrderCube.objects.bulk_create(cells)
+        if kind == OrderCube.SALES:
+            products.update(cell.product_id for cell in cells)
+            leaderboards.sales_changed(period, party_id, products)
+
+
+def refresh_orders(model, ids):
+    """Refresh every (month, party) touched by the given orders."""
+    party_field = KINDS[ORDER_KINDS[model]][3]
+    keys = model.objects.filter(pk__in=ids).values_list('order_date', f'{party_field}_id').distinct()
+    for period, party_id in {(month_of(date), party_id) for date, party_id in keys}:
+        refresh(ORDER_KINDS[model], period, party_id)
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """Full rebuild: one pass over each kind's order lines."""
+    count = 0
+    with transaction.atomic():
+        OrderCube.objects.all().delete()
+        for kind in KINDS:
+            cells = _aggregate(kind, _lines(kind).iterator(chunk_size=batch_size))
+            OrderCube.objects.bulk_create(cells, batch_size=batch_size)
+            count += len(cells)
+        Leaderboard.objects.all().delete()  # rebuilt from the new cube on first read
+    return count
+
+
+def rollup(by=(), kind=None, date_from=None, date_to=None, **filters):
+    """
+    Measures rolled up to the `by` dimensions, read from the cube only.
+    Dates select whole months; filters are equality on party, product,
+    category, city or state.
+    """
+    cells = OrderCube.objects.filter(**filters)
+    if kind:
+        cells = cells.filter(kind=kind)
+    if date_from:
+        cells = cells.filter(period__gte=month_of(date_from))
+    if date_to:
+        cells = cells.filter(period__lte=date_to)
+    if not by:
+        return [_rounded(cells.aggregate(**MEASURES))]
+
+    fields = []
+    for dimension in by:
+        if dimension in PERIODS:
+            cells = cells.annotate(**{dimension: PERIODS[dimension]('period')})
+        fields.append(dimension)
+        if dimension in NAMED:
+            cells = cells.annotate(**{f'{dimension}_name': F(NAMED[dimension])})
+            fields.append(f'{dimension}_name')
+    return [_rounded(row) for row in cells.values(*fields).annotate(**MEASURES).order_by(*fields)]
+
+
+def _rounded(row):
+    # decimal sums come back with float noise on some backends (SQLite)
+    for measure in ('net', 'tax', 'gross'):
+        row[measure] = Decimal(row[measure] or 0).quantize(CENT)
+    return row
@@ -0,0 +1,189 @@
+# reports/exports.py
+import csv
+import io
+from itertools import islice
+
+from django.db.models import F
+
+from transactions.models import (
+    PurchaseOrder, PurchaseOrderItem, SalesOrder, SalesOrderItem, Transaction
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: arrow/parquet exports are unavailable without it
+    pa = pq = None
+
+BATCH_SIZE = 10000
+
+# Column types, as arrow type factories so the module imports without pyarrow
+INT = 'int'
+STRING = 'string'
+DATE = 'date'
+BOOL = 'bool'
+MONEY = 'money'          # DecimalField(max_digits=12, decimal_places=2)
+PRICE = 'price'          # DecimalField(max_digits=10, decimal_places=2)
+PERCENT = 'percent'      # DecimalField(max_digits=5, decimal_places=2)
+
+
+def arrow_type(kind):
+    return {
+        INT: pa.int64,
+        STRING: pa.string,
+        DATE: pa.date32,
+        BOOL: pa.bool_,
+        MONEY: lambda: pa.decimal128(12, 2),
+        PRICE: lambda: pa.decimal128(10, 2),
+        PERCENT: lambda: pa.decimal128(5, 2),
+    }[kind]()
+
+
+# dataset -> (queryset, date column used by ?date_from/?date_to, [(column, expression, kind)])
+DATASETS = {
+    'transactions': (Transaction.objects.all(), 'date', [
+        ('id', 'id', INT),
+        ('transaction_type', 'transaction_type', STRING),
+        ('date', 'date', DATE),
+        ('amount', 'amount', MONEY),
+        ('content_type_id', 'content_type_id', INT),
+        ('object_id', 'object_id', INT),
+        ('document_number', 'document_number', STRING),
+        ('party_id', 'party_id', INT),
+        ('document_status', 'document_status', STRING),
+    ]),
+    'sales-order-items': (SalesOrderItem.objects.all(), 'sales_order__order_date', [
+        ('id', 'id', INT),
+        ('sales_order_id', 'sales_order_id', INT),
+        ('order_date', F('sales_order__order_date'), DATE),
+        ('customer_id', F('sales_order__customer_id'), INT),
+        ('product_id', 'product_id', INT),
+        ('quantity', 'quantity', INT),
+        ('unit_price', 'unit_price', PRICE),
+        ('tax_percent', 'tax_percent', PERCENT),
+    ]),
+    'purchase-order-items': (PurchaseOrderItem.objects.all(), 'purchase_order__order_date', [
+        ('id', 'id', INT),
+        ('purchase_order_id', 'purchase_order_id', INT),
+        ('order_date', F('purchase_order__order_date'), DATE),
+        ('vendor_id', F('purchase_order__vendor_id'), INT),
+        ('product_id', 'product_id', INT),
+        ('quantity', 'quantity', INT),
+        ('unit_price', 'unit_price', PRICE),
+        ('tax_percent', 'tax_percent', PERCENT),
+    ]),
+    # the dashboard's purchase/sales series
+    'purchase-orders': (PurchaseOrder.objects.all(), 'order_date', [
+        ('id', 'id', INT),
+        ('vendor_id', 'vendor_id', INT),
+        ('order_date', 'order_date', DATE),
+        ('status', 'status', STRING),
+        ('total_amount', 'total_amount', MONEY),
+        ('outstanding_amount', 'outstanding_amount', MONEY),
+    ]),
+    'sales-orders': (SalesOrder.objects.all(), 'order_date', [
+        ('id', 'id', INT),
+        ('customer_id', 'customer_id', INT),
+        ('order_date', 'order_date', DATE),
+        ('status', 'status', STRING),
+        ('total_amount', 'total_amount', MONEY),
+        ('outstanding_amount', 'outstanding_amount', MONEY),
+    ]),
+}
+
+FORMATS = {
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+    'csv': 'text/csv',
+}
+
+
+class _Drain(io.RawIOBase):
+    """Write-only sink whose buffered bytes are handed out after each batch."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def rows(dataset, date_from=None, date_to=None):
+    """values_list() tuples in primary key order, fetched with a server-side cursor."""
+    queryset, date_field, columns = DATASETS[dataset]
+    if date_from:
+        queryset = queryset.filter(**{f'{date_field}__gte': date_from})
+    if date_to:
+        queryset = queryset.filter(**{f'{date_field}__lte': date_to})
+    expressions = {name: expr for name, expr, _ in columns if not isinstance(expr, str)}
+    fields = [name if name in expressions else expr for name, expr, _ in columns]
+    return queryset.annotate(**expressions).order_by('pk').values_list(*fields).iterator(chunk_size=BATCH_SIZE)
+
+
+def schema(dataset):
+    return pa.schema([(name, arrow_type(kind)) for name, _, kind in DATASETS[dataset][2]])
+
+
+def record_batches(dataset, cursor, batch_size=BATCH_SIZE):
+    arrow_schema = schema(dataset)
+    while True:
+        chunk = list(islice(cursor, batch_size))
+        if not chunk:
+            return
+        columns = zip(*chunk)
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, arrow_schema)],
+            schema=arrow_schema,
+        )
+
+
+def stream_arrow(dataset, cursor):
+    sink = _Drain()
+    with pa.ipc.new_stream(sink, schema(dataset)) as writer:
+        for batch in record_batches(dataset, cursor):
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def stream_parquet(dataset, cursor):
+    # one row group per batch; the footer goes out with the last chunk
+    sink = _Drain()
+    with pq.ParquetWriter(sink, schema(dataset), compression='zstd') as writer:
+        for batch in record_batches(dataset, cursor):
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def stream_csv(dataset, cursor):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _, _ in DATASETS[dataset][2]])
+    for chunk in iter(lambda: list(islice(cursor, BATCH_SIZE)), []):
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+STREAMERS = {
+    'arrow': stream_arrow,
+    'parquet': stream_parquet,
+    'csv': stream_csv,
+}
@@ -0,0 +1,143 @@
+# reports/leaderboards.py
+import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import Leaderboard, LeaderboardEntry, OrderCube
+
+# entries kept per board; top-N is served from the board for N up to this
+SIZE = 25
+# an incomplete board that shrinks below this many entries is rebuilt
+REPAIR_BELOW = 10
+CENT = Decimal('0.01')
+
+# board -> (OrderCube subject column, LeaderboardEntry subject column)
+SUBJECTS = {
+    Leaderboard.PRODUCTS: ('product_id', 'product_id'),
+    Leaderboard.CUSTOMERS: ('party_id', 'customer_id'),
+}
+
+
+def period_start(span, date):
+    return date.replace(day=1) if span == Leaderboard.MONTH else date.replace(month=1, day=1)
+
+
+def _period_end(span, period):
+    if span == Leaderboard.MONTH:
+        return (period + datetime.timedelta(days=32)).replace(day=1)
+    return period.replace(year=period.year + 1)
+
+
+def _totals(board, span, period):
+    cube_field = SUBJECTS[board][0]
+    return OrderCube.objects.filter(
+        kind=OrderCube.SALES, period__gte=period, period__lt=_period_end(span, period)
+    ).values(cube_field).annotate(revenue=Sum('net'), quantity=Sum('quantity')).order_by()
+
+
+def _subject_totals(board, span, period, subjects):
+    """{subject: (revenue, quantity)} for the given subjects, zero when they sold nothing."""
+    cube_field = SUBJECTS[board][0]
+    totals = {subject: (Decimal('0'), 0) for subject in subjects}
+    for row in _totals(board, span, period).filter(**{f'{cube_field}__in': subjects}):
+        totals[row[cube_field]] = (Decimal(row['revenue']).quantize(CENT), row['quantity'])
+    return totals
+
+
+def _save(leaderboard, entries):
+    entry_field = SUBJECTS[leaderboard.board][1]
+    leaderboard.entries.all().delete()
+    LeaderboardEntry.objects.bulk_create([
+        LeaderboardEntry(leaderboard=leaderboard, revenue=revenue, quantity=quantity, **{entry_field: subject})
+        for subject, (revenue, quantity) in entries.items()
+    ])
+    leaderboard.save()
+
+
+def repair(board, span, period):
+    """Rebuild one board from the cube: its top SIZE subjects by revenue."""
+    cube_field = SUBJECTS[board][0]
+    rows = list(_totals(board, span, period).filter(revenue__gt=0).order_by('-revenue', cube_field)[:SIZE + 1])
+    with transaction.atomic():
+        leaderboard, _ = Leaderboard.objects.select_for_update().get_or_create(board=board, span=span, period=period)
+        leaderboard.complete = len(rows) <= SIZE
+        _save(leaderboard, {
+            row[cube_field]: (Decimal(row['revenue']).quantize(CENT), row['quantity']) for row in rows[:SIZE]
+        })
+    return leaderboard
+
+
+def record(board, span, period, totals):
+    """
+    Apply new figures {subject: (revenue, quantity)} to an existing board.
+    Members take their new revenue, and an outsider joins when it beats the
+    lowest entry (or the board is complete), evicting the lowest past SIZE.
+    A member that drops below the lowest entry of an incomplete board leaves
+    it, since an unseen subject may now outrank it; a board left with too
+    few entries is repaired from the cube.
+    """
+    with transaction.atomic():
+        leaderboard = Leaderboard.objects.select_for_update().filter(board=board, span=span, period=period).first()
+        if leaderboard is None:
+            return None  # built on first read
+        entry_field = SUBJECTS[board][1]
+        entries = {
+            getattr(entry, entry_field): (entry.revenue, entry.quantity) for entry in leaderboard.entries.all()
+        }
+        before, was_complete = dict(entries), leaderboard.complete
+
+        for subject, (revenue, quantity) in totals.items():
+            floor = min((value for value, _ in entries.values()), default=None)
+            member = entries.pop(subject, None) is not None
+            if revenue <= 0:
+                continue
+            if leaderboard.complete or (floor is not None and (revenue > floor or member and revenue == floor)):
+                entries[subject] = (revenue, quantity)
+            if len(entries) > SIZE:
+                del entries[min(entries, key=lambda key: entries[key][0])]
+                leaderboard.complete = False
+
+        if not leaderboard.complete and len(entries) < REPAIR_BELOW:
+            return repair(board, span, period)
+        if entries != before or leaderboard.complete != was_complete:
+            _save(leaderboard, entries)
+    return leaderboard
+
+
+def sales_changed(month, party_id, product_ids):
+    """Update the existing boards fed by one customer's month of sales cells."""
+    for span in (Leaderboard.MONTH, Leaderboard.YEAR):
+        period = period_start(span, month)
+        boards = set(Leaderboard.objects.filter(span=span, period=period).values_list('board', flat=True))
+        if Leaderboard.CUSTOMERS in boards:
+            record(Leaderboard.CUSTOMERS, span, period,
+                   _subject_totals(Leaderboard.CUSTOMERS, span, period, [party_id]))
+        if Leaderboard.PRODUCTS in boards and product_ids:
+            record(Leaderboard.PRODUCTS, span, period,
+                   _subject_totals(Leaderboard.PRODUCTS, span, period, product_ids))
+
+
+def top(board, span, date, limit=10):
+    """Top `limit` (at most SIZE) subjects of the period containing date, read off the board."""
+    period = period_start(span, date)
+    entry_field = SUBJECTS[board][1]
+    subject = entry_field[:-len('_id')]
+
+    def read(leaderboard):
+        return list(leaderboard.entries.select_related(subject).order_by('-revenue')[:limit])
+
+    leaderboard = Leaderboard.objects.filter(board=board, span=span, period=period).first()
+    entries = read(leaderboard) if leaderboard else None
+    if entries is None or (len(entries) < limit and not leaderboard.complete):
+        entries = read(repair(board, span, period))
+    return [
+        {
+            'id': getattr(entry, entry_field),
+            'name': getattr(entry, subject).name,
+            'revenue': entry.revenue,
+            'quantity': entry.quantity,
+        }
+        for entry in entries
+    ]
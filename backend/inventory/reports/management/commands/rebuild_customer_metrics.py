@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from common import jobs
+from reports.metrics import BATCH_SIZE, rebuild_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the CustomerMetrics (RFM / lifetime value) table from all sales orders, "
+        "or schedule that as a recurring job so recency scores stay current."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--every', type=int, metavar='HOURS', help="Queue a recurring rebuild job instead")
+
+    def handle(self, *args, **options):
+        if options['every']:
+            job, created = jobs.enqueue_unique(
+                'reports.rebuild_customer_metrics', priority=-1,
+                batch_size=options['batch_size'], every_hours=options['every'],
+            )
+            if not created:
+                self.stdout.write(self.style.WARNING(
+                    f"Job {job.id} is already {job.status}; cancel it (POST /api/jobs/{job.id}/cancel/) "
+                    "to change the schedule"
+                ))
+                return
+            self.stdout.write(self.style.SUCCESS(f"Queued job {job.id}, repeating every {options['every']}h"))
+            return
+        count = rebuild_all(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt metrics for {count} customers"))
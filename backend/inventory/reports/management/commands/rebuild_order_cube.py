@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from reports.cube import BATCH_SIZE, rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the OrderCube (order lines by month, party and product) from all orders; sales leaderboards are rebuilt from it on next read."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        count = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} cube cells"))
@@ -0,0 +1,123 @@
+# reports/metrics.py
+from bisect import bisect_left, bisect_right
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum, Count, Min, Max
+from django.utils import timezone
+
+from transactions.models import SalesOrder
+from .models import CustomerMetrics
+
+# Score thresholds (score 1..5). Fixed cut-offs rather than quintiles so that a
+# single customer's row can be scored without looking at every other customer.
+RECENCY_DAYS = [30, 90, 180, 365]          # ordered within 30 days -> 5
+FREQUENCY_ORDERS = [2, 4, 8, 16]           # 16+ orders -> 5
+MONETARY_VALUE = [1000, 10000, 50000, 200000]  # 200000+ -> 5
+
+FIELDS = [
+    'order_count', 'lifetime_value', 'average_order_value', 'first_order_date',
+    'last_order_date', 'recency_score', 'frequency_score', 'monetary_score', 'segment',
+]
+BATCH_SIZE = 1000
+
+# Lifetime value is realized revenue: drafts are not sales yet, cancelled orders never were.
+EXCLUDED_STATUSES = [SalesOrder.DRAFT, SalesOrder.CANCELLED]
+
+
+def score_recency(last_order_date, today):
+    days = (today - last_order_date).days
+    return 5 - bisect_left(RECENCY_DAYS, days)
+
+
+def score_ascending(value, thresholds):
+    return 1 + bisect_right(thresholds, value)
+
+
+def segment_for(recency, frequency):
+    if recency >= 4 and frequency >= 4:
+        return CustomerMetrics.CHAMPION
+    if recency >= 4 and frequency == 1:
+        return CustomerMetrics.NEW
+    if recency <= 1:
+        return CustomerMetrics.LOST
+    if recency <= 2 and frequency >= 3:
+        return CustomerMetrics.AT_RISK
+    if frequency >= 4:
+        return CustomerMetrics.LOYAL
+    return CustomerMetrics.REGULAR
+
+
+def build(customer_id, row, today):
+    recency = score_recency(row['last_order_date'], today)
+    frequency = score_ascending(row['order_count'], FREQUENCY_ORDERS)
+    lifetime_value = row['lifetime_value'] or Decimal('0')
+    return CustomerMetrics(
+        customer_id=customer_id,
+        order_count=row['order_count'],
+        lifetime_value=lifetime_value,
+        average_order_value=round(Decimal(lifetime_value) / row['order_count'], 2),
+        first_order_date=row['first_order_date'],
+        last_order_date=row['last_order_date'],
+        recency_score=recency,
+        frequency_score=frequency,
+        monetary_score=score_ascending(lifetime_value, MONETARY_VALUE),
+        segment=segment_for(recency, frequency),
+    )
+
+
+def realized(orders):
+    return orders.exclude(status__in=EXCLUDED_STATUSES)
+
+
+def aggregates(orders):
+    return realized(orders).values('customer').annotate(
+        order_count=Count('id'),
+        lifetime_value=Sum('total_amount'),
+        first_order_date=Min('order_date'),
+        last_order_date=Max('order_date'),
+    ).order_by()
+
+
+def refresh_customer(customer_id):
+    """Recompute one customer's row from their own orders (indexed by customer)."""
+    rows = list(aggregates(SalesOrder.objects.filter(customer_id=customer_id)))
+    if not rows:
+        CustomerMetrics.objects.filter(customer_id=customer_id).delete()
+        return None
+    metrics = build(customer_id, rows[0], timezone.localdate())
+    metrics.save()
+    return metrics
+
+
+def rebuild_all(batch_size=BATCH_SIZE):
+    """
+    Full rebuild: one grouped pass over SalesOrder, upserted in batches.
+
+    Rows are otherwise only refreshed when one of the customer's orders is written,
+    so recency scores go stale as days pass; run this daily (`manage.py
+    rebuild_customer_metrics --every 24` queues it as a recurring job).
+    """
+    today = timezone.localdate()
+    seen = 0
+    with transaction.atomic():
+        batch = []
+        for row in aggregates(SalesOrder.objects.all()).iterator(chunk_size=batch_size):
+            batch.append(build(row['customer'], row, today))
+            if len(batch) >= batch_size:
+                _upsert(batch)
+                seen += len(batch)
+                batch = []
+        if batch:
+            _upsert(batch)
+            seen += len(batch)
+        CustomerMetrics.objects.exclude(
+            customer__in=realized(SalesOrder.objects.all()).values('customer')
+        ).delete()
+    return seen
+
+
+def _upsert(batch):
+    CustomerMetrics.objects.bulk_create(
+        batch, update_conflicts=True, unique_fields=['customer'], update_fields=FIELDS + ['updated_at']
+    )
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("master", "0002_importjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerMetrics",
+            fields=[
+                (
+                    "customer",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="metrics",
+                        serialize=False,
+                        to="master.contact",
+                    ),
+                ),
+                ("order_count", models.PositiveIntegerField(db_index=True, default=0)),
+                (
+                    "lifetime_value",
+                    models.DecimalField(
+                        db_index=True, decimal_places=2, default=0, max_digits=14
+                    ),
+                ),
+                (
+                    "average_order_value",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("first_order_date", models.DateField(blank=True, null=True)),
+                (
+                    "last_order_date",
+                    models.DateField(blank=True, db_index=True, null=True),
+                ),
+                ("recency_score", models.PositiveSmallIntegerField(default=0)),
+                ("frequency_score", models.PositiveSmallIntegerField(default=0)),
+                ("monetary_score", models.PositiveSmallIntegerField(default=0)),
+                (
+                    "segment",
+                    models.CharField(
+                        choices=[
+                            ("champion", "Champion"),
+                            ("loyal", "Loyal"),
+                            ("new", "New"),
+                            ("at_risk", "At risk"),
+                            ("lost", "Lost"),
+                            ("regular", "Regular"),
+                        ],
+                        db_index=True,
+                        default="regular",
+                        max_length=10,
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "customer metrics",
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("master", "0003_updated_at"),
+        ("reports", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderCube",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("purchases", "Purchases"), ("sales", "Sales")],
+                        max_length=10,
+                    ),
+                ),
+                ("period", models.DateField()),
+                ("category", models.CharField(blank=True, default="", max_length=50)),
+                ("city", models.CharField(blank=True, default="", max_length=50)),
+                ("state", models.CharField(blank=True, default="", max_length=50)),
+                ("lines", models.PositiveIntegerField(default=0)),
+                ("quantity", models.PositiveBigIntegerField(default=0)),
+                (
+                    "net",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "tax",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "gross",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "party",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="master.contact",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="master.product",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["kind", "period"], name="cube_period_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("kind", "party", "period", "product"),
+                        name="cube_cell_unique",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("master", "0003_updated_at"),
+        ("reports", "0002_order_cube"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Leaderboard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "board",
+                    models.CharField(
+                        choices=[("products", "Products"), ("customers", "Customers")],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "span",
+                    models.CharField(
+                        choices=[("month", "Month"), ("year", "Year")], max_length=5
+                    ),
+                ),
+                ("period", models.DateField()),
+                ("complete", models.BooleanField(default=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("board", "span", "period"), name="leaderboard_unique"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="LeaderboardEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("revenue", models.DecimalField(decimal_places=2, max_digits=16)),
+                ("quantity", models.PositiveBigIntegerField(default=0)),
+                (
+                    "customer",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="master.contact",
+                    ),
+                ),
+                (
+                    "leaderboard",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="entries",
+                        to="reports.leaderboard",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="master.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "leaderboard entries",
+                "indexes": [
+                    models.Index(
+                        fields=["leaderboard", "-revenue"], name="leaderboard_rank_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,3 +1,138 @@
 from django.db import models
 
 # Create your models here.
+from master.models import Contact, Product
+
+
+class CustomerMetrics(models.Model):
+    """
+    Materialized RFM / lifetime value figures per customer over realized (not
+    draft or cancelled) SalesOrders, refreshed whenever one of the customer's
+    orders is written (see reports/metrics.py) and rebuilt in full by
+    `rebuild_customer_metrics`, which should run daily to keep recency current.
+    """
+    CHAMPION = 'champion'
+    LOYAL = 'loyal'
+    NEW = 'new'
+    AT_RISK = 'at_risk'
+    LOST = 'lost'
+    REGULAR = 'regular'
+    SEGMENT_CHOICES = [
+        (CHAMPION, 'Champion'),
+        (LOYAL, 'Loyal'),
+        (NEW, 'New'),
+        (AT_RISK, 'At risk'),
+        (LOST, 'Lost'),
+        (REGULAR, 'Regular'),
+    ]
+
+    customer = models.OneToOneField(
+        Contact, primary_key=True, related_name='metrics', on_delete=models.CASCADE
+    )
+    order_count = models.PositiveIntegerField(default=0, db_index=True)
+    lifetime_value = models.DecimalField(max_digits=14, decimal_places=2, default=0, db_index=True)
+    average_order_value = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    first_order_date = models.DateField(null=True, blank=True)
+    last_order_date = models.DateField(null=True, blank=True, db_index=True)
+    recency_score = models.PositiveSmallIntegerField(default=0)
+    frequency_score = models.PositiveSmallIntegerField(default=0)
+    monetary_score = models.PositiveSmallIntegerField(default=0)
+    segment = models.CharField(max_length=10, choices=SEGMENT_CHOICES, default=REGULAR, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'customer metrics'
+
+    def __str__(self):
+        return f"{self.customer_id}: {self.segment} ({self.lifetime_value})"
+
+
+class OrderCube(models.Model):
+    """
+    Order lines pre-aggregated by month, party and product, with the product
+    category and party city/state copied on. Draft and cancelled orders are left out.
+    Kept current per (kind, month, party) on order writes (reports/cube.py)
+    and rebuilt in full by `rebuild_order_cube`.
+    """
+    PURCHASES = 'purchases'
+    SALES = 'sales'
+    KIND_CHOICES = [
+        (PURCHASES, 'Purchases'),
+        (SALES, 'Sales'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    period = models.DateField()  # first day of the month
+    party = models.ForeignKey(Contact, related_name='+', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name='+', on_delete=models.CASCADE)
+    category = models.CharField(max_length=50, blank=True, default='')
+    city = models.CharField(max_length=50, blank=True, default='')
+    state = models.CharField(max_length=50, blank=True, default='')
+    lines = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveBigIntegerField(default=0)
+    net = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    tax = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    gross = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'party', 'period', 'product'], name='cube_cell_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'period'], name='cube_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.period:%Y-%m} {self.party_id}/{self.product_id}: {self.gross}"
+
+
+class Leaderboard(models.Model):
+    """
+    Top sales subjects (products or customers) of a month or year, kept as a
+    bounded list of LeaderboardEntry rows by reports/leaderboards.py.
+    `complete` is False once an entry has been evicted, i.e. when subjects
+    outside the list may exist.
+    """
+    PRODUCTS = 'products'
+    CUSTOMERS = 'customers'
+    BOARD_CHOICES = [
+        (PRODUCTS, 'Products'),
+        (CUSTOMERS, 'Customers'),
+    ]
+    MONTH = 'month'
+    YEAR = 'year'
+    SPAN_CHOICES = [
+        (MONTH, 'Month'),
+        (YEAR, 'Year'),
+    ]
+
+    board = models.CharField(max_length=10, choices=BOARD_CHOICES)
+    span = models.CharField(max_length=5, choices=SPAN_CHOICES)
+    period = models.DateField()  # first day of the month or year
+    complete = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['board', 'span', 'period'], name='leaderboard_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.board} {self.span} {self.period}"
+
+
+class LeaderboardEntry(models.Model):
+    leaderboard = models.ForeignKey(Leaderboard, related_name='entries', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, null=True, blank=True, related_name='+', on_delete=models.CASCADE)
+    customer = models.ForeignKey(Contact, null=True, blank=True, related_name='+', on_delete=models.CASCADE)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2)
+    quantity = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'leaderboard entries'
+        indexes = [
+            models.Index(fields=['leaderboard', '-revenue'], name='leaderboard_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id or self.customer_id}: {self.revenue}"
@@ -0,0 +1,108 @@
+# reports/signals.py
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from master.models import Contact, Product
+from transactions.models import SalesOrder
+from transactions.transitions import orders_bulk_updated
+from . import cube, metrics
+from .models import OrderCube
+
+
+@receiver(pre_save, sender=SalesOrder)
+def remember_previous_customer(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_customer_id = (
+            SalesOrder.objects.filter(pk=instance.pk).values_list('customer_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=SalesOrder)
+def refresh_customer_metrics(sender, instance, **kwargs):
+    metrics.refresh_customer(instance.customer_id)
+    previous = getattr(instance, '_previous_customer_id', None)
+    if previous and previous != instance.customer_id:
+        metrics.refresh_customer(previous)
+
+
+@receiver(post_delete, sender=SalesOrder)
+def refresh_customer_metrics_on_delete(sender, instance, **kwargs):
+    metrics.refresh_customer(instance.customer_id)
+
+
+def refresh_customer_metrics_on_bulk_update(sender, ids, status, **kwargs):
+    # confirming a draft or cancelling moves orders in or out of realized revenue
+    if sender is SalesOrder:
+        customers = SalesOrder.objects.filter(pk__in=ids).values_list('customer_id', flat=True).distinct()
+        for customer_id in list(customers):
+            metrics.refresh_customer(customer_id)
+
+
+# ----------------------------
+# Order cube
+# ----------------------------
+# saves limited to other fields (payments, ledger flags) leave the cube alone
+CUBE_FIELDS = {'order_date', 'vendor', 'vendor_id', 'customer', 'customer_id', 'status', 'total_amount'}
+
+
+def _touches_cube(update_fields):
+    return update_fields is None or not CUBE_FIELDS.isdisjoint(update_fields)
+
+
+def _cube_key(order):
+    kind = cube.ORDER_KINDS[type(order)]
+    party_field = cube.KINDS[kind][3]
+    return kind, cube.month_of(order.order_date), getattr(order, f'{party_field}_id')
+
+
+def remember_previous_cell(sender, instance, update_fields=None, **kwargs):
+    if instance.pk and _touches_cube(update_fields):
+        party_field = cube.KINDS[cube.ORDER_KINDS[sender]][3]
+        previous = sender.objects.filter(pk=instance.pk).values_list('order_date', f'{party_field}_id').first()
+        if previous:
+            instance._previous_cube_key = (cube.ORDER_KINDS[sender], cube.month_of(previous[0]), previous[1])
+
+
+def refresh_cube(sender, instance, update_fields=None, **kwargs):
+    if not _touches_cube(update_fields):
+        return
+    key = _cube_key(instance)
+    cube.refresh(*key)
+    previous = getattr(instance, '_previous_cube_key', None)
+    if previous and previous != key:
+        cube.refresh(*previous)
+
+
+def refresh_cube_on_delete(sender, instance, **kwargs):
+    cube.refresh(*_cube_key(instance))
+
+
+def refresh_cube_on_bulk_update(sender, ids, status, **kwargs):
+    # confirming a draft puts its lines in the cube, cancelling takes them out;
+    # moves between counted statuses (e.g. confirmed -> delivered) change nothing
+    if sender not in cube.ORDER_KINDS:
+        return
+    if status == sender.CANCELLED or status in sender.TRANSITIONS[sender.DRAFT]:
+        cube.refresh_orders(sender, ids)
+
+
+@receiver(post_save, sender=Contact)
+def copy_party_location(sender, instance, created, **kwargs):
+    if not created:
+        city, state = instance.city or '', instance.state or ''
+        OrderCube.objects.filter(party=instance).exclude(city=city, state=state).update(city=city, state=state)
+
+
+@receiver(post_save, sender=Product)
+def copy_product_category(sender, instance, created, **kwargs):
+    if not created:
+        category = instance.category or ''
+        OrderCube.objects.filter(product=instance).exclude(category=category).update(category=category)
+
+
+for model in cube.ORDER_KINDS:
+    label = model._meta.label_lower
+    pre_save.connect(remember_previous_cell, sender=model, dispatch_uid=f"cube-previous-{label}")
+    post_save.connect(refresh_cube, sender=model, dispatch_uid=f"cube-{label}")
+    post_delete.connect(refresh_cube_on_delete, sender=model, dispatch_uid=f"cube-delete-{label}")
+orders_bulk_updated.connect(refresh_cube_on_bulk_update, dispatch_uid="cube-bulk-status")
+orders_bulk_updated.connect(refresh_customer_metrics_on_bulk_update, dispatch_uid="metrics-bulk-status")
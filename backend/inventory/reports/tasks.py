@@ -0,0 +1,21 @@
+# reports/tasks.py
+from datetime import timedelta
+
+from django.utils import timezone
+
+from common import jobs
+from .metrics import BATCH_SIZE, rebuild_all
+
+
+@jobs.task('reports.rebuild_customer_metrics')
+def rebuild_customer_metrics(job, batch_size=BATCH_SIZE, every_hours=None):
+    customers = rebuild_all(batch_size=batch_size)
+    if every_hours:
+        # recurring: recency scores age even when no orders are written;
+        # skipped when `rebuild_customer_metrics --every` queued one meanwhile
+        jobs.enqueue_unique(
+            'reports.rebuild_customer_metrics', exclude=job.job, priority=-1,
+            run_after=timezone.now() + timedelta(hours=every_hours),
+            batch_size=batch_size, every_hours=every_hours,
+        )
+    return {'customers': customers}
@@ -1,3 +1,378 @@
+import csv
+import datetime
+import io
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from common import jobs
+from common.models import Job
+from master.models import Contact, Product
+from transactions import transitions
+from transactions.models import PurchaseOrder, PurchaseOrderItem, SalesOrder, SalesOrderItem
+from . import cube, leaderboards, metrics, vendor_performance
+from .models import CustomerMetrics, Leaderboard, OrderCube
+
+
+# ----------------------------
+# Customer metrics
+# ----------------------------
+class CustomerMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Contact.objects.create(name='Customer', type=Contact.CUSTOMER)
+
+    def sales_order(self, total, status=SalesOrder.CONFIRMED, days_ago=0):
+        return SalesOrder.objects.create(
+            customer=self.customer, total_amount=total, status=status,
+            order_date=timezone.localdate() - timedelta(days=days_ago),
+        )
+
+    def test_only_realized_orders_count(self):
+        self.sales_order(100)
+        self.sales_order(40, status=SalesOrder.DRAFT)
+        self.sales_order(60, status=SalesOrder.CANCELLED)
+
+        row = CustomerMetrics.objects.get(customer=self.customer)
+        self.assertEqual(row.order_count, 1)
+        self.assertEqual(row.lifetime_value, Decimal('100'))
+
+    def test_bulk_cancel_refreshes_metrics(self):
+        kept = self.sales_order(100)
+        cancelled = self.sales_order(50)
+        with self.captureOnCommitCallbacks(execute=True):
+            transitions.bulk_transition(SalesOrder, [cancelled.pk], SalesOrder.CANCELLED)
+        row = CustomerMetrics.objects.get(customer=self.customer)
+        self.assertEqual(row.lifetime_value, Decimal('100'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transitions.bulk_transition(SalesOrder, [kept.pk], SalesOrder.CANCELLED)
+        self.assertFalse(CustomerMetrics.objects.filter(customer=self.customer).exists())
+
+    def test_rebuild_drops_customers_without_realized_orders(self):
+        self.sales_order(40, status=SalesOrder.DRAFT)
+        CustomerMetrics.objects.create(customer=self.customer, order_count=1, lifetime_value=40)
+
+        self.assertEqual(metrics.rebuild_all(), 0)
+        self.assertFalse(CustomerMetrics.objects.filter(customer=self.customer).exists())
+
+    def test_rebuild_refreshes_recency(self):
+        self.sales_order(100, days_ago=400)
+        CustomerMetrics.objects.filter(customer=self.customer).update(recency_score=5)
+
+        metrics.rebuild_all()
+        self.assertEqual(CustomerMetrics.objects.get(customer=self.customer).recency_score, 1)
+
+
+class RecurringRebuildTests(TestCase):
+    task = 'reports.rebuild_customer_metrics'
+
+    def schedule(self, hours=6):
+        out = io.StringIO()
+        call_command('rebuild_customer_metrics', every=hours, stdout=out)
+        return out.getvalue()
+
+    def test_every_skips_when_a_run_is_pending(self):
+        self.assertIn('Queued job', self.schedule())
+        self.assertIn('already queued', self.schedule(hours=12))
+        [job] = Job.objects.filter(task=self.task)
+        self.assertEqual(job.kwargs['every_hours'], 6)
+
+        Job.objects.update(status=Job.RUNNING)
+        self.assertIn('already running', self.schedule())
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_run_queues_the_next_one_once(self):
+        self.schedule()
+        job_id = jobs.claim_next('worker')
+        jobs.execute(job_id)
+        [following] = Job.objects.filter(status=Job.QUEUED)
+        self.assertGreater(following.run_after, timezone.now() + timedelta(hours=5))
+        self.assertEqual(following.kwargs['every_hours'], 6)
+
+        # a run while another is already queued does not add a second one
+        extra = jobs.enqueue(self.task, every_hours=6)
+        jobs.execute(jobs.claim_next('worker'))
+        self.assertEqual(list(Job.objects.filter(status=Job.QUEUED)), [following])
+        self.assertEqual(Job.objects.get(pk=extra.pk).status, Job.SUCCEEDED)
+
+
+# ----------------------------
+# Order cube and leaderboards
+# ----------------------------
+class SalesTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customers = [
+            Contact.objects.create(name=f'Customer {n}', type=Contact.CUSTOMER, city='Pune', state='MH')
+            for n in range(4)
+        ]
+        cls.products = [
+            Product.objects.create(
+                name=f'Product {n}', type=Product.GOODS, sales_price=10, purchase_price=8,
+                sale_tax_percent=0, purchase_tax_percent=0, category='parts' if n % 2 else 'tools',
+            )
+            for n in range(4)
+        ]
+
+    def sale(self, customer, lines, order_date=datetime.date(2024, 3, 10), status=SalesOrder.CONFIRMED):
+        """Create an order from [(product, quantity, unit price)], saved once its items exist."""
+        order = SalesOrder.objects.create(customer=customer, order_date=order_date, status=status)
+        for product, quantity, unit_price in lines:
+            SalesOrderItem.objects.create(
+                sales_order=order, product=product, quantity=quantity, unit_price=unit_price, tax_percent=10,
+            )
+        order.save()
+        return order
+
+
+class OrderCubeTests(SalesTestCase):
+    def test_order_save_refreshes_cells(self):
+        order = self.sale(self.customers[0], [(self.products[0], 2, 5), (self.products[0], 1, 10)])
+        cell = OrderCube.objects.get(kind=OrderCube.SALES, party=self.customers[0])
+        self.assertEqual((cell.period, cell.lines, cell.quantity), (datetime.date(2024, 3, 1), 2, 3))
+        self.assertEqual((cell.net, cell.tax, cell.gross), (Decimal('20.00'), Decimal('2.00'), Decimal('22.00')))
+        self.assertEqual((cell.category, cell.city), ('tools', 'Pune'))
+
+        order.order_date = datetime.date(2024, 4, 2)
+        order.save()
+        self.assertEqual(list(OrderCube.objects.values_list('period', flat=True)), [datetime.date(2024, 4, 1)])
+
+    def test_drafts_count_once_confirmed(self):
+        order = self.sale(self.customers[0], [(self.products[0], 1, 10)], status=SalesOrder.DRAFT)
+        self.assertFalse(OrderCube.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transitions.bulk_transition(SalesOrder, [order.pk], SalesOrder.CONFIRMED)
+        self.assertEqual(OrderCube.objects.get().net, Decimal('10.00'))
+
+    def test_order_date_given_as_string(self):
+        order = SalesOrder.objects.create(
+            customer=self.customers[0], order_date='2024-03-10', status=SalesOrder.CONFIRMED,
+        )
+        SalesOrderItem.objects.create(sales_order=order, product=self.products[0], quantity=1, unit_price=10)
+        order.save()
+        self.assertEqual(OrderCube.objects.get().period, datetime.date(2024, 3, 1))
+        self.assertEqual(cube.month_of('2024-03-10'), datetime.date(2024, 3, 1))
+
+    def test_cancel_removes_cells(self):
+        order = self.sale(self.customers[0], [(self.products[0], 1, 10)])
+        with self.captureOnCommitCallbacks(execute=True):
+            transitions.bulk_transition(SalesOrder, [order.pk], SalesOrder.CANCELLED)
+        self.assertFalse(OrderCube.objects.exists())
+
+    def test_rollup(self):
+        self.sale(self.customers[0], [(self.products[0], 1, 10), (self.products[1], 2, 10)])
+        self.sale(self.customers[1], [(self.products[1], 1, 10)], order_date=datetime.date(2024, 5, 1))
+
+        rows = cube.rollup(by=('category',), kind=OrderCube.SALES)
+        self.assertEqual([(row['category'], row['quantity'], row['net']) for row in rows], [
+            ('parts', 3, Decimal('30.00')), ('tools', 1, Decimal('10.00')),
+        ])
+        rows = cube.rollup(by=('month',), date_from=datetime.date(2024, 4, 15))
+        self.assertEqual([(row['month'], row['gross']) for row in rows], [
+            (datetime.date(2024, 5, 1), Decimal('11.00')),
+        ])
+        self.assertEqual(cube.rollup(party=self.customers[0])[0]['lines'], 2)
+
+    def test_rebuild_matches_incremental_cells(self):
+        self.sale(self.customers[0], [(self.products[0], 1, 10), (self.products[1], 2, 7.5)])
+        self.sale(self.customers[1], [(self.products[1], 1, 10)])
+        fields = ('kind', 'period', 'party', 'product', 'lines', 'quantity', 'net', 'tax', 'gross')
+        incremental = sorted(OrderCube.objects.values_list(*fields))
+
+        self.assertEqual(cube.rebuild(), 3)
+        self.assertEqual(sorted(OrderCube.objects.values_list(*fields)), incremental)
+
+
+class LeaderboardTests(SalesTestCase):
+    date = datetime.date(2024, 3, 10)
+
+    def ranking(self, board=Leaderboard.CUSTOMERS, span=Leaderboard.MONTH):
+        return [(row['id'], row['revenue']) for row in leaderboards.top(board, span, self.date)]
+
+    def leaders(self):
+        return [subject for subject, _ in self.ranking()]
+
+    def test_top_builds_board_from_cube(self):
+        self.sale(self.customers[0], [(self.products[0], 1, 10)])
+        self.sale(self.customers[1], [(self.products[1], 3, 10)])
+        self.assertEqual(self.ranking(), [
+            (self.customers[1].pk, Decimal('30.00')), (self.customers[0].pk, Decimal('10.00')),
+        ])
+        self.assertTrue(Leaderboard.objects.get(board=Leaderboard.CUSTOMERS, span=Leaderboard.MONTH).complete)
+        self.assertEqual(
+            [row['id'] for row in leaderboards.top(Leaderboard.PRODUCTS, Leaderboard.YEAR, self.date)],
+            [self.products[1].pk, self.products[0].pk],
+        )
+
+    def test_sales_update_existing_board(self):
+        self.sale(self.customers[0], [(self.products[0], 1, 10)])
+        self.ranking()  # builds the board
+
+        self.sale(self.customers[2], [(self.products[0], 5, 10)])
+        board = Leaderboard.objects.get(board=Leaderboard.CUSTOMERS, span=Leaderboard.MONTH)
+        self.assertEqual(board.entries.count(), 2)
+        self.assertEqual(self.ranking(), [
+            (self.customers[2].pk, Decimal('50.00')), (self.customers[0].pk, Decimal('10.00')),
+        ])
+
+    def test_drafts_do_not_rank_until_confirmed(self):
+        self.sale(self.customers[0], [(self.products[0], 1, 10)])
+        self.ranking()  # builds the board
+
+        draft = self.sale(self.customers[1], [(self.products[1], 5, 10)], status=SalesOrder.DRAFT)
+        self.assertEqual(self.leaders(), [self.customers[0].pk])
+        self.assertEqual(
+            [row['id'] for row in leaderboards.top(Leaderboard.PRODUCTS, Leaderboard.MONTH, self.date)],
+            [self.products[0].pk],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transitions.bulk_transition(SalesOrder, [draft.pk], SalesOrder.CONFIRMED)
+        self.assertEqual(self.leaders(), [self.customers[1].pk, self.customers[0].pk])
+
+    @mock.patch.object(leaderboards, 'REPAIR_BELOW', 1)
+    @mock.patch.object(leaderboards, 'SIZE', 2)
+    def test_bounded_board_evicts_and_repairs(self):
+        for customer, quantity in zip(self.customers, (1, 2, 3)):
+            self.sale(customer, [(self.products[0], quantity, 10)])
+        self.assertEqual(self.leaders(), [self.customers[2].pk, self.customers[1].pk])
+        board = Leaderboard.objects.get(board=Leaderboard.CUSTOMERS, span=Leaderboard.MONTH)
+        self.assertFalse(board.complete)
+
+        # an outsider that beats the lowest entry evicts it
+        self.sale(self.customers[3], [(self.products[0], 4, 10)])
+        self.assertEqual(self.leaders(), [self.customers[3].pk, self.customers[2].pk])
+
+        # a member whose sales are cancelled leaves; the shrunken board is repaired from the cube
+        orders = SalesOrder.objects.filter(customer__in=self.customers[2:]).values_list('pk', flat=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            transitions.bulk_transition(SalesOrder, list(orders), SalesOrder.CANCELLED)
+        self.assertEqual(self.leaders(), [self.customers[1].pk, self.customers[0].pk])
+
+
+# ----------------------------
+# Vendor performance
+# ----------------------------
+class VendorPerformanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = Contact.objects.create(name='Vendor', type=Contact.VENDOR)
+        cls.product = Product.objects.create(
+            name='Widget', type=Product.GOODS, sales_price=10, purchase_price=8,
+            sale_tax_percent=0, purchase_tax_percent=0,
+        )
+
+    def purchase(self, order_date, unit_price, status=PurchaseOrder.RECEIVED, lead_days=None):
+        order = PurchaseOrder.objects.create(
+            vendor=self.vendor, order_date=order_date, status=status, total_amount=10 * unit_price,
+            expected_date=order_date + timedelta(days=7),
+            received_date=order_date + timedelta(days=lead_days) if lead_days is not None else None,
+        )
+        PurchaseOrderItem.objects.create(
+            purchase_order=order, product=self.product, quantity=10, unit_price=unit_price,
+        )
+        return order
+
+    def test_spend_leaves_out_drafts_and_cancelled_orders(self):
+        self.purchase(datetime.date(2024, 1, 5), 8, lead_days=5)
+        self.purchase(datetime.date(2024, 2, 5), 9, lead_days=10)
+        self.purchase(datetime.date(2024, 2, 6), 50, status=PurchaseOrder.DRAFT)
+        self.purchase(datetime.date(2024, 2, 7), 70, status=PurchaseOrder.CANCELLED)
+
+        [row] = vendor_performance.compute()
+        self.assertEqual(
+            [(month['spend'], month['orders'], month['change']) for month in row['spend_trend']],
+            [(Decimal('80'), 1, None), (Decimal('90'), 1, Decimal('10'))],
+        )
+        self.assertEqual(row['received_orders'], 2)
+        self.assertEqual(row['on_time_percent'], 50.0)
+        self.assertEqual(row['lead_time_days']['histogram'], {'0_7': 1, '8_14': 1, '15_30': 0, '31_plus': 0})
+        [drift] = row['price_drift']
+        self.assertEqual((drift['purchases'], drift['first_price'], drift['latest_price']), (2, 8, 9))
+
+    def test_vendor_with_only_drafts_is_not_listed(self):
+        self.purchase(datetime.date(2024, 1, 5), 8, status=PurchaseOrder.DRAFT)
+        self.assertEqual(vendor_performance.compute(), [])
+
+
+# ----------------------------
+# Dataset exports
+# ----------------------------
+class DatasetExportTests(SalesTestCase):
+    url = '/api/reports/export/sales-order-items/'
+
+    def setUp(self):
+        cache.clear()  # export throttle
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('owner', password='x', role=User.OWNER))
+        self.march = self.sale(self.customers[0], [(self.products[0], 2, Decimal('10.50'))])
+        self.may = self.sale(
+            self.customers[1], [(self.products[1], 1, Decimal('4.00'))], order_date=datetime.date(2024, 5, 1),
+        )
+
+    def export(self, url=None, **params):
+        response = self.client.get(url or self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv(self):
+        response, body = self.export(format='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="sales-order-items.csv"')
+        header, *rows = csv.reader(io.StringIO(body.decode()))
+        self.assertEqual(header[:3], ['id', 'sales_order_id', 'order_date'])
+        self.assertEqual(
+            [(row[1], row[2], row[6]) for row in rows],
+            [(str(self.march.pk), '2024-03-10', '10.50'), (str(self.may.pk), '2024-05-01', '4.00')],
+        )
+
+    def test_parquet_keeps_types(self):
+        response, body = self.export(format='parquet', date_from='2024-04-01')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="sales-order-items.parquet"')
+        table = pq.read_table(io.BytesIO(body))
+        self.assertEqual(table.schema.field('unit_price').type, pa.decimal128(10, 2))
+        self.assertEqual(table.schema.field('order_date').type, pa.date32())
+        self.assertEqual(table.column('sales_order_id').to_pylist(), [self.may.pk])
+        self.assertEqual(table.column('unit_price').to_pylist(), [Decimal('4.00')])
+
+    def test_arrow_is_the_default(self):
+        response, body = self.export(date_to='2024-03-31')
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.arrow.stream')
+        table = pa.ipc.open_stream(body).read_all()
+        self.assertEqual(table.column('sales_order_id').to_pylist(), [self.march.pk])
+
+    def test_empty_export_has_a_header(self):
+        _, body = self.export(format='csv', date_from='2030-01-01')
+        self.assertEqual(body.decode().splitlines(), [
+            'id,sales_order_id,order_date,customer_id,product_id,quantity,unit_price,tax_percent'
+        ])
+        _, body = self.export(format='parquet', date_from='2030-01-01')
+        self.assertEqual(pq.read_table(io.BytesIO(body)).num_rows, 0)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/api/reports/export/customers/').status_code, 404)
+        response = self.client.get(self.url, {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('format', response.json())
+        self.assertEqual(self.client.get(self.url, {'format': 'csv', 'date_from': '10/03/2024'}).status_code, 400)
+
+    def test_permissions(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url, {'format': 'csv'}).status_code, 401)
+        self.client.force_authenticate(User.objects.create_user('viewer', password='x', role='viewer'))
+        self.assertEqual(self.client.get(self.url, {'format': 'csv'}).status_code, 403)
 
-# Create your tests here.
+        self.client.force_authenticate(User.objects.create_user('accountant', password='x'))
+        statuses = [self.client.get(self.url, {'format': 'csv'}).status_code for _ in range(6)]
+        self.assertEqual(statuses, [200] * 5 + [429])  # exports:accountant falls back to 5/min
@@ -0,0 +1,12 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('aging/', views.aging_report, name='aging-report'),
+    path('cube/', views.cube_report, name='cube-report'),
+    path('leaderboards/<str:board>/', views.leaderboard_report, name='leaderboard-report'),
+    path('balances/', views.balances_report, name='balances-report'),
+    path('vendor-performance/', views.vendor_performance_report, name='vendor-performance'),
+    path('customer-metrics/rebuild/', views.rebuild_customer_metrics, name='rebuild-customer-metrics'),
+    path('export/<str:dataset>/', views.DatasetExportView.as_view(), name='dataset-export'),
+]
@@ -0,0 +1,162 @@
+# reports/vendor_performance.py
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import (
+    Q, F, Sum, Count, Avg, Min, Max, Window, DurationField, ExpressionWrapper
+)
+from django.db.models.functions import TruncMonth, Lag, FirstValue, RowNumber
+
+from common.cache import model_versions
+from master.models import Contact, Product
+from transactions.models import PurchaseOrder, PurchaseOrderItem
+from .cube import excluded_statuses
+
+CACHE_TIMEOUT = 60 * 60
+
+# lead time histogram, in days (upper bound inclusive; None = open ended)
+LEAD_TIME_BUCKETS = [('0_7', 7), ('8_14', 14), ('15_30', 30), ('31_plus', None)]
+
+lead_time = ExpressionWrapper(F('received_date') - F('order_date'), output_field=DurationField())
+
+
+def _days(duration):
+    if duration is None:
+        return None
+    return round(duration / timedelta(days=1), 1)
+
+
+def lead_times(orders):
+    histogram = {}
+    previous = None
+    for name, days in LEAD_TIME_BUCKETS:
+        q = Q()
+        if previous is not None:
+            q &= Q(lead_time__gt=timedelta(days=previous))
+        if days is not None:
+            q &= Q(lead_time__lte=timedelta(days=days))
+        histogram[name] = Count('id', filter=q)
+        previous = days
+
+    rows = (
+        orders.filter(received_date__isnull=False)
+        .alias(lead_time=lead_time)
+        .values('vendor')
+        .annotate(
+            received=Count('id'),
+            on_time=Count('id', filter=Q(expected_date__isnull=False, received_date__lte=F('expected_date'))),
+            with_expected=Count('id', filter=Q(expected_date__isnull=False)),
+            lead_min=Min('lead_time'),
+            lead_avg=Avg('lead_time'),
+            lead_max=Max('lead_time'),
+            **histogram,
+        )
+        .order_by()
+    )
+    return {
+        row['vendor']: {
+            'received_orders': row['received'],
+            'on_time_percent': (
+                round(100 * row['on_time'] / row['with_expected'], 1) if row['with_expected'] else None
+            ),
+            'lead_time_days': {
+                'min': _days(row['lead_min']),
+                'avg': _days(row['lead_avg']),
+                'max': _days(row['lead_max']),
+                'histogram': {name: row[name] for name, _ in LEAD_TIME_BUCKETS},
+            },
+        }
+        for row in rows
+    }
+
+
+def spend_trend(orders):
+    # monthly spend with the previous month's spend alongside, via LAG()
+    rows = (
+        orders.annotate(month=TruncMonth('order_date'))
+        .values('vendor', 'month')
+        .annotate(spend=Sum('total_amount'), orders=Count('id'))
+        .annotate(
+            previous_spend=Window(Lag('spend'), partition_by=[F('vendor')], order_by=F('month').asc())
+        )
+        .order_by('vendor', 'month')
+    )
+    trend = {}
+    for row in rows:
+        trend.setdefault(row['vendor'], []).append({
+            'month': row['month'],
+            'spend': row['spend'],
+            'orders': row['orders'],
+            'change': None if row['previous_spend'] is None else row['spend'] - row['previous_spend'],
+        })
+    return trend
+
+
+def price_drift(items):
+    # latest line per (vendor, product), with the first and previous price it was bought at
+    partition = [F('purchase_order__vendor'), F('product')]
+    chronological = [F('purchase_order__order_date').asc(), F('id').asc()]
+    rows = (
+        items.annotate(
+            vendor=F('purchase_order__vendor'),
+            first_price=Window(FirstValue('unit_price'), partition_by=partition, order_by=chronological),
+            previous_price=Window(Lag('unit_price'), partition_by=partition, order_by=chronological),
+            purchases=Window(Count('id'), partition_by=partition),
+            latest=Window(
+                RowNumber(), partition_by=partition,
+                order_by=[F('purchase_order__order_date').desc(), F('id').desc()],
+            ),
+        )
+        .filter(latest=1)
+        .values('vendor', 'product', 'first_price', 'previous_price', 'unit_price', 'purchases')
+        .order_by('vendor', 'product')
+    )
+    drift = {}
+    for row in rows:
+        change = row['unit_price'] - row['first_price']
+        drift.setdefault(row['vendor'], []).append({
+            'product': row['product'],
+            'purchases': row['purchases'],
+            'first_price': row['first_price'],
+            'previous_price': row['previous_price'],
+            'latest_price': row['unit_price'],
+            'drift': change,
+            'drift_percent': round(100 * change / row['first_price'], 2) if row['first_price'] else None,
+        })
+    return drift
+
+
+def compute(vendor_id=None, since=None):
+    # draft and cancelled orders are not spend (as in the cube and customer metrics)
+    orders = PurchaseOrder.objects.exclude(status__in=excluded_statuses(PurchaseOrder))
+    items = PurchaseOrderItem.objects.exclude(purchase_order__status__in=excluded_statuses(PurchaseOrder))
+    vendors = Contact.objects.filter(type__in=[Contact.VENDOR, Contact.BOTH])
+    if vendor_id is not None:
+        orders = orders.filter(vendor_id=vendor_id)
+        items = items.filter(purchase_order__vendor_id=vendor_id)
+        vendors = vendors.filter(pk=vendor_id)
+    if since is not None:
+        orders = orders.filter(order_date__gte=since)
+        items = items.filter(purchase_order__order_date__gte=since)
+
+    leads, trends, drifts = lead_times(orders), spend_trend(orders), price_drift(items)
+    results = []
+    for vendor in vendors.order_by('name').values('id', 'name'):
+        vendor_id = vendor['id']
+        if vendor_id not in trends:
+            continue
+        results.append({
+            'vendor': vendor_id,
+            'vendor_name': vendor['name'],
+            **leads.get(vendor_id, {'received_orders': 0, 'on_time_percent': None, 'lead_time_days': None}),
+            'spend_trend': trends[vendor_id],
+            'price_drift': drifts.get(vendor_id, []),
+        })
+    return results
+
+
+def vendor_performance(vendor_id=None, since=None):
+    """compute(), cached until a purchase order, item, vendor or product changes."""
+    versions = model_versions(PurchaseOrder, PurchaseOrderItem, Contact, Product)
+    key = f"vendor-performance:{versions}:{vendor_id}:{since}"
+    return cache.get_or_set(key, lambda: compute(vendor_id, since), CACHE_TIMEOUT)
@@ -1,3 +1,214 @@
 from django.shortcuts import render
 
 # Create your views here.
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from common import jobs
+from common.renderers import FastJSONRenderer
+from common.singleflight import single_flight
+from common.throttles import ExportThrottle, ReportThrottle
+from accounts.permissions import OwnerOrAccountantPermission
+from transactions import periods
+from . import aging, cube, exports, leaderboards, vendor_performance
+from .models import Leaderboard
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, OwnerOrAccountantPermission])
+@throttle_classes([ReportThrottle])
+@single_flight
+def aging_report(request):
+    """
+    Aged payables (by vendor) and receivables (by customer).
+    ?as_of=YYYY-MM-DD (default today), ?kind=payables|receivables (default both)
+    """
+    as_of = timezone.localdate()
+    if request.GET.get('as_of'):
+        as_of = parse_date(request.GET['as_of'])
+        if as_of is None:
+            return Response({'as_of': ['Use the YYYY-MM-DD format.']}, status=400)
+
+    kind = request.GET.get('kind')
+    if kind not in (None, 'payables', 'receivables'):
+        return Response({'kind': ['Must be "payables" or "receivables".']}, status=400)
+
+    data = {'as_of': as_of, 'buckets': [name for name, _, _ in aging.AGING_BUCKETS]}
+    if kind in (None, 'payables'):
+        data['payables'] = aging.payables(as_of)
+    if kind in (None, 'receivables'):
+        data['receivables'] = aging.receivables(as_of)
+    return Response(data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, OwnerOrAccountantPermission])
+@throttle_classes([ReportThrottle])
+@single_flight
+def vendor_performance_report(request):
+    """
+    Per-vendor lead time, on-time rate, monthly spend and price drift per product.
+    ?vendor=<id> to restrict to one vendor, ?since=YYYY-MM-DD to bound order dates.
+    """
+    vendor_id = request.GET.get('vendor')
+    if vendor_id is not None and not vendor_id.isdigit():
+        return Response({'vendor': ['Must be a contact id.']}, status=400)
+
+    since = None
+    if request.GET.get('since'):
+        since = parse_date(request.GET['since'])
+        if since is None:
+            return Response({'since': ['Use the YYYY-MM-DD format.']}, status=400)
+
+    vendors = vendor_performance.vendor_performance(
+        int(vendor_id) if vendor_id is not None else None, since
+    )
+    return Response({'vendors': vendors})
+
+
+class DatasetExportView(APIView):
+    """
+    GET /api/reports/export/<dataset>/?format=arrow|parquet|csv
+    &date_from=YYYY-MM-DD&date_to=YYYY-MM-DD
+
+    Streams raw rows of exports.DATASETS as Arrow IPC record batches, Parquet
+    row groups or CSV, built straight from a values_list() cursor. Decimal and
+    date columns keep their types in Arrow/Parquet.
+    """
+    permission_classes = [IsAuthenticated, OwnerOrAccountantPermission]
+    throttle_classes = [ExportThrottle]
+
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= picks the export format here, not a DRF renderer;
+        # errors are still rendered as JSON
+        return (FastJSONRenderer(), FastJSONRenderer.media_type)
+
+    def get(self, request, dataset):
+        if dataset not in exports.DATASETS:
+            return Response({'detail': f"Unknown dataset '{dataset}'."}, status=404)
+
+        export_format = request.GET.get('format', 'arrow')
+        if export_format not in exports.FORMATS:
+            return Response({'format': [f"Must be one of {', '.join(exports.FORMATS)}."]}, status=400)
+        if export_format != 'csv' and exports.pa is None:
+            return Response({'format': ['pyarrow is not installed on the server.']}, status=501)
+
+        bounds = {}
+        for param in ('date_from', 'date_to'):
+            if request.GET.get(param):
+                bounds[param] = parse_date(request.GET[param])
+                if bounds[param] is None:
+                    return Response({param: ['Use the YYYY-MM-DD format.']}, status=400)
+
+        cursor = exports.rows(dataset, **bounds)
+        response = StreamingHttpResponse(
+            exports.STREAMERS[export_format](dataset, cursor),
+            content_type=exports.FORMATS[export_format],
+        )
+        extension = {'arrow': 'arrows'}.get(export_format, export_format)
+        response['Content-Disposition'] = f'attachment; filename="{dataset}.{extension}"'
+        return response
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, OwnerOrAccountantPermission])
+def rebuild_customer_metrics(request):
+    """Queue a full CustomerMetrics rebuild; poll /api/jobs/<id>/ for the result."""
+    job = jobs.enqueue('reports.rebuild_customer_metrics', priority=-1, created_by=request.user)
+    return Response({'job': job.id}, status=202)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, OwnerOrAccountantPermission])
+@throttle_classes([ReportThrottle])
+@single_flight
+def balances_report(request):
+    """
+    Ledger account totals and per-party order totals as of ?as_of=YYYY-MM-DD
+    (default today), built from the latest period snapshot plus later rows.
+    """
+    as_of = timezone.localdate()
+    if request.GET.get('as_of'):
+        as_of = parse_date(request.GET['as_of'])
+        if as_of is None:
+            return Response({'as_of': ['Use the YYYY-MM-DD format.']}, status=400)
+    return Response(periods.balances(as_of))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, OwnerOrAccountantPermission])
+@throttle_classes([ReportThrottle])
+@single_flight
+def cube_report(request):
+    """
+    Order lines rolled up from the pre-aggregated cube.
+    ?by=comma separated dimensions (kind, month, quarter, year, party, product,
+    category, city, state), ?kind=sales|purchases, ?date_from=/?date_to=
+    YYYY-MM-DD (whole months), and ?party=, ?product=, ?category=, ?city=,
+    ?state= to filter.
+    """
+    by = [dimension for dimension in request.GET.get('by', '').split(',') if dimension]
+    unknown = [dimension for dimension in by if dimension not in cube.DIMENSIONS]
+    if unknown:
+        return Response({'by': [f"Unknown dimensions {unknown}; use {', '.join(cube.DIMENSIONS)}."]}, status=400)
+
+    kind = request.GET.get('kind')
+    if kind not in (None, *cube.KINDS):
+        return Response({'kind': [f"Must be one of {', '.join(cube.KINDS)}."]}, status=400)
+
+    bounds = {}
+    for param in ('date_from', 'date_to'):
+        if request.GET.get(param):
+            bounds[param] = parse_date(request.GET[param])
+            if bounds[param] is None:
+                return Response({param: ['Use the YYYY-MM-DD format.']}, status=400)
+
+    filters = {}
+    for param in ('party', 'product'):
+        if request.GET.get(param):
+            if not request.GET[param].isdigit():
+                return Response({param: ['Must be an id.']}, status=400)
+            filters[f'{param}_id'] = int(request.GET[param])
+    for param in ('category', 'city', 'state'):
+        if param in request.GET:
+            filters[param] = request.GET[param]
+
+    rows = cube.rollup(by, kind=kind, **bounds, **filters)
+    return Response({'by': by, 'rows': rows})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, OwnerOrAccountantPermission])
+def leaderboard_report(request, board):
+    """
+    Top products or customers by sales revenue, read off the maintained board.
+    ?span=month|year (default month), ?date=YYYY-MM-DD inside the period
+    (default today), ?limit= up to leaderboards.SIZE (default 10).
+    """
+    if board not in dict(Leaderboard.BOARD_CHOICES):
+        return Response({'detail': f"Unknown leaderboard '{board}'."}, status=404)
+
+    span = request.GET.get('span', Leaderboard.MONTH)
+    if span not in dict(Leaderboard.SPAN_CHOICES):
+        return Response({'span': ['Must be "month" or "year".']}, status=400)
+
+    date = timezone.localdate()
+    if request.GET.get('date'):
+        date = parse_date(request.GET['date'])
+        if date is None:
+            return Response({'date': ['Use the YYYY-MM-DD format.']}, status=400)
+
+    limit = request.GET.get('limit', '10')
+    if not limit.isdigit() or not 1 <= int(limit) <= leaderboards.SIZE:
+        return Response({'limit': [f"Must be between 1 and {leaderboards.SIZE}."]}, status=400)
+
+    return Response({
+        'board': board,
+        'span': span,
+        'period': leaderboards.period_start(span, date),
+        'entries': leaderboards.top(board, span, date, int(limit)),
+    })
@@ -1,20 +1,102 @@
+from django import forms
 from django.contrib import admin
+from common.pagination import EstimatedCountPaginator
+from . import documents, periods
 from .models import (
     PurchaseOrder, PurchaseOrderItem,
     SalesOrder, SalesOrderItem,
-    Transaction
+    Transaction, ArchivedPeriod, FiscalPeriod, PeriodBalance
 )
 
 # ----------------------------
 # PurchaseOrder Admin
 # ----------------------------
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables with millions of rows."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # skip the second, unfiltered COUNT(*)
+
+
+def _closed_dates(instance, date_field, new_date, through):
+    """True when the record's stored or new date falls in a closed period."""
+    dates = [new_date]
+    if instance.pk:
+        dates += type(instance).objects.filter(pk=instance.pk).values_list(date_field, flat=True)
+    return any(periods.is_locked(date, through) for date in dates)
+
+
+class PeriodLockForm(forms.ModelForm):
+    """Admin counterpart of serializers.PeriodLockMixin; the admin sets date_field and locked_fields."""
+    date_field = 'order_date'
+    locked_fields = ()
+
+    def clean(self):
+        cleaned_data = super().clean()
+        through = periods.closed_through()
+        changed = not self.instance.pk or {self.date_field, *self.locked_fields} & set(self.changed_data)
+        new_date = cleaned_data.get(self.date_field, getattr(self.instance, self.date_field))
+        if changed and _closed_dates(self.instance, self.date_field, new_date, through):
+            raise forms.ValidationError(f"The period is closed through {through}.")
+        return cleaned_data
+
+
+class PeriodLockFormSet(forms.BaseInlineFormSet):
+    """Order lines cannot be added, edited or removed while the order is dated in a closed period."""
+    date_field = 'order_date'
+
+    def clean(self):
+        super().clean()
+        if not any(form.has_changed() for form in self.forms):
+            return
+        through = periods.closed_through()
+        if _closed_dates(self.instance, self.date_field, getattr(self.instance, self.date_field), through):
+            raise forms.ValidationError(f"The period is closed through {through}.")
+
+
+class PeriodLockAdmin(admin.ModelAdmin):
+    """
+    Same rules as the API: the form and inlines are validated against the
+    period lock before save_model / save_related run, so a refused change is
+    shown on the form; records dated in a closed period cannot be deleted.
+    """
+    date_field = 'order_date'
+    locked_fields = ()
+    form = PeriodLockForm
+
+    def get_form(self, request, obj=None, **kwargs):
+        form = super().get_form(request, obj, **kwargs)
+        form.date_field, form.locked_fields = self.date_field, self.locked_fields
+        return form
+
+    def has_delete_permission(self, request, obj=None):
+        if obj is not None and periods.is_locked(getattr(obj, self.date_field)):
+            return False
+        # also checked per row by the "delete selected" action
+        return super().has_delete_permission(request, obj)
+
+
+class OrderAdmin(PeriodLockAdmin, LargeTableAdmin):
+    def save_related(self, request, form, formsets, change):
+        # inline item edits change the order total, and the ledger amount with it
+        super().save_related(request, form, formsets, change)
+        order = form.instance
+        order.calculate_total()
+        order.save(update_fields=['total_amount'])
+        documents.sync_amount(order)
+
+
 class PurchaseOrderItemInline(admin.TabularInline):
     model = PurchaseOrderItem
+    formset = PeriodLockFormSet
+    autocomplete_fields = ('product',)
     extra = 1
 
 @admin.register(PurchaseOrder)
-class PurchaseOrderAdmin(admin.ModelAdmin):
+class PurchaseOrderAdmin(OrderAdmin):
+    locked_fields = ('vendor',)
     list_display = ('id', 'vendor', 'order_date', 'expected_date', 'status', 'total_amount', 'paid', 'payment_method')
+    list_select_related = ('vendor',)
+    autocomplete_fields = ('vendor',)
     inlines = [PurchaseOrderItemInline]
     list_filter = ('status', 'order_date', 'expected_date', 'paid', 'payment_method')
     search_fields = ('vendor__name',)
@@ -25,11 +107,16 @@ class PurchaseOrderAdmin(admin.ModelAdmin):
 # ----------------------------
 class SalesOrderItemInline(admin.TabularInline):
     model = SalesOrderItem
+    formset = PeriodLockFormSet
+    autocomplete_fields = ('product',)
     extra = 1
 
 @admin.register(SalesOrder)
-class SalesOrderAdmin(admin.ModelAdmin):
+class SalesOrderAdmin(OrderAdmin):
+    locked_fields = ('customer',)
     list_display = ('id', 'customer', 'order_date', 'status')
+    list_select_related = ('customer',)
+    autocomplete_fields = ('customer',)
     inlines = [SalesOrderItemInline]
     list_filter = ('status', 'order_date')
     search_fields = ('customer__name',)
@@ -39,12 +126,43 @@ class SalesOrderAdmin(admin.ModelAdmin):
 # Transaction Admin
 # ----------------------------
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
-    list_display = ('id', 'transaction_type', 'related_object_display', 'date', 'amount')
+class TransactionAdmin(PeriodLockAdmin, LargeTableAdmin):
+    date_field = 'date'
+    locked_fields = ('transaction_type', 'amount', 'content_type', 'object_id')
+    list_display = ('id', 'transaction_type', 'related_object_display', 'document_status', 'date', 'amount')
     list_filter = ('transaction_type', 'date')
-    search_fields = ('transaction_type',)
+    search_fields = ('transaction_type', 'document_number', 'party_name')
+    readonly_fields = ('document_number', 'party', 'party_name', 'document_status')
 
     def related_object_display(self, obj):
-        return str(obj.related_object)  # Shows the linked PurchaseOrder or SalesOrder
+        # copied document fields: no related_object lookup per row
+        return f"{obj.document_number} ({obj.party_name})" if obj.document_number else '-'
 
     related_object_display.short_description = 'Related Object'
+
+
+@admin.register(ArchivedPeriod)
+class ArchivedPeriodAdmin(admin.ModelAdmin):
+    list_display = ('year', 'row_count', 'total_amount', 'archived_at')
+    readonly_fields = ('year', 'file', 'row_count', 'total_amount', 'sha256', 'archived_at')
+
+
+# ----------------------------
+# Period close Admin
+# ----------------------------
+class PeriodBalanceInline(admin.TabularInline):
+    model = PeriodBalance
+    fields = ('account', 'party', 'amount', 'count')
+    readonly_fields = fields
+    can_delete = False
+    extra = 0
+
+
+@admin.register(FiscalPeriod)
+class FiscalPeriodAdmin(admin.ModelAdmin):
+    list_display = ('end_date', 'closed_at', 'closed_by')
+    readonly_fields = ('end_date', 'closed_at', 'closed_by')
+    inlines = [PeriodBalanceInline]
+
+    def has_add_permission(self, request):
+        return False  # periods are closed with `manage.py close_period` or the API
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TransactionsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "transactions"
+
+    def ready(self):
+        # keeps the document fields on Transaction in sync (transactions/signals.py is not used)
+        from . import documents  # noqa: F401
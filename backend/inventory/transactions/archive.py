@@ -0,0 +1,211 @@
+# transactions/archive.py
+#
+# Stands in for monthly partitioning of Transaction. The project runs on
+# SQLite, which has no declarative partitioning, and Django cannot route one
+# model to per-month tables without giving up what every caller relies on:
+# plain querysets, the generic relation to orders, bulk_create in
+# transitions.py, the sync feed and the admin. What partitions would buy is
+# had instead by (1) the (date, transaction_type) index (txn_period_idx): a
+# period query is a range scan that never touches other months, however many
+# years are stored; and (2) moving closed years out of the table into
+# compressed files: the equivalent of detaching old partitions, which keeps
+# the live table (and its indexes) bounded. Moving to native PostgreSQL
+# partitions later only changes the table, not these callers.
+import datetime
+import gzip
+import hashlib
+import json
+import tempfile
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.files import File
+from django.db import transaction
+
+from common import counters
+from common.signals import muted
+from master.models import Contact
+from . import periods
+from .models import ArchivedPeriod, Transaction
+
+BATCH_SIZE = 5000
+
+# Columns written per row; content types are stored as "app_label.model" so an
+# archive can be restored into a database whose content type ids differ
+COLUMNS = [
+    'id', 'transaction_type', 'content_type', 'object_id', 'date', 'amount', 'updated_at',
+    'document_number', 'party_id', 'party_name', 'document_status',
+]
+DOCUMENT_FIELDS = ['document_number', 'party_id', 'party_name', 'document_status']
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def year_range(year):
+    return datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)
+
+
+def archived_years():
+    return set(ArchivedPeriod.objects.values_list('year', flat=True))
+
+
+def _content_type_labels():
+    return {ct.pk: f"{ct.app_label}.{ct.model}" for ct in ContentType.objects.all()}
+
+
+def archive_year(year, batch_size=BATCH_SIZE):
+    """
+    Write every Transaction dated in year to a gzip'd JSON-lines file, record
+    it as an ArchivedPeriod and delete the rows from the live table. Only years
+    covered by a closed period can be archived; their balances live on in the
+    period snapshot.
+    """
+    if not periods.is_locked(datetime.date(year, 12, 31)):
+        raise ArchiveError(f"{year} is not closed yet.")
+    if ArchivedPeriod.objects.filter(year=year).exists():
+        raise ArchiveError(f"{year} is already archived.")
+
+    start, end = year_range(year)
+    rows = Transaction.objects.filter(date__gte=start, date__lt=end)
+    labels = _content_type_labels()
+    digest = hashlib.sha256()
+    count, total, last_pk = 0, Decimal('0'), 0
+
+    with tempfile.TemporaryFile() as tmp:
+        with gzip.GzipFile(fileobj=tmp, mode='wb') as gz:
+            for row in rows.order_by('date', 'pk').values_list(*[
+                'id', 'transaction_type', 'content_type_id', 'object_id', 'date', 'amount', 'updated_at',
+                *DOCUMENT_FIELDS,
+            ]).iterator(chunk_size=batch_size):
+                pk, kind, ct_id, object_id, date, amount, updated_at, *document = row
+                line = json.dumps([
+                    pk, kind, labels.get(ct_id), object_id, date.isoformat(), str(amount), updated_at.isoformat(),
+                    *document,
+                ], separators=(',', ':')).encode() + b'\n'
+                gz.write(line)
+                digest.update(line)
+                count, total, last_pk = count + 1, total + amount, max(last_pk, pk)
+
+        if not count:
+            raise ArchiveError(f"No transactions dated {year}.")
+
+        tmp.seek(0)
+        with transaction.atomic():
+            period = ArchivedPeriod(year=year, row_count=count, total_amount=total, sha256=digest.hexdigest())
+            period.file.save(f"transactions-{year}.jsonl.gz", File(tmp), save=False)
+            try:
+                period.save()
+                deleted = 0
+                # Archiving is not deleting: no tombstones or per-row events,
+                # so synced clients keep these closed-year rows, and a restore
+                # sends them again with a fresh updated_at. The count is
+                # adjusted once below.
+                with muted(Transaction):
+                    while True:
+                        pks = list(rows.filter(pk__lte=last_pk).values_list('pk', flat=True)[:batch_size])
+                        if not pks:
+                            break
+                        deleted += Transaction.objects.filter(pk__in=pks).delete()[0]
+                if deleted != count:
+                    raise ArchiveError(f"{year} changed while it was being archived; nothing was removed.")
+                counters.increment(Transaction, -deleted)
+            except Exception:
+                period.file.delete(save=False)
+                raise
+    return period
+
+
+def read_archive(period):
+    """Yield the rows of an ArchivedPeriod as dicts shaped like Transaction.values()."""
+    with period.file.open('rb') as fh, gzip.GzipFile(fileobj=fh) as gz:
+        for line in gz:
+            # archives written before the document fields existed have shorter rows
+            row = {'document_number': '', 'party_id': None, 'party_name': '', 'document_status': ''}
+            row.update(zip(COLUMNS, json.loads(line)))
+            row['date'] = datetime.date.fromisoformat(row['date'])
+            row['amount'] = Decimal(row['amount'])
+            row['updated_at'] = datetime.datetime.fromisoformat(row['updated_at'])
+            yield row
+
+
+def restore_year(year, batch_size=BATCH_SIZE):
+    """Move an archived year back into the live table, keeping the original ids."""
+    try:
+        period = ArchivedPeriod.objects.get(year=year)
+    except ArchivedPeriod.DoesNotExist:
+        raise ArchiveError(f"{year} is not archived.")
+
+    content_types = {f"{ct.app_label}.{ct.model}": ct for ct in ContentType.objects.all()}
+    with transaction.atomic():
+        batch, restored = [], 0
+        for row in read_archive(period):
+            batch.append(Transaction(
+                id=row['id'],
+                transaction_type=row['transaction_type'],
+                content_type=content_types.get(row['content_type']),
+                object_id=row['object_id'],
+                date=row['date'],
+                amount=row['amount'],
+                **{field: row[field] for field in DOCUMENT_FIELDS},
+            ))
+            if len(batch) >= batch_size:
+                restored += _restore_batch(batch)
+                batch = []
+        restored += _restore_batch(batch)
+        counters.increment(Transaction, restored)
+        period.delete()
+    period.file.delete(save=False)
+    return period.row_count
+
+
+def _restore_batch(batch):
+    # parties deleted since the archive was written are dropped, names are kept
+    known = set(Contact.objects.filter(
+        pk__in={row.party_id for row in batch if row.party_id}
+    ).values_list('pk', flat=True))
+    for row in batch:
+        if row.party_id not in known:
+            row.party_id = None
+    return len(Transaction.objects.bulk_create(batch))
+
+
+def archived_rows(date_from=None, date_to=None, transaction_type=None):
+    """Archived Transactions between date_from and date_to, read from the files of the years they cover."""
+    periods = ArchivedPeriod.objects.all()
+    if date_from:
+        periods = periods.filter(year__gte=date_from.year)
+    if date_to:
+        periods = periods.filter(year__lte=date_to.year)
+    for period in periods:
+        for row in read_archive(period):
+            if date_from and row['date'] < date_from or date_to and row['date'] > date_to:
+                continue
+            if transaction_type and row['transaction_type'] != transaction_type:
+                continue
+            yield row
+
+
+def ledger(date_from=None, date_to=None, transaction_type=None, include_archived=False):
+    """
+    Transactions between date_from and date_to as dicts, oldest first. Live
+    rows come from the indexed table; archived years are only read (from their
+    files) when include_archived is set.
+    """
+    if include_archived:
+        yield from archived_rows(date_from, date_to, transaction_type)
+
+    labels = _content_type_labels()
+    live = Transaction.objects.all()
+    if date_from:
+        live = live.filter(date__gte=date_from)
+    if date_to:
+        live = live.filter(date__lte=date_to)
+    if transaction_type:
+        live = live.filter(transaction_type=transaction_type)
+    for row in live.order_by('date', 'pk').values(
+        'id', 'transaction_type', 'content_type_id', 'object_id', 'date', 'amount', 'updated_at', *DOCUMENT_FIELDS
+    ).iterator(chunk_size=BATCH_SIZE):
+        row['content_type'] = labels.get(row.pop('content_type_id'))
+        yield row
@@ -0,0 +1,49 @@
+# transactions/documents.py
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from master.models import Contact
+from .models import Transaction
+from .transitions import ORDER_PARTIES, orders_bulk_updated
+
+
+def sync_order(order):
+    """Copy an order's document fields onto its Transactions, in one UPDATE that skips rows already current."""
+    fields = order.document_fields()
+    stale = ~Q(**fields)
+    Transaction.objects.filter(
+        content_type=ContentType.objects.get_for_model(order), object_id=order.pk
+    ).filter(stale).update(updated_at=timezone.now(), **fields)
+
+
+def sync_amount(order):
+    """Carry a recalculated order total onto its Transactions, in one UPDATE that skips rows already current."""
+    Transaction.objects.filter(
+        content_type=ContentType.objects.get_for_model(order), object_id=order.pk
+    ).exclude(amount=order.total_amount).update(amount=order.total_amount, updated_at=timezone.now())
+
+
+def order_saved(sender, instance, created, **kwargs):
+    if not created:
+        sync_order(instance)
+
+
+def orders_status_changed(sender, ids, status, **kwargs):
+    Transaction.objects.filter(
+        content_type=ContentType.objects.get_for_model(sender), object_id__in=ids
+    ).exclude(document_status=status).update(document_status=status, updated_at=timezone.now())
+
+
+def contact_saved(sender, instance, created, **kwargs):
+    if not created:
+        Transaction.objects.filter(party=instance).exclude(party_name=instance.name).update(
+            party_name=instance.name, updated_at=timezone.now()
+        )
+
+
+for model in ORDER_PARTIES:
+    post_save.connect(order_saved, sender=model, dispatch_uid=f"documents-{model._meta.label_lower}")
+post_save.connect(contact_saved, sender=Contact, dispatch_uid="documents-contact")
+orders_bulk_updated.connect(orders_status_changed, dispatch_uid="documents-bulk-status")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.archive import BATCH_SIZE, ArchiveError, archive_year, restore_year
+from transactions.models import ArchivedPeriod
+
+
+class Command(BaseCommand):
+    help = "Move a closed year of transactions to a compressed archive file (or back with --restore)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('year', type=int, nargs='?')
+        parser.add_argument('--restore', action='store_true', help="Load the archived year back into the table")
+        parser.add_argument('--list', action='store_true', help="List archived years")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for period in ArchivedPeriod.objects.all():
+                self.stdout.write(f"{period.year}: {period.row_count} rows, {period.total_amount} ({period.file.name})")
+            return
+        if options['year'] is None:
+            raise CommandError("year is required unless --list is given")
+
+        try:
+            if options['restore']:
+                count = restore_year(options['year'], batch_size=options['batch_size'])
+                self.stdout.write(self.style.SUCCESS(f"Restored {count} transactions from {options['year']}"))
+            else:
+                period = archive_year(options['year'], batch_size=options['batch_size'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"Archived {period.row_count} transactions from {period.year} to {period.file.name}"
+                ))
+        except ArchiveError as exc:
+            raise CommandError(str(exc))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from transactions.periods import PeriodError, close_period, reopen_latest
+
+
+class Command(BaseCommand):
+    help = "Close the books through a date, snapshotting balances (or reopen the latest period with --reopen)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('end_date', nargs='?', help="YYYY-MM-DD")
+        parser.add_argument('--reopen', action='store_true', help="Reopen the latest closed period")
+
+    def handle(self, *args, **options):
+        try:
+            if options['reopen']:
+                period = reopen_latest()
+                self.stdout.write(self.style.SUCCESS(f"Reopened the period ending {period.end_date}"))
+                return
+            end_date = parse_date(options['end_date'] or '')
+            if end_date is None:
+                raise CommandError("end_date (YYYY-MM-DD) is required unless --reopen is given")
+            period = close_period(end_date)
+        except PeriodError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f"Closed through {period.end_date} ({period.balances.count()} balances frozen)"
+        ))
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:53
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+
+
+def backfill_outstanding(apps, schema_editor):
+    PurchaseOrder = apps.get_model("transactions", "PurchaseOrder")
+    SalesOrder = apps.get_model("transactions", "SalesOrder")
+
+    # SalesOrder.total_amount was never written by the API, derive it from items
+    line_total = ExpressionWrapper(
+        F("items__quantity")
+        * F("items__unit_price")
+        * (1 + F("items__tax_percent") / 100),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+    for order in SalesOrder.objects.filter(total_amount=0).annotate(
+        line_sum=Sum(line_total)
+    ):
+        if order.line_sum:
+            order.total_amount = round(Decimal(order.line_sum), 2)
+            order.save(update_fields=["total_amount"])
+
+    for model in (PurchaseOrder, SalesOrder):
+        model.objects.filter(paid=False).update(
+            outstanding_amount=F("total_amount") - F("paid_amount")
+        )
+        model.objects.filter(outstanding_amount__lt=0).update(outstanding_amount=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("master", "0002_importjob"),
+        ("transactions", "0005_salesorder_total_amount"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="purchaseorder",
+            name="outstanding_amount",
+            field=models.DecimalField(
+                db_index=True, decimal_places=2, default=0, max_digits=12
+            ),
+        ),
+        migrations.AddField(
+            model_name="salesorder",
+            name="outstanding_amount",
+            field=models.DecimalField(
+                db_index=True, decimal_places=2, default=0, max_digits=12
+            ),
+        ),
+        migrations.AddField(
+            model_name="salesorder",
+            name="paid",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="salesorder",
+            name="paid_amount",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name="purchaseorder",
+            index=models.Index(
+                condition=models.Q(("outstanding_amount__gt", 0)),
+                fields=["vendor", "expected_date"],
+                name="po_open_by_vendor_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="salesorder",
+            index=models.Index(
+                condition=models.Q(("outstanding_amount__gt", 0)),
+                fields=["customer", "order_date"],
+                name="so_open_by_customer_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_outstanding, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0006_outstanding_balances"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="purchaseorder",
+            name="received_date",
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0008_updated_at"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="purchaseorder",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("draft", "Draft"),
+                    ("confirmed", "Confirmed"),
+                    ("received", "Received"),
+                    ("cancelled", "Cancelled"),
+                ],
+                default="draft",
+                max_length=20,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="salesorder",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("draft", "Draft"),
+                    ("confirmed", "Confirmed"),
+                    ("delivered", "Delivered"),
+                    ("cancelled", "Cancelled"),
+                ],
+                default="draft",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("transactions", "0009_order_status_choices"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedPeriod",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveIntegerField(unique=True)),
+                ("file", models.FileField(upload_to="archives/transactions/")),
+                ("row_count", models.PositiveIntegerField(default=0)),
+                (
+                    "total_amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("sha256", models.CharField(max_length=64)),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ["year"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["date", "transaction_type"], name="txn_period_idx"
+            ),
+        ),
+    ]
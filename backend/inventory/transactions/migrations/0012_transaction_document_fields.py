@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Concat
+
+ORDERS = [
+    ("purchaseorder", "PurchaseOrder", "PO-", "vendor"),
+    ("salesorder", "SalesOrder", "SO-", "customer"),
+]
+
+
+def backfill_documents(apps, schema_editor):
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    Transaction = apps.get_model("transactions", "Transaction")
+
+    for model_name, class_name, prefix, party in ORDERS:
+        content_type = ContentType.objects.filter(
+            app_label="transactions", model=model_name
+        ).first()
+        if content_type is None:
+            continue
+        order = apps.get_model("transactions", class_name).objects.filter(
+            pk=OuterRef("object_id")
+        )
+        Transaction.objects.filter(
+            content_type=content_type, object_id__isnull=False
+        ).update(
+            document_number=Concat(
+                Value(prefix), Cast("object_id", output_field=CharField())
+            ),
+            party_id=Subquery(order.values(f"{party}_id")[:1]),
+            # orders deleted since leave their postings with empty fields
+            party_name=Coalesce(
+                Subquery(order.values(f"{party}__name")[:1]), Value("")
+            ),
+            document_status=Coalesce(Subquery(order.values("status")[:1]), Value("")),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("master", "0003_updated_at"),
+        ("transactions", "0011_period_close"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="document_number",
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="document_status",
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="party",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="master.contact",
+            ),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="party_name",
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["content_type", "object_id"], name="txn_document_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
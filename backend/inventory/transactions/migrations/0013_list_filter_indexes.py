@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("master", "0003_updated_at"),
+        ("transactions", "0012_transaction_document_fields"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="purchaseorder",
+            index=models.Index(fields=["order_date"], name="po_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="purchaseorder",
+            index=models.Index(
+                fields=["status", "order_date"], name="po_status_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="purchaseorder",
+            index=models.Index(
+                fields=["vendor", "order_date"], name="po_vendor_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="salesorder",
+            index=models.Index(fields=["order_date"], name="so_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="salesorder",
+            index=models.Index(
+                fields=["status", "order_date"], name="so_status_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="salesorder",
+            index=models.Index(
+                fields=["customer", "order_date"], name="so_customer_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["transaction_type", "date"], name="txn_type_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["party", "date"], name="txn_party_date_idx"),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def clear_cancelled(apps, schema_editor):
+    for name in ("PurchaseOrder", "SalesOrder"):
+        apps.get_model("transactions", name).objects.filter(
+            status="cancelled", outstanding_amount__gt=0
+        ).update(outstanding_amount=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0013_list_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_cancelled, migrations.RunPython.noop),
+    ]
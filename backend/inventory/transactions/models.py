@@ -1,3 +1,6 @@
+from decimal import Decimal
+
+from django.conf import settings
 from django.db import models
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
@@ -13,26 +16,93 @@ PAYMENT_CHOICES = [
     ('bank_transfer', 'Bank Transfer'),
 ]
 
+
+def outstanding_balance(total_amount, paid_amount, paid, status=None):
+    # nothing is owed on a cancelled order (PurchaseOrder/SalesOrder.CANCELLED),
+    # whatever was left unpaid
+    if paid or status == 'cancelled':
+        return Decimal('0')
+    return max(Decimal(str(total_amount)) - Decimal(str(paid_amount)), Decimal('0'))
+
+
 class PurchaseOrder(models.Model):
+    DRAFT = 'draft'
+    CONFIRMED = 'confirmed'
+    RECEIVED = 'received'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (DRAFT, 'Draft'),
+        (CONFIRMED, 'Confirmed'),
+        (RECEIVED, 'Received'),
+        (CANCELLED, 'Cancelled'),
+    ]
+    # allowed status changes: from -> {to}
+    TRANSITIONS = {
+        DRAFT: {CONFIRMED, CANCELLED},
+        CONFIRMED: {RECEIVED, CANCELLED},
+        RECEIVED: set(),
+        CANCELLED: set(),
+    }
+
     vendor = models.ForeignKey(
         Contact, limit_choices_to={'type__in': ['vendor', 'both']}, on_delete=models.CASCADE
     )
     order_date = models.DateField(default=timezone.now)
     expected_date = models.DateField(blank=True, null=True)
-    status = models.CharField(max_length=20, default='draft')  # draft, confirmed, received
+    received_date = models.DateField(blank=True, null=True)  # set when status becomes 'received'
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=DRAFT)
     total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     paid_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     paid = models.BooleanField(default=False)
     payment_method = models.CharField(max_length=50, choices=PAYMENT_CHOICES, default='cash')
+    # total_amount - paid_amount, kept in sync by save(); drives the aging report
+    outstanding_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['vendor', 'expected_date'],
+                condition=models.Q(outstanding_amount__gt=0),
+                name='po_open_by_vendor_idx',
+            ),
+            # list filters (see IndexedFilterMixin): each leads with a filter param
+            models.Index(fields=['order_date'], name='po_date_idx'),
+            models.Index(fields=['status', 'order_date'], name='po_status_date_idx'),
+            models.Index(fields=['vendor', 'order_date'], name='po_vendor_date_idx'),
+        ]
+
+    def can_transition_to(self, status):
+        return status in self.TRANSITIONS.get(self.status, set())
 
     def calculate_total(self):
         total = sum([item.total for item in self.items.all()])
         self.total_amount = total
         return total
 
+    def save(self, *args, **kwargs):
+        self.outstanding_amount = outstanding_balance(self.total_amount, self.paid_amount, self.paid, self.status)
+        derived = {'outstanding_amount', 'updated_at'}
+        if self.status == self.RECEIVED and self.received_date is None:
+            self.received_date = timezone.localdate()
+            derived.add('received_date')
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *derived}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"PO-{self.id} ({self.vendor.name})"
 
+    def document_fields(self):
+        """Values copied onto this order's ledger Transactions."""
+        return {
+            'document_number': f"PO-{self.id}",
+            'party_id': self.vendor_id,
+            'party_name': self.vendor.name,
+            'document_status': self.status,
+        }
+
 
 class PurchaseOrderItem(models.Model):
     purchase_order = models.ForeignKey(
@@ -55,21 +125,73 @@ class PurchaseOrderItem(models.Model):
 # Sales Models
 # ----------------------------
 class SalesOrder(models.Model):
+    DRAFT = 'draft'
+    CONFIRMED = 'confirmed'
+    DELIVERED = 'delivered'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (DRAFT, 'Draft'),
+        (CONFIRMED, 'Confirmed'),
+        (DELIVERED, 'Delivered'),
+        (CANCELLED, 'Cancelled'),
+    ]
+    TRANSITIONS = {
+        DRAFT: {CONFIRMED, CANCELLED},
+        CONFIRMED: {DELIVERED, CANCELLED},
+        DELIVERED: set(),
+        CANCELLED: set(),
+    }
+
     customer = models.ForeignKey(
         Contact, limit_choices_to={'type__in': ['customer', 'both']}, on_delete=models.CASCADE
     )
     order_date = models.DateField(default=timezone.now)
-    status = models.CharField(max_length=20, default='draft')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=DRAFT)
     total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    paid_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    paid = models.BooleanField(default=False)
+    outstanding_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['customer', 'order_date'],
+                condition=models.Q(outstanding_amount__gt=0),
+                name='so_open_by_customer_idx',
+            ),
+            models.Index(fields=['order_date'], name='so_date_idx'),
+            models.Index(fields=['status', 'order_date'], name='so_status_date_idx'),
+            models.Index(fields=['customer', 'order_date'], name='so_customer_date_idx'),
+        ]
+
+    def can_transition_to(self, status):
+        return status in self.TRANSITIONS.get(self.status, set())
 
     def calculate_total(self):
         total = sum([item.total for item in self.items.all()])
         self.total_amount = total
         return total
 
+    def save(self, *args, **kwargs):
+        self.outstanding_amount = outstanding_balance(self.total_amount, self.paid_amount, self.paid, self.status)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'outstanding_amount', 'updated_at'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"SO-{self.id} ({self.customer.name})"
 
+    def document_fields(self):
+        """Values copied onto this order's ledger Transactions."""
+        return {
+            'document_number': f"SO-{self.id}",
+            'party_id': self.customer_id,
+            'party_name': self.customer.name,
+            'document_status': self.status,
+        }
+
 
 
 
@@ -110,6 +232,89 @@ class Transaction(models.Model):
 
     date = models.DateField(default=timezone.now)
     amount = models.DecimalField(max_digits=12, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Copied from the related order (see transactions/documents.py) so lists and
+    # ledgers are read from this table alone, without resolving related_object
+    document_number = models.CharField(max_length=20, blank=True)
+    party = models.ForeignKey(Contact, null=True, blank=True, related_name='+', on_delete=models.SET_NULL)
+    party_name = models.CharField(max_length=100, blank=True)
+    document_status = models.CharField(max_length=20, blank=True)
+
+    class Meta:
+        indexes = [
+            # ledger queries are bounded by period, so recent months are an
+            # index range scan however many years the table holds
+            models.Index(fields=['date', 'transaction_type'], name='txn_period_idx'),
+            models.Index(fields=['content_type', 'object_id'], name='txn_document_idx'),
+            models.Index(fields=['transaction_type', 'date'], name='txn_type_date_idx'),
+            models.Index(fields=['party', 'date'], name='txn_party_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.transaction_type} - {self.amount} on {self.date}"
+
+    def save(self, *args, **kwargs):
+        if self.object_id and not self.document_number:
+            order = self.related_object
+            if hasattr(order, 'document_fields'):
+                for field, value in order.document_fields().items():
+                    setattr(self, field, value)
+        super().save(*args, **kwargs)
+
+
+class ArchivedPeriod(models.Model):
+    """A closed year of Transactions moved out of the live table into a gzip file."""
+    year = models.PositiveIntegerField(unique=True)
+    file = models.FileField(upload_to='archives/transactions/')
+    row_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    sha256 = models.CharField(max_length=64)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['year']
+
+    def __str__(self):
+        return f"Transactions {self.year} ({self.row_count} rows)"
+
+
+# ----------------------------
+# Period close
+# ----------------------------
+class FiscalPeriod(models.Model):
+    """
+    A closed period ending on end_date. Orders and transactions dated on or
+    before the latest end_date are locked, and the period's balances are
+    frozen in PeriodBalance so reports only aggregate what came after.
+    """
+    end_date = models.DateField(unique=True)
+    closed_at = models.DateTimeField(auto_now_add=True)
+    closed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='+'
+    )
+
+    class Meta:
+        ordering = ['-end_date']
+
+    def __str__(self):
+        return f"Closed through {self.end_date}"
+
+
+class PeriodBalance(models.Model):
+    """
+    Cumulative balance at a period's end_date. Rows without a party are ledger
+    accounts (one per transaction type); party rows hold a contact's order
+    totals under the 'purchases' / 'sales' account.
+    """
+    PURCHASES = 'purchases'
+    SALES = 'sales'
+
+    period = models.ForeignKey(FiscalPeriod, related_name='balances', on_delete=models.CASCADE)
+    account = models.CharField(max_length=20)
+    party = models.ForeignKey(Contact, null=True, blank=True, related_name='+', on_delete=models.PROTECT)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.account} {self.party_id or ''} {self.amount}".strip()
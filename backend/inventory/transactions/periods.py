@@ -0,0 +1,123 @@
+# transactions/periods.py
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from . import archive
+from .models import FiscalPeriod, PeriodBalance, PurchaseOrder, SalesOrder, Transaction
+
+# account name on party rows -> (order model, party field)
+PARTY_ACCOUNTS = {
+    PeriodBalance.PURCHASES: (PurchaseOrder, 'vendor_id'),
+    PeriodBalance.SALES: (SalesOrder, 'customer_id'),
+}
+
+
+class PeriodError(Exception):
+    pass
+
+
+def closed_through():
+    """End date of the latest closed period, or None while nothing is closed."""
+    return FiscalPeriod.objects.aggregate(end=Max('end_date'))['end']
+
+
+def is_locked(date, through=None):
+    through = closed_through() if through is None else through
+    return through is not None and date is not None and date <= through
+
+
+def _empty():
+    return {'amount': Decimal('0'), 'count': 0}
+
+
+def _add(totals, key, amount, count):
+    totals[key]['amount'] += amount or Decimal('0')
+    totals[key]['count'] += count
+
+
+def balances(as_of=None):
+    """
+    Ledger account and party order balances as of a date: the latest snapshot
+    on or before as_of plus the rows dated after it, so the cost depends on
+    the open period rather than on the whole history. Rows of archived years
+    in that range are read from their archive files.
+    """
+    as_of = as_of or timezone.localdate()
+    snapshot = FiscalPeriod.objects.filter(end_date__lte=as_of).first()
+    accounts, parties = defaultdict(_empty), defaultdict(_empty)
+
+    if snapshot:
+        for row in snapshot.balances.values('account', 'party_id', 'amount', 'count'):
+            if row['party_id'] is None:
+                _add(accounts, row['account'], row['amount'], row['count'])
+            else:
+                _add(parties, (row['account'], row['party_id']), row['amount'], row['count'])
+    since = snapshot.end_date if snapshot else None
+
+    ledger = Transaction.objects.filter(date__lte=as_of)
+    if since:
+        ledger = ledger.filter(date__gt=since)
+    for row in ledger.values('transaction_type').annotate(amount=Sum('amount'), count=Count('id')).order_by():
+        _add(accounts, row['transaction_type'], row['amount'], row['count'])
+    # archived years are closed, so usually inside the snapshot; an as_of that
+    # falls before it (or a snapshot older than the archive) reads their files
+    date_from = since + datetime.timedelta(days=1) if since else None
+    for row in archive.archived_rows(date_from, as_of):
+        _add(accounts, row['transaction_type'], row['amount'], 1)
+
+    for account, (model, party_field) in PARTY_ACCOUNTS.items():
+        orders = model.objects.filter(order_date__lte=as_of)
+        if since:
+            orders = orders.filter(order_date__gt=since)
+        for row in orders.values(party_field).annotate(amount=Sum('total_amount'), count=Count('id')).order_by():
+            _add(parties, (account, row[party_field]), row['amount'], row['count'])
+
+    return {
+        'as_of': as_of,
+        'snapshot': since,
+        'accounts': [{'account': account, **totals} for account, totals in sorted(accounts.items())],
+        'parties': [
+            {'account': account, 'party': party, **totals}
+            for (account, party), totals in sorted(parties.items())
+        ],
+    }
+
+
+def close_period(end_date, user=None):
+    """
+    Freeze balances as of end_date and lock everything dated on or before it.
+    Built from the previous snapshot plus the period's own rows.
+    """
+    with transaction.atomic():
+        # serialize concurrent closes on the latest period row
+        latest = FiscalPeriod.objects.select_for_update().first()
+        if latest and end_date <= latest.end_date:
+            raise PeriodError(f"Already closed through {latest.end_date}.")
+        if end_date >= timezone.localdate():
+            raise PeriodError("Only periods that have ended can be closed.")
+
+        totals = balances(end_date)
+        period = FiscalPeriod.objects.create(end_date=end_date, closed_by=user)
+        PeriodBalance.objects.bulk_create(
+            [PeriodBalance(period=period, account=row['account'], amount=row['amount'], count=row['count'])
+             for row in totals['accounts']]
+            + [PeriodBalance(period=period, account=row['account'], party_id=row['party'],
+                             amount=row['amount'], count=row['count'])
+               for row in totals['parties']]
+        )
+    return period
+
+
+def reopen_latest():
+    """Drop the latest closed period (and its snapshot), unlocking its dates."""
+    with transaction.atomic():
+        latest = FiscalPeriod.objects.select_for_update().first()
+        if latest is None:
+            raise PeriodError("No closed period to reopen.")
+        latest.delete()
+    return latest
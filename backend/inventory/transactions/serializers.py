@@ -1,26 +1,194 @@
+from decimal import Decimal
+
+from django.db import transaction
 from rest_framework import serializers
+from common.cache import bump_model_version
+from common.signals import muted
+from master.models import Product
 from .models import PurchaseOrder, PurchaseOrderItem, SalesOrder, SalesOrderItem, Transaction
+from . import documents, periods
+
+class OrderStatusMixin:
+    """Rejects status changes the order's TRANSITIONS do not allow."""
+
+    def validate_status(self, value):
+        order = self.instance
+        if order is not None and value != order.status and not order.can_transition_to(value):
+            raise serializers.ValidationError(f"Cannot change status from '{order.status}' to '{value}'.")
+        return value
+
+
+def _item_value(item, field):
+    # compare foreign keys by id so an unchanged product costs no query
+    return getattr(item, item._meta.get_field(field).attname)
+
+
+def _raw(value):
+    return getattr(value, 'pk', value)
+
+
+def _line_total(item):
+    # new lines still hold model defaults (ints), so coerce before the Decimal math
+    return item.quantity * Decimal(str(item.unit_price)) * (1 + Decimal(str(item.tax_percent)) / 100)
+
+
+class PeriodLockMixin:
+    """
+    Rejects writes that would change figures frozen by a period close: new
+    records dated in a closed period, and changes to `locked_fields` (or the
+    items) of records dated in one. Status and payment updates stay allowed.
+    """
+    date_field = 'order_date'
+    locked_fields = ()
+
+    def validate(self, attrs):
+        through = periods.closed_through()
+        if through is not None:
+            order = self.instance
+            new_date = attrs.get(self.date_field, getattr(order, self.date_field, None))
+            if order is None:
+                locked = periods.is_locked(new_date, through)
+            else:
+                locked = (
+                    periods.is_locked(getattr(order, self.date_field), through)
+                    or periods.is_locked(new_date, through)
+                ) and self._changes_locked_values(order, attrs)
+            if locked:
+                raise serializers.ValidationError(f"The period is closed through {through}.")
+        return super().validate(attrs)
+
+    def _changes_locked_values(self, instance, attrs):
+        for field in (self.date_field, *self.locked_fields):
+            if field in attrs and _item_value(instance, field) != _raw(attrs[field]):
+                return True
+        if 'items' not in attrs:
+            return False
+        existing = {item.pk: item for item in instance.items.all()}
+        if len(attrs['items']) != len(existing):
+            return True
+        for data in attrs['items']:
+            item = existing.get(data.get('id'))
+            if item is None or any(
+                _item_value(item, field) != _raw(value) for field, value in data.items() if field != 'id'
+            ):
+                return True
+        return False
+
+
+class ItemListSerializer(serializers.ListSerializer):
+    """Validates order lines with one product lookup instead of one per line."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            ids = {str(row.get('product')) for row in data if isinstance(row, dict)}
+            self.products = Product.objects.in_bulk([int(pk) for pk in ids if pk.isdigit()])
+        return super().to_internal_value(data)
+
+
+class ItemProductField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        products = getattr(self.parent.parent, 'products', None) or {}
+        product = products.get(int(data)) if str(data).isdigit() else None
+        return product or super().to_internal_value(data)
+
+
+class NestedItemsMixin:
+    """
+    PUT/PATCH support for an order's nested `items`. When `items` is sent it is
+    the complete list of lines: entries with an `id` update that line, entries
+    without one are new lines, and existing lines left out are deleted. Only
+    lines whose values actually changed are written (one bulk_update), new
+    lines go in with one bulk_create, removed ones with one delete, and the
+    order total is recalculated once and carried onto its ledger Transactions.
+    """
+    item_model = None
+    item_parent_field = None
+    item_required_fields = ('product', 'quantity', 'unit_price')
+
+    def update(self, instance, validated_data):
+        items_data = validated_data.pop('items', None)
+        with transaction.atomic():
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            if items_data is not None:
+                instance.total_amount = round(self.sync_items(instance, items_data), 2)
+            instance.save()  # also the one touch of updated_at for the item changes
+            if items_data is not None:
+                documents.sync_amount(instance)
+        return instance
+
+    def sync_items(self, order, items_data):
+        existing = {item.pk: item for item in order.items.all()}
+        kept, to_update, to_create = [], [], []
+        changed_fields = set()
+
+        for data in items_data:
+            pk = data.pop('id', None)
+            if pk is None:
+                missing = [field for field in self.item_required_fields if field not in data]
+                if missing:
+                    raise serializers.ValidationError({'items': [f"New items need {', '.join(missing)}."]})
+                to_create.append(self.item_model(**{self.item_parent_field: order}, **data))
+                continue
+
+            item = existing.pop(pk, None)
+            if item is None:
+                raise serializers.ValidationError({'items': [f"Item {pk} is not a line of this order."]})
+            dirty = [field for field, value in data.items() if _item_value(item, field) != _raw(value)]
+            for field in dirty:
+                setattr(item, field, data[field])
+            if dirty:
+                to_update.append(item)
+                changed_fields.update(dirty)
+            kept.append(item)
+
+        if existing:
+            # no per-row receivers (parent touch, version bump): done once below
+            with muted(self.item_model):
+                self.item_model.objects.filter(pk__in=existing.keys()).delete()
+        if to_update:
+            self.item_model.objects.bulk_update(to_update, sorted(changed_fields))
+        if to_create:
+            self.item_model.objects.bulk_create(to_create)
+        if existing or to_update or to_create:
+            bump_model_version(self.item_model)  # bulk writes send no post_save
+
+        return sum((_line_total(item) for item in kept + to_create), Decimal('0'))
+
+
+class BulkTransitionSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=10000)
+    status = serializers.CharField()
+
 
 # ----------------------------
 # Purchase Serializers
 # ----------------------------
 class PurchaseOrderItemSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)  # identifies the line on updates
+    product = ItemProductField(queryset=Product.objects.all())
     total = serializers.ReadOnlyField()
 
     class Meta:
         model = PurchaseOrderItem
+        list_serializer_class = ItemListSerializer
         exclude = ['purchase_order']
 
-class PurchaseOrderSerializer(serializers.ModelSerializer):
+class PurchaseOrderSerializer(OrderStatusMixin, PeriodLockMixin, NestedItemsMixin, serializers.ModelSerializer):
     items = PurchaseOrderItemSerializer(many=True)
     total_amount = serializers.ReadOnlyField()  # frontend doesn’t need to send it
+    item_model = PurchaseOrderItem
+    item_parent_field = 'purchase_order'
+    locked_fields = ('vendor',)
 
     class Meta:
         model = PurchaseOrder
         fields = [
-            'id', 'vendor', 'order_date', 'expected_date', 'status',
-            'items', 'total_amount', 'paid', 'paid_amount', 'payment_method'
+            'id', 'vendor', 'order_date', 'expected_date', 'received_date', 'status',
+            'items', 'total_amount', 'paid', 'paid_amount', 'payment_method',
+            'outstanding_amount'
         ]
+        read_only_fields = ['outstanding_amount']
 
     def create(self, validated_data):
         items_data = validated_data.pop('items', [])
@@ -28,6 +196,7 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
 
         total = 0
         for item_data in items_data:
+            item_data.pop('id', None)
             item = PurchaseOrderItem.objects.create(purchase_order=purchase_order, **item_data)
             total += item.total
 
@@ -39,19 +208,29 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
 # Sales Serializers
 # ----------------------------
 class SalesOrderItemSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)  # identifies the line on updates
+    product = ItemProductField(queryset=Product.objects.all())
     total = serializers.ReadOnlyField()
 
     class Meta:
         model = SalesOrderItem
+        list_serializer_class = ItemListSerializer
         exclude = ['sales_order']
 
-class SalesOrderSerializer(serializers.ModelSerializer):
+class SalesOrderSerializer(OrderStatusMixin, PeriodLockMixin, NestedItemsMixin, serializers.ModelSerializer):
     items = SalesOrderItemSerializer(many=True)
     total_amount = serializers.SerializerMethodField()  # ✅ Add this
+    item_model = SalesOrderItem
+    item_parent_field = 'sales_order'
+    locked_fields = ('customer',)
 
     class Meta:
         model = SalesOrder
-        fields = ['id', 'customer', 'order_date', 'status', 'items', 'total_amount']  # ✅ Include field
+        fields = [
+            'id', 'customer', 'order_date', 'status', 'items', 'total_amount',
+            'paid', 'paid_amount', 'outstanding_amount'
+        ]
+        read_only_fields = ['outstanding_amount']
 
     def get_total_amount(self, obj):
         return sum([
@@ -65,9 +244,13 @@ class SalesOrderSerializer(serializers.ModelSerializer):
 
         total_amount = 0
         for item_data in items_data:
+            item_data.pop('id', None)
             item = SalesOrderItem.objects.create(sales_order=sales_order, **item_data)
             total_amount += item.quantity * float(item.unit_price) * (1 + float(item.tax_percent)/100)
 
+        sales_order.total_amount = round(total_amount, 2)
+        sales_order.save()
+
         # ✅ Auto-create Transaction entry
         Transaction.objects.create(
             transaction_type='sales_order',
@@ -78,18 +261,28 @@ class SalesOrderSerializer(serializers.ModelSerializer):
         return sales_order
 
 
+class PaymentSerializer(serializers.Serializer):
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal('0.01'))
+
+
 # ----------------------------
 # Transaction Serializer
 # ----------------------------
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(PeriodLockMixin, serializers.ModelSerializer):
     related_name = serializers.SerializerMethodField()
+    date_field = 'date'
+    locked_fields = ('transaction_type', 'amount', 'content_type', 'object_id')
 
     class Meta:
         model = Transaction
         fields = '__all__'  # keeps all original fields
+        read_only_fields = ['document_number', 'party', 'party_name', 'document_status']
         # optionally: fields = ['id', 'transaction_type', 'date', 'amount', 'related_name', ...]
 
     def get_related_name(self, obj):
+        if obj.document_number:
+            # same text as str(order), from the copied fields instead of related_object
+            return f"{obj.document_number} ({obj.party_name})"
         if obj.related_object:
             # Customize as needed for PurchaseOrder / SalesOrder
             return str(obj.related_object)
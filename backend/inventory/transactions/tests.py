@@ -1,3 +1,508 @@
-from django.test import TestCase
+import datetime
+import importlib
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from common import counters
+from common.models import RowCount, Tombstone
+from common.pagination import EstimatedCountPaginator
+from master.models import Contact, Product
+from . import archive, periods, transitions
+from .models import ArchivedPeriod, PurchaseOrder, PurchaseOrderItem, SalesOrder, Transaction
+
+
+class OrderTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='x', role=User.OWNER)
+        cls.accountant = User.objects.create_user('accountant', password='x', role=User.ACCOUNTANT)
+        cls.vendor = Contact.objects.create(name='Vendor', type=Contact.VENDOR)
+        cls.customer = Contact.objects.create(name='Customer', type=Contact.CUSTOMER)
+        cls.product = Product.objects.create(
+            name='Widget', type=Product.GOODS, sales_price=10, purchase_price=8,
+            sale_tax_percent=0, purchase_tax_percent=0, category='parts',
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def purchase_order(self, total=Decimal('80.00'), **fields):
+        order = PurchaseOrder.objects.create(vendor=self.vendor, total_amount=total, **fields)
+        PurchaseOrderItem.objects.create(purchase_order=order, product=self.product, quantity=10, unit_price=8)
+        return order
+
+
+# ----------------------------
+# Status transitions
+# ----------------------------
+class StatusTransitionTests(OrderTestCase):
+    def test_patch_follows_transitions(self):
+        order = self.purchase_order()
+        url = f'/api/transactions/purchase-orders/{order.pk}/'
+
+        response = self.client.patch(url, {'status': PurchaseOrder.RECEIVED}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.patch(url, {'status': PurchaseOrder.CONFIRMED}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.patch(url, {'status': PurchaseOrder.RECEIVED}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        order.refresh_from_db()
+        self.assertEqual(order.received_date, timezone.localdate())
+        self.assertEqual(Transaction.objects.filter(transaction_type='vendor_bill', object_id=order.pk).count(), 1)
+
+    def test_bulk_transition_is_all_or_nothing(self):
+        draft = self.purchase_order()
+        received = self.purchase_order(status=PurchaseOrder.RECEIVED)
+
+        with self.assertRaises(transitions.TransitionError) as raised:
+            transitions.bulk_transition(PurchaseOrder, [draft.pk, received.pk], PurchaseOrder.CONFIRMED)
+        self.assertIn('transitions', raised.exception.errors)
+        draft.refresh_from_db()
+        self.assertEqual(draft.status, PurchaseOrder.DRAFT)
+
+    def test_bulk_transition_posts_ledger_rows(self):
+        orders = [self.purchase_order(status=PurchaseOrder.CONFIRMED) for _ in range(3)]
+        counts = transitions.bulk_transition(PurchaseOrder, [order.pk for order in orders], PurchaseOrder.RECEIVED)
+
+        self.assertEqual(counts, {PurchaseOrder.CONFIRMED: 3})
+        postings = Transaction.objects.filter(transaction_type='vendor_bill')
+        self.assertEqual(postings.count(), 3)
+        self.assertEqual(set(postings.values_list('document_number', flat=True)), {f"PO-{o.pk}" for o in orders})
+
+    def test_bulk_transition_unknown_ids(self):
+        with self.assertRaises(transitions.TransitionError) as raised:
+            transitions.bulk_transition(PurchaseOrder, [999999], PurchaseOrder.CONFIRMED)
+        self.assertIn('ids', raised.exception.errors)
+
+    def test_bulk_transition_is_owner_only(self):
+        order = self.purchase_order()
+        self.client.force_authenticate(self.accountant)
+        response = self.client.post(
+            '/api/transactions/purchase-orders/bulk-transition/',
+            {'ids': [order.pk], 'status': PurchaseOrder.CONFIRMED}, format='json',
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+
+# ----------------------------
+# Nested items
+# ----------------------------
+class NestedItemsTests(OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        self.order = self.purchase_order()
+        self.line = self.order.items.get()
+        self.url = f'/api/transactions/purchase-orders/{self.order.pk}/'
+
+    def test_items_are_diffed(self):
+        transitions.bulk_transition(PurchaseOrder, [self.order.pk], PurchaseOrder.CONFIRMED)
+        transitions.bulk_transition(PurchaseOrder, [self.order.pk], PurchaseOrder.RECEIVED)
+        other = PurchaseOrderItem.objects.create(
+            purchase_order=self.order, product=self.product, quantity=1, unit_price=5,
+        )
+        response = self.client.patch(self.url, {'items': [
+            {'id': self.line.pk, 'quantity': 5},
+            {'product': self.product.pk, 'quantity': 2, 'unit_price': '3.50'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        lines = {item.pk: item for item in self.order.items.all()}
+        self.assertNotIn(other.pk, lines)
+        self.assertEqual(lines[self.line.pk].quantity, 5)
+        self.assertEqual(len(lines), 2)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_amount, Decimal('47.00'))
+        posting = Transaction.objects.get(transaction_type='vendor_bill', object_id=self.order.pk)
+        self.assertEqual(posting.amount, Decimal('47.00'))
+
+    def test_removing_lines_costs_a_handful_of_queries(self):
+        PurchaseOrderItem.objects.bulk_create([
+            PurchaseOrderItem(purchase_order=self.order, product=self.product, quantity=1, unit_price=1)
+            for _ in range(50)
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, {'items': [{'id': self.line.pk}]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.order.items.count(), 1)
+        order_updates = [q for q in queries if q['sql'].startswith('UPDATE "transactions_purchaseorder"')]
+        self.assertEqual(len(order_updates), 1)
+        self.assertLess(len(queries), 30)
+
+    def test_unchanged_items_are_not_written(self):
+        with mock.patch.object(type(PurchaseOrderItem.objects), 'bulk_update') as bulk_update:
+            response = self.client.patch(self.url, {'items': [
+                {'id': self.line.pk, 'quantity': 10, 'unit_price': '8.00'},
+            ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        bulk_update.assert_not_called()
+
+    def test_foreign_item_is_rejected(self):
+        other_order = self.purchase_order()
+        foreign = other_order.items.get()
+        response = self.client.patch(self.url, {'items': [{'id': foreign.pk, 'quantity': 1}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(PurchaseOrderItem.objects.filter(pk=self.line.pk).exists())
+
+    def test_new_item_needs_required_fields(self):
+        response = self.client.patch(self.url, {'items': [{'quantity': 1}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.order.items.count(), 1)
+
+
+class CancelledOutstandingTests(OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        self.order_date = timezone.localdate() - timedelta(days=45)
+
+    def test_save_clears_outstanding_of_cancelled_order(self):
+        order = self.purchase_order(order_date=self.order_date, expected_date=self.order_date)
+        self.assertEqual(order.outstanding_amount, Decimal('80.00'))
+
+        order.status = PurchaseOrder.CANCELLED
+        order.save()
+        order.refresh_from_db()
+        self.assertEqual(order.outstanding_amount, 0)
+
+    def test_bulk_cancel_clears_outstanding_and_aging(self):
+        order = self.purchase_order(order_date=self.order_date, expected_date=self.order_date)
+        sale = SalesOrder.objects.create(customer=self.customer, order_date=self.order_date, total_amount=50)
+
+        transitions.bulk_transition(PurchaseOrder, [order.pk], PurchaseOrder.CANCELLED)
+        transitions.bulk_transition(SalesOrder, [sale.pk], SalesOrder.CANCELLED)
+
+        order.refresh_from_db()
+        sale.refresh_from_db()
+        self.assertEqual(order.outstanding_amount, 0)
+        self.assertEqual(sale.outstanding_amount, 0)
+        response = self.client.get('/api/reports/aging/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['payables']['parties'], [])
+        self.assertEqual(response.data['receivables']['parties'], [])
+
+
+class TransactionEndpointTests(OrderTestCase):
+    def test_ledger_is_read_only(self):
+        order = self.purchase_order(status=PurchaseOrder.CONFIRMED)
+        transitions.bulk_transition(PurchaseOrder, [order.pk], PurchaseOrder.RECEIVED)
+        posting = Transaction.objects.get(transaction_type='vendor_bill')
+
+        response = self.client.get('/api/transactions/transactions/', {'transaction_type': 'vendor_bill'})
+        self.assertEqual(response.status_code, 200)
+        self.client.force_authenticate(self.accountant)
+        response = self.client.post('/api/transactions/transactions/', {'amount': 1}, format='json')
+        self.assertEqual(response.status_code, 405)
+        self.client.force_authenticate(self.owner)
+        response = self.client.delete(f'/api/transactions/transactions/{posting.pk}/')
+        self.assertEqual(response.status_code, 405)
+
+
+class CachedResponseTests(OrderTestCase):
+    def test_write_invalidates_cached_list(self):
+        order = self.purchase_order()
+        url = '/api/transactions/purchase-orders/'
+        self.assertEqual(self.client.get(url)['X-Cache'], 'miss')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'hit')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'{url}{order.pk}/', {'expected_date': '2030-01-01'}, format='json')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'miss')
+
+
+
+# ----------------------------
+# Period close
+# ----------------------------
+class PeriodLockTests(OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        self.closed_date = timezone.localdate() - timedelta(days=40)
+        self.order = self.purchase_order(order_date=self.closed_date, expected_date=self.closed_date)
+        self.url = f'/api/transactions/purchase-orders/{self.order.pk}/'
+        response = self.client.post(
+            '/api/transactions/periods/', {'end_date': str(self.closed_date + timedelta(days=1))}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_closed_figures_cannot_change(self):
+        response = self.client.patch(self.url, {'vendor': self.customer.pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+        line = self.order.items.get()
+        response = self.client.patch(self.url, {'items': [{'id': line.pk, 'quantity': 1}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.delete(self.url).status_code, 400)
+
+    def test_status_and_payment_stay_open(self):
+        response = self.client.patch(
+            self.url, {'status': PurchaseOrder.CONFIRMED, 'paid_amount': '10.00'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_cannot_move_into_closed_period(self):
+        open_order = self.purchase_order()
+        url = f'/api/transactions/purchase-orders/{open_order.pk}/'
+        response = self.client.patch(url, {'order_date': str(self.closed_date)}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_close_is_owner_only_and_forward_only(self):
+        response = self.client.post('/api/transactions/periods/', {'end_date': str(self.closed_date)}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(self.accountant)
+        later = str(self.closed_date + timedelta(days=5))
+        response = self.client.post('/api/transactions/periods/', {'end_date': later}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_balances_start_from_snapshot(self):
+        self.purchase_order(total=Decimal('20.00'))
+        totals = periods.balances()
+        self.assertEqual(totals['snapshot'], self.closed_date + timedelta(days=1))
+        purchases = [row for row in totals['parties'] if row['account'] == 'purchases']
+        self.assertEqual(purchases, [
+            {'account': 'purchases', 'party': self.vendor.pk, 'amount': Decimal('100.00'), 'count': 2},
+        ])
+
+
+# ----------------------------
+# Archived years
+# ----------------------------
+class ArchiveTests(OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        for day, amount in ((1, 10), (2, 20), (3, 30)):
+            Transaction.objects.create(
+                transaction_type='vendor_bill', date=datetime.date(2020, 3, day), amount=amount, party=self.vendor,
+            )
+        Transaction.objects.create(transaction_type='vendor_bill', date=datetime.date(2021, 1, 5), amount=5)
+        counters.recount(Transaction)
+
+    def test_open_year_cannot_be_archived(self):
+        with self.assertRaises(archive.ArchiveError):
+            archive.archive_year(2020)
+
+    def test_archive_and_restore(self):
+        periods.close_period(datetime.date(2020, 12, 31))
+        ledger = list(archive.ledger(include_archived=True))
+
+        period = archive.archive_year(2020)
+        self.assertEqual((period.row_count, period.total_amount), (3, Decimal('60')))
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertEqual(counters.counted(Transaction), 1)
+        self.assertFalse(Tombstone.objects.exists())
+        self.assertEqual(list(archive.ledger(include_archived=True)), ledger)
+
+        self.assertEqual(periods.balances(datetime.date(2020, 6, 30))['accounts'], [
+            {'account': 'vendor_bill', 'amount': Decimal('60'), 'count': 3},
+        ])
+        self.assertEqual(periods.balances(datetime.date(2021, 6, 30))['accounts'], [
+            {'account': 'vendor_bill', 'amount': Decimal('65'), 'count': 4},
+        ])
+
+        self.assertEqual(archive.restore_year(2020), 3)
+        self.assertEqual(Transaction.objects.count(), 4)
+        self.assertEqual(counters.counted(Transaction), 4)
+        self.assertFalse(ArchivedPeriod.objects.exists())
+        self.assertEqual(Transaction.objects.filter(date__year=2020, party=self.vendor).count(), 3)
+
+
+# ----------------------------
+# Document fields copied onto Transactions
+# ----------------------------
+class DocumentFieldsTests(OrderTestCase):
+    def purchase_order(self, **fields):
+        order = super().purchase_order(**fields)
+        Transaction.objects.create(transaction_type='vendor_bill', related_object=order, amount=order.total_amount)
+        return order
+
+    def posting(self, order):
+        return Transaction.objects.get(content_type=ContentType.objects.get_for_model(order), object_id=order.pk)
+
+    def fields(self, posting):
+        fields = ('document_number', 'party_id', 'party_name', 'document_status')
+        return {field: getattr(posting, field) for field in fields}
+
+    def test_copied_on_create(self):
+        order = self.purchase_order()
+        self.assertEqual(self.fields(self.posting(order)), {
+            'document_number': f'PO-{order.pk}', 'party_id': self.vendor.pk,
+            'party_name': 'Vendor', 'document_status': PurchaseOrder.DRAFT,
+        })
+
+    def test_contact_rename_reaches_postings(self):
+        order = self.purchase_order()
+        self.vendor.name = 'Vendor Ltd'
+        self.vendor.save()
+        self.assertEqual(self.posting(order).party_name, 'Vendor Ltd')
+
+    def test_order_edits_reach_postings(self):
+        order = self.purchase_order()
+        other = Contact.objects.create(name='Other Vendor', type=Contact.VENDOR)
+        order.vendor = other
+        order.save()
+        posting = self.posting(order)
+        self.assertEqual((posting.party_id, posting.party_name), (other.pk, 'Other Vendor'))
+
+        response = self.client.patch(
+            f'/api/transactions/purchase-orders/{order.pk}/', {'status': PurchaseOrder.CONFIRMED}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.posting(order).document_status, PurchaseOrder.CONFIRMED)
+
+    def test_bulk_status_change_reaches_postings(self):
+        order = self.purchase_order()
+        with self.captureOnCommitCallbacks(execute=True):
+            transitions.bulk_transition(PurchaseOrder, [order.pk], PurchaseOrder.CANCELLED)
+        self.assertEqual(self.posting(order).document_status, PurchaseOrder.CANCELLED)
+
+    def test_migration_backfill(self):
+        backfill = importlib.import_module('transactions.migrations.0012_transaction_document_fields')
+        purchase = self.purchase_order()
+        sale = SalesOrder.objects.create(customer=self.customer, status=SalesOrder.CONFIRMED)
+        Transaction.objects.create(transaction_type='customer_invoice', related_object=sale, amount=5)
+        orphan = Transaction.objects.create(
+            transaction_type='purchase_order', content_type=ContentType.objects.get_for_model(PurchaseOrder),
+            object_id=purchase.pk + 1000, amount=5,
+        )
+        manual = Transaction.objects.create(transaction_type='vendor_bill', amount=5)
+        Transaction.objects.update(document_number='', party=None, party_name='', document_status='')
+
+        backfill.backfill_documents(apps, None)
+
+        self.assertEqual(self.fields(self.posting(purchase)), purchase.document_fields())
+        self.assertEqual(self.fields(self.posting(sale)), sale.document_fields())
+        orphan.refresh_from_db()
+        self.assertEqual(self.fields(orphan), {
+            'document_number': f'PO-{purchase.pk + 1000}', 'party_id': None,
+            'party_name': '', 'document_status': '',
+        })
+        manual.refresh_from_db()
+        self.assertEqual(self.fields(manual)['document_number'], '')
+
+
+# ----------------------------
+# Admin
+# ----------------------------
+def _form_data(form):
+    data = {}
+    for name in form.fields:
+        value = form[name].value()
+        if value is not None and value is not False:
+            data[form.add_prefix(name)] = 'on' if value is True else value
+            if form.fields[name].show_hidden_initial:  # callable defaults, e.g. order_date
+                data[form.add_initial_prefix(name)] = data[form.add_prefix(name)]
+    return data
+
+
+class AdminTests(OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        admin_user = User.objects.create_superuser('admin', password='x', role=User.OWNER)
+        self.client.force_login(admin_user)
+        self.user = admin_user
+
+    def change_url(self, obj):
+        return f'/admin/transactions/{obj._meta.model_name}/{obj.pk}/change/'
+
+    def change_data(self, obj):
+        """The change form as the browser would post it back unedited."""
+        response = self.client.get(self.change_url(obj))
+        self.assertEqual(response.status_code, 200)
+        data = _form_data(response.context['adminform'].form)
+        for inline in response.context['inline_admin_formsets']:
+            management = inline.formset.management_form
+            data.update({management.add_prefix(name): value for name, value in management.initial.items()})
+            for form in inline.formset.forms:
+                data.update(_form_data(form))
+        return data
+
+    def test_changelist_uses_estimated_count(self):
+        RowCount.objects.update_or_create(resource='transactions.transaction', defaults={'count': 2_000_000})
+        response = self.client.get('/admin/transactions/transaction/')
+        self.assertEqual(response.status_code, 200)
+        changelist = response.context['cl']
+        self.assertIsInstance(changelist.paginator, EstimatedCountPaginator)
+        self.assertEqual(changelist.result_count, 2_000_000)
+
+        response = self.client.get('/admin/transactions/transaction/', {'transaction_type': 'vendor_bill'})
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_inline_edits_recalculate_totals(self):
+        order = self.purchase_order()
+        posting = Transaction.objects.create(transaction_type='vendor_bill', related_object=order, amount=80)
+        data = self.change_data(order)
+        data['items-0-quantity'] = 5
+
+        response = self.client.post(self.change_url(order), data)
+        self.assertEqual(response.status_code, 302)
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('40.00'))
+        posting.refresh_from_db()
+        self.assertEqual(posting.amount, Decimal('40.00'))
+
+    def test_closed_period_is_enforced(self):
+        closed_date = timezone.localdate() - timedelta(days=40)
+        order = self.purchase_order(order_date=closed_date)
+        posting = Transaction.objects.create(
+            transaction_type='vendor_bill', related_object=order, amount=80, date=closed_date,
+        )
+        periods.close_period(closed_date, user=self.user)
+
+        data = self.change_data(order)
+        data['items-0-quantity'] = 5
+        response = self.client.post(self.change_url(order), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'The period is closed through {closed_date}.')
+        self.assertEqual(order.items.get().quantity, 10)
+
+        data = self.change_data(order)
+        data['order_date'] = str(timezone.localdate())  # moving it out of the period is a change to it
+        self.assertEqual(self.client.post(self.change_url(order), data).status_code, 200)
+
+        data = self.change_data(order)
+        data['status'] = PurchaseOrder.CONFIRMED
+        self.assertEqual(self.client.post(self.change_url(order), data).status_code, 302)
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.total_amount), (PurchaseOrder.CONFIRMED, Decimal('80.00')))
+
+        data = self.change_data(posting)
+        data['amount'] = '1.00'
+        self.assertEqual(self.client.post(self.change_url(posting), data).status_code, 200)
+        posting.refresh_from_db()
+        self.assertEqual(posting.amount, Decimal('80.00'))
+
+        self.assertEqual(self.client.get(f'/admin/transactions/purchaseorder/{order.pk}/delete/').status_code, 403)
+        open_order = self.purchase_order()
+        response = self.client.post('/admin/transactions/purchaseorder/', {
+            'action': 'delete_selected', '_selected_action': [order.pk, open_order.pk], 'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(PurchaseOrder.objects.count(), 2)
+
+    def test_new_record_in_closed_period_is_rejected(self):
+        closed_date = timezone.localdate() - timedelta(days=40)
+        periods.close_period(closed_date, user=self.user)
+        response = self.client.post('/admin/transactions/transaction/add/', {
+            'transaction_type': 'vendor_bill', 'date': str(closed_date), 'amount': '5.00',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Transaction.objects.exists())
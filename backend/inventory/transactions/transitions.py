@@ -0,0 +1,105 @@
+# transactions/transitions.py
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
+
+from common import counters
+from .models import PurchaseOrder, SalesOrder, Transaction
+
+# Sent after a bulk transition commits, since queryset.update() sends no
+# post_save: sender=model, ids=[...], status=<new status>
+orders_bulk_updated = Signal()
+
+# Reaching these statuses posts a ledger Transaction for the order
+POSTINGS = {
+    (PurchaseOrder, PurchaseOrder.RECEIVED): 'vendor_bill',
+    (SalesOrder, SalesOrder.DELIVERED): 'customer_invoice',
+}
+
+# order model -> its party foreign key
+ORDER_PARTIES = {
+    PurchaseOrder: 'vendor',
+    SalesOrder: 'customer',
+}
+
+
+class TransitionError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def post_transactions(model, status, orders):
+    """Bulk-create the ledger postings for orders that reached status (party loaded, see ORDER_PARTIES)."""
+    transaction_type = POSTINGS.get((model, status))
+    if transaction_type is None or not orders:
+        return []
+    content_type = ContentType.objects.get_for_model(model)
+    today = timezone.localdate()
+    created = Transaction.objects.bulk_create([
+        Transaction(
+            transaction_type=transaction_type,
+            content_type=content_type,
+            object_id=order.pk,
+            date=today,
+            amount=order.total_amount,
+            **order.document_fields(),
+        )
+        for order in orders
+    ])
+    counters.increment(Transaction, len(created))  # bulk_create sends no post_save
+    return created
+
+
+def bulk_transition(model, ids, status):
+    """
+    Move every order in ids to status, all or nothing. Runs one UPDATE per
+    current status, guarded by that status so a concurrent change is caught,
+    then posts the resulting ledger Transactions in one bulk insert.
+    Returns {from_status: count}.
+    """
+    if status not in dict(model.STATUS_CHOICES):
+        raise TransitionError({'status': [f"'{status}' is not a valid status."]})
+
+    ids = set(ids)
+    with transaction.atomic():
+        current = dict(model.objects.filter(pk__in=ids).values_list('pk', 'status'))
+        errors = {}
+        missing = ids - current.keys()
+        if missing:
+            errors['ids'] = [f"Orders not found: {sorted(missing)}"]
+        groups = defaultdict(list)
+        for pk, from_status in current.items():
+            if status not in model.TRANSITIONS.get(from_status, set()):
+                errors.setdefault('transitions', []).append(
+                    f"Order {pk} cannot go from '{from_status}' to '{status}'."
+                )
+            groups[from_status].append(pk)
+        if errors:
+            raise TransitionError(errors)
+
+        now = timezone.now()
+        changes = {'status': status, 'updated_at': now}
+        if status == model.CANCELLED:
+            changes['outstanding_amount'] = 0  # as save() does via outstanding_balance()
+        if model is PurchaseOrder and status == PurchaseOrder.RECEIVED:
+            changes['received_date'] = Coalesce('received_date', Value(timezone.localdate()))
+
+        counts = {}
+        for from_status, pks in groups.items():
+            updated = model.objects.filter(pk__in=pks, status=from_status).update(**changes)
+            if updated != len(pks):
+                raise TransitionError({'transitions': ['Orders changed concurrently; retry the request.']})
+            counts[from_status] = updated
+
+        if (model, status) in POSTINGS:
+            post_transactions(model, status, model.objects.filter(pk__in=ids).select_related(ORDER_PARTIES[model]))
+
+        ids = sorted(ids)
+        transaction.on_commit(lambda: orders_bulk_updated.send(sender=model, ids=ids, status=status))
+    return counts
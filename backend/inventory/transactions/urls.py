@@ -7,6 +7,7 @@ from . import views
 router = DefaultRouter()
 router.register(r'purchase-orders', PurchaseOrderViewSet)
 router.register(r'sales-orders', SalesOrderViewSet)
+router.register(r'transactions', TransactionViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -15,5 +16,7 @@ urlpatterns = [
     path("purchases/<int:pk>/edit/", views.purchase_edit, name="purchase_edit"),
     path("purchases/<int:pk>/delete/", views.purchase_delete, name="purchase_delete"),
     path('dashboard-data/', dashboard_data, name='dashboard-data'),
+    path('ledger/', views.transaction_ledger, name='transaction-ledger'),
+    path('periods/', views.fiscal_periods, name='fiscal-periods'),
 
 ]
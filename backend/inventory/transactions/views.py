@@ -6,7 +6,7 @@ from master.models import Contact
 from django.utils import timezone
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
-from .models import PurchaseOrder,  SalesOrder,  Transaction
+from .models import PurchaseOrder,  SalesOrder,  Transaction, FiscalPeriod, PurchaseOrderItem, SalesOrderItem, PAYMENT_CHOICES
 from .serializers import (
     PurchaseOrderSerializer, 
     SalesOrderSerializer,  TransactionSerializer
@@ -14,7 +14,19 @@ from .serializers import (
 from accounts.permissions import OwnerOrAccountantPermission
 from rest_framework.authentication import SessionAuthentication
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, action, throttle_classes
+from common.response_cache import CachedResponseMixin
+from common.singleflight import single_flight
+from common.throttles import DashboardThrottle, ReportThrottle
+from reports import leaderboards
+from reports.models import Leaderboard
+from rest_framework.response import Response
+from django.db import transaction as db_transaction
+from .serializers import PaymentSerializer, BulkTransitionSerializer
+from decimal import Decimal
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from . import archive, periods, transitions
 
 
 
@@ -26,27 +38,224 @@ class CsrfExemptSessionAuthentication(SessionAuthentication):
         return  # skip CSRF for JWT
 
 
-class PurchaseOrderViewSet(viewsets.ModelViewSet):
+class RecordPaymentMixin:
+    """POST <order>/record-payment/ with {"amount": ...} adds to paid_amount."""
+
+    @action(detail=True, methods=['post'], url_path='record-payment')
+    def record_payment(self, request, pk=None):
+        order = self.get_object()
+        payment = PaymentSerializer(data=request.data)
+        payment.is_valid(raise_exception=True)
+
+        with db_transaction.atomic():
+            order = type(order).objects.select_for_update().get(pk=order.pk)
+            order.paid_amount += payment.validated_data['amount']
+            order.paid = order.paid_amount >= order.total_amount
+            order.save(update_fields=['paid_amount', 'paid'])
+
+        return Response(self.get_serializer(order).data)
+
+
+class StatusTransitionMixin:
+    """
+    POST <orders>/bulk-transition/ with {"ids": [...], "status": "confirmed"}
+    moves many orders at once (owners only). Single-order status changes go
+    through PATCH and are validated by the serializer.
+    """
+
+    @action(detail=False, methods=['post'], url_path='bulk-transition')
+    def bulk_transition(self, request):
+        if not request.user.is_owner():
+            return Response({'detail': 'Only owners can change order status.'}, status=403)
+        serializer = BulkTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        status = serializer.validated_data['status']
+        try:
+            counts = transitions.bulk_transition(
+                self.queryset.model, serializer.validated_data['ids'], status
+            )
+        except transitions.TransitionError as exc:
+            return Response(exc.errors, status=400)
+        return Response({'status': status, 'updated': sum(counts.values()), 'from': counts})
+
+    def perform_update(self, serializer):
+        previous = serializer.instance.status
+        with db_transaction.atomic():
+            order = serializer.save()
+            if order.status != previous:
+                transitions.post_transactions(type(order), order.status, [order])
+
+
+class ClosedPeriodMixin:
+    """Records dated in a closed period cannot be deleted."""
+
+    def perform_destroy(self, instance):
+        through = periods.closed_through()
+        if periods.is_locked(getattr(instance, self.get_serializer_class().date_field), through):
+            raise ValidationError({'detail': f"The period is closed through {through}."})
+        instance.delete()
+
+
+def _date(value):
+    try:
+        parsed = parse_date(value)
+    except ValueError:  # well formed but not a real date
+        parsed = None
+    if parsed is None:
+        raise ValueError('Use the YYYY-MM-DD format.')
+    return parsed
+
+
+def _flag(value):
+    if value not in ('1', 'true', '0', 'false'):
+        raise ValueError('Must be true or false.')
+    return value in ('1', 'true')
+
+
+def _id(value):
+    if not value.isdigit():
+        raise ValueError('Must be an id.')
+    return int(value)
+
+
+def _amount(value):
+    try:
+        return Decimal(value)
+    except ArithmeticError:
+        raise ValueError('Must be a number.')
+
+
+def _choice(choices):
+    allowed = [key for key, _ in choices]
+
+    def parse(value):
+        if value not in allowed:
+            raise ValueError(f"Must be one of {', '.join(allowed)}.")
+        return value
+    return parse
+
+
+class IndexedFilterMixin:
+    """
+    List filters and ordering, validated. LIST_FILTERS maps a query param to
+    (lookup, parser) and ?ordering= takes one of ORDERING_FIELDS (prefix '-'
+    for descending). A filtered list must use at least one of INDEXED_PARAMS,
+    the leading columns of the model's indexes; other filters only narrow
+    that index range, so no filter combination scans the whole table.
+    """
+    LIST_FILTERS = {}
+    INDEXED_PARAMS = ()
+    ORDERING_FIELDS = {}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
+        params = self.request.query_params
+
+        used = [param for param in self.LIST_FILTERS if params.get(param)]
+        if used and not any(param in self.INDEXED_PARAMS for param in used):
+            raise ValidationError({'filters': [f"Combine them with one of {', '.join(self.INDEXED_PARAMS)}."]})
+        for param in used:
+            lookup, parse = self.LIST_FILTERS[param]
+            try:
+                queryset = queryset.filter(**{lookup: parse(params[param])})
+            except ValueError as exc:
+                raise ValidationError({param: [str(exc)]})
+
+        ordering = params.get('ordering')
+        if ordering:
+            field = self.ORDERING_FIELDS.get(ordering.lstrip('-'))
+            if field is None:
+                raise ValidationError({'ordering': [f"Must be one of {', '.join(self.ORDERING_FIELDS)}."]})
+            descending = ordering.startswith('-')
+            queryset = queryset.order_by(f"-{field}" if descending else field, '-pk' if descending else 'pk')
+        return queryset
+
+
+ORDER_FILTERS = {
+    'date_from': ('order_date__gte', _date),
+    'date_to': ('order_date__lte', _date),
+    'paid': ('paid', _flag),
+    'amount_min': ('total_amount__gte', _amount),
+    'amount_max': ('total_amount__lte', _amount),
+}
+ORDER_ORDERING = {'order_date': 'order_date', 'id': 'pk', 'updated_at': 'updated_at'}
+
+
+class PurchaseOrderViewSet(
+    IndexedFilterMixin, CachedResponseMixin, StatusTransitionMixin, RecordPaymentMixin, ClosedPeriodMixin,
+    viewsets.ModelViewSet
+):
+    """
+    ?status=, ?vendor=, ?date_from=/?date_to= (order date) are index-backed;
+    ?paid=, ?payment_method=, ?amount_min=/?amount_max= narrow them.
+    ?ordering= order_date, id or updated_at.
+    """
     queryset = PurchaseOrder.objects.all()
     serializer_class = PurchaseOrderSerializer
     permission_classes = [IsAuthenticated, OwnerOrAccountantPermission]
-
-
-
-class SalesOrderViewSet(viewsets.ModelViewSet):
+    cache_models = (PurchaseOrder, PurchaseOrderItem)
+
+    LIST_FILTERS = {
+        'status': ('status', _choice(PurchaseOrder.STATUS_CHOICES)),
+        'vendor': ('vendor_id', _id),
+        'payment_method': ('payment_method', _choice(PAYMENT_CHOICES)),
+        **ORDER_FILTERS,
+    }
+    INDEXED_PARAMS = ('status', 'vendor', 'date_from', 'date_to')
+    ORDERING_FIELDS = ORDER_ORDERING
+
+
+
+class SalesOrderViewSet(
+    IndexedFilterMixin, CachedResponseMixin, StatusTransitionMixin, RecordPaymentMixin, ClosedPeriodMixin,
+    viewsets.ModelViewSet
+):
+    """
+    ?status=, ?customer=, ?date_from=/?date_to= (order date) are index-backed;
+    ?paid=, ?amount_min=/?amount_max= narrow them.
+    ?ordering= order_date, id or updated_at.
+    """
     queryset = SalesOrder.objects.all()
     serializer_class = SalesOrderSerializer
     permission_classes = [IsAuthenticated, OwnerOrAccountantPermission]
+    cache_models = (SalesOrder, SalesOrderItem)
 
+    LIST_FILTERS = {
+        'status': ('status', _choice(SalesOrder.STATUS_CHOICES)),
+        'customer': ('customer_id', _id),
+        **ORDER_FILTERS,
+    }
+    INDEXED_PARAMS = ('status', 'customer', 'date_from', 'date_to')
+    ORDERING_FIELDS = ORDER_ORDERING
 
 
 
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+
+class TransactionViewSet(IndexedFilterMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Ledger rows are posted by order status changes, never written through the API.
+
+    ?transaction_type=, ?party=, ?date_from=/?date_to= are index-backed;
+    ?amount_min=/?amount_max= narrow them. ?ordering= date, id or updated_at.
+    """
     queryset = Transaction.objects.all()
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated, OwnerOrAccountantPermission]
+
+    LIST_FILTERS = {
+        'transaction_type': ('transaction_type', _choice(Transaction.TRANSACTION_TYPES)),
+        'party': ('party_id', _id),
+        'date_from': ('date__gte', _date),
+        'date_to': ('date__lte', _date),
+        'amount_min': ('amount__gte', _amount),
+        'amount_max': ('amount__lte', _amount),
+    }
+    INDEXED_PARAMS = ('transaction_type', 'party', 'date_from', 'date_to')
+    ORDERING_FIELDS = {'date': 'date', 'id': 'pk', 'updated_at': 'updated_at'}
 def is_owner(user):
     return user.groups.filter(name="Owner").exists()
 
@@ -75,15 +284,19 @@ def purchase_create(request):
 @user_passes_test(is_owner)  # only owner can delete
 def purchase_delete(request, pk):
     purchase = get_object_or_404(PurchaseOrder, pk=pk)
-    purchase.delete()
+    if not periods.is_locked(purchase.order_date):
+        purchase.delete()
     return redirect("purchase_list")
 
 @user_passes_test(is_owner)  # only owner can edit
 def purchase_edit(request, pk):
     purchase = get_object_or_404(PurchaseOrder, pk=pk)
     if request.method == "POST":
-        purchase.status = request.POST.get("status", purchase.status)
-        purchase.save()
+        status = request.POST.get("status", purchase.status)
+        if status != purchase.status and purchase.can_transition_to(status):
+            purchase.status = status
+            purchase.save()
+            transitions.post_transactions(PurchaseOrder, status, [purchase])
         return redirect("purchase_list")
     return render(request, "transaction/purchase_edit.html", {"purchase": purchase})
 
@@ -110,6 +323,8 @@ from django.db.models import F, Sum, FloatField, ExpressionWrapper
 
 
 @api_view(["GET"])
+@throttle_classes([DashboardThrottle])
+@single_flight  # a burst of dashboard loads runs the scan once
 def dashboard_data(request):
     # Fetch purchases and sales
     purchases = PurchaseOrder.objects.all().values("order_date", "total_amount")
@@ -125,7 +340,61 @@ def dashboard_data(request):
         })
 
     # Convert QuerySet to list for frontend
+    today = timezone.localdate()
     return Response({
         "purchases": list(purchases),
-        "sales": sales_serialized
-    })
\ No newline at end of file
+        "sales": sales_serialized,
+        "top_products": leaderboards.top(Leaderboard.PRODUCTS, Leaderboard.MONTH, today),
+        "top_customers": leaderboards.top(Leaderboard.CUSTOMERS, Leaderboard.MONTH, today),
+    })
+
+# ----------------------------
+# Ledger (live + archived periods)
+# ----------------------------
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, OwnerOrAccountantPermission])
+@throttle_classes([ReportThrottle])
+def transaction_ledger(request):
+    """
+    Ledger rows, oldest first.
+    ?date_from=YYYY-MM-DD (default: start of this year), ?date_to=YYYY-MM-DD,
+    ?transaction_type=..., ?include_archived=1 to also read archived years.
+    """
+    bounds = {'date_from': timezone.localdate().replace(month=1, day=1), 'date_to': None}
+    for param in bounds:
+        if request.GET.get(param):
+            bounds[param] = parse_date(request.GET[param])
+            if bounds[param] is None:
+                return Response({param: ['Use the YYYY-MM-DD format.']}, status=400)
+
+    rows = archive.ledger(
+        transaction_type=request.GET.get('transaction_type') or None,
+        include_archived=request.GET.get('include_archived') in ('1', 'true'),
+        **bounds,
+    )
+    return Response(list(rows))
+
+
+# ----------------------------
+# Period close
+# ----------------------------
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated, OwnerOrAccountantPermission])
+def fiscal_periods(request):
+    """
+    GET lists closed periods; POST {"end_date": "YYYY-MM-DD"} (owners only)
+    closes everything through end_date and snapshots its balances.
+    """
+    if request.method == 'POST':
+        if not request.user.is_owner():
+            return Response({'detail': 'Only owners can close a period.'}, status=403)
+        end_date = parse_date(request.data.get('end_date') or '')
+        if end_date is None:
+            return Response({'end_date': ['Use the YYYY-MM-DD format.']}, status=400)
+        try:
+            period = periods.close_period(end_date, user=request.user)
+        except periods.PeriodError as exc:
+            return Response({'end_date': [str(exc)]}, status=400)
+        return Response({'end_date': period.end_date, 'closed_at': period.closed_at}, status=201)
+
+    return Response(list(FiscalPeriod.objects.values('end_date', 'closed_at', 'closed_by')))